@@ -0,0 +1,236 @@
+"""
+/align任务执行
+音频转换、WhisperX转录、对齐和ForceAlign都是CPU密集的同步调用，放在事件循环中执行会阻塞
+/scrape、/news。这里在独立的工作进程池中执行：
+- 音频在Web进程中异步下载，下载完成后才占用工作进程
+- 下载中、排队中和执行中的任务总数有上限，进入时即占用名额，超出时抛出AlignQueueFull(接口返回429)
+- 单个任务超时后终止工作进程并重建进程池，模型缓存随之丢失，下次任务重新加载
+工作进程使用spawn方式启动，不继承Web进程的事件循环和浏览器连接
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+import aiohttp
+
+from align_models import AlignRequest, DialogueUnit
+from model_registry import warmup_enabled
+
+logger = logging.getLogger(__name__)
+
+
+class AlignQueueFull(Exception):
+    """排队的/align任务已达上限"""
+
+
+class AlignTimeout(Exception):
+    """/align任务执行超时"""
+
+
+def _init_worker():
+    """工作进程启动时执行，按MODEL_WARMUP预加载模型"""
+    from model_registry import warm_up_from_env
+    warm_up_from_env()
+
+
+def _align_job(audio_data: bytes, transcript: List[DialogueUnit]) -> dict:
+    """在工作进程中执行，首次调用时导入alignment及其音频依赖"""
+    from import_timing import timed_import
+    alignment = timed_import("alignment")
+    return alignment.align_audio_data(audio_data, transcript)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class AlignExecutor:
+    """/align工作进程池"""
+
+    def __init__(self, workers: int = 1, max_queue: int = 4, timeout: float = 600):
+        """
+        Args:
+            workers: 工作进程数，每个进程各自加载一份模型
+            max_queue: 所有工作进程都忙时最多排队的任务数
+            timeout: 单个任务的执行时间上限(秒)，不含排队时间
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._running = 0
+
+    @property
+    def pending(self) -> int:
+        """已占用名额的任务数(下载中、排队中和执行中)"""
+        return self._pending
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return self._pool
+
+    def start(self):
+        """创建进程池；MODEL_WARMUP=true 时提交一个空任务，让工作进程提前启动并预加载模型"""
+        pool = self._get_pool()
+        if warmup_enabled():
+            for _ in range(self.workers):
+                pool.submit(_ping)
+        logger.info(f"/align工作进程池已启动: workers={self.workers}, max_queue={self.max_queue}")
+
+    def reserve(self):
+        """
+        占用一个任务名额，之后必须调用release归还
+
+        Raises:
+            AlignQueueFull: 名额已满
+        """
+        if self._pending >= self.workers + self.max_queue:
+            raise AlignQueueFull(f"对齐任务已满({self._pending}个执行中或排队中)，请稍后重试")
+        self._pending += 1
+
+    def release(self):
+        self._pending -= 1
+
+    def _terminate_pool(self, pool: Optional[ProcessPoolExecutor]):
+        """终止进程池的所有工作进程(包括正在执行的任务)，下次提交时重建进程池"""
+        if pool is None:
+            return
+        if self._pool is pool:
+            self._pool = None
+        # ProcessPoolExecutor没有中止正在执行任务的接口，只能直接终止进程
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    async def run(self, audio_data: bytes, transcript: List[DialogueUnit]) -> dict:
+        """
+        执行一个对齐任务，调用方需已通过reserve占用名额
+
+        Raises:
+            AlignTimeout: 执行超时
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        # 拿到空闲工作进程后才提交，超时只计算执行时间
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+            self._running += 1
+            try:
+                future = loop.run_in_executor(pool, _align_job, audio_data, transcript)
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"/align任务执行超过 {self.timeout:.0f}秒，重启工作进程池")
+                self._terminate_pool(pool)
+                raise AlignTimeout(f"对齐任务执行超过 {self.timeout:.0f}秒")
+            except BrokenProcessPool:
+                # 工作进程异常退出(如内存不足被终止)或被其他超时任务终止
+                self._terminate_pool(pool)
+                return {"error": "对齐工作进程异常退出，请重试"}
+            finally:
+                self._running -= 1
+
+    def stop(self):
+        self._terminate_pool(self._pool)
+        logger.info("/align工作进程池已停止")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queued": self._pending - self._running,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+        }
+
+
+async def align_audio_text(req: AlignRequest, reserved: bool = False) -> dict:
+    """
+    下载音频并提交对齐任务
+
+    Args:
+        reserved: 调用方是否已占用名额(异步任务在提交时占用，执行完后由调用方归还)
+
+    Raises:
+        AlignQueueFull: 名额已满，在下载之前占用名额，并发下载数也受上限约束
+        AlignTimeout: 执行超时
+    """
+    executor = get_align_executor()
+    if not reserved:
+        executor.reserve()
+    try:
+        return await _download_and_run(executor, req)
+    finally:
+        if not reserved:
+            executor.release()
+
+
+async def _download_and_run(executor: AlignExecutor, req: AlignRequest) -> dict:
+    try:
+        # 解析 transcript_text
+        if req.transcript_text:
+            transcript_list = json.loads(req.transcript_text)
+            transcript = [DialogueUnit(**item) for item in transcript_list]
+        else:
+            transcript = req.transcript or []
+
+        # 下载音频
+        print("正在下载音频文件...")
+        async with aiohttp.ClientSession() as session:
+            async with session.get(req.audio_url) as response:
+                if response.status != 200:
+                    return {"error": f"下载失败，HTTP状态码: {response.status}"}
+
+                audio_data = await response.read()
+                content_type = response.headers.get('content-type', '')
+                print(f"下载完成，文件大小: {len(audio_data)} bytes, Content-Type: {content_type}")
+    except Exception as e:
+        print(f"处理过程中发生错误: {str(e)}")
+        return {"error": f"处理过程中发生错误: {str(e)}"}
+
+    # 检查文件大小
+    if len(audio_data) < 1000:
+        return {"error": "音频文件过小，可能下载不完整"}
+
+    return await executor.run(audio_data, transcript)
+
+
+_align_executor: Optional[AlignExecutor] = None
+
+
+def get_align_executor() -> AlignExecutor:
+    """获取进程级/align工作进程池（使用环境变量配置）"""
+    global _align_executor
+    if _align_executor is None:
+        _align_executor = AlignExecutor(
+            workers=int(os.getenv('ALIGN_WORKERS', 1)),
+            max_queue=int(os.getenv('ALIGN_MAX_QUEUE', 4)),
+            timeout=float(os.getenv('ALIGN_JOB_TIMEOUT', 600))
+        )
+    return _align_executor
+
+
+async def start_align_executor():
+    """在应用启动时调用"""
+    get_align_executor().start()
+
+
+async def stop_align_executor():
+    """在应用关闭时调用"""
+    if _align_executor is not None:
+        _align_executor.stop()
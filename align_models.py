@@ -0,0 +1,18 @@
+"""
+/align的请求模型，与alignment.py分开，app.py声明接口时不需要导入音频依赖
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+class DialogueUnit(BaseModel):
+    text: str
+    model_name: str
+    emotion: str
+    speed_facter: float
+    text_lang: str
+
+class AlignRequest(BaseModel):
+    audio_url: str
+    transcript: Optional[List[DialogueUnit]] = None
+    transcript_text: Optional[str] = None
@@ -0,0 +1,618 @@
+"""
+音频文本对齐
+whisperx、torch、forcealign、librosa、nltk、jieba导入耗时数秒、占用数百MB内存，
+本模块只在align_executor的工作进程中导入，Web进程不加载这些依赖
+"""
+import os
+import re
+import tempfile
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+from align_models import DialogueUnit
+from import_timing import timed_import
+from model_registry import ALIGN_MODEL_NAMES, DEFAULT_ASR_MODEL, default_device, get_model_registry
+
+np = timed_import("numpy")
+sf = timed_import("soundfile")
+librosa = timed_import("librosa")
+nltk = timed_import("nltk")
+jieba = timed_import("jieba")
+torch = timed_import("torch")
+whisperx = timed_import("whisperx")
+ForceAlign = timed_import("forcealign").ForceAlign
+
+
+# 改进的对齐算法类
+class ImprovedAlignment:
+    def __init__(self):
+        # 初始化中文分词
+        jieba.initialize()
+        # SequenceMatcher结果和源词语预处理结果，同一次对齐的各对话单元共用
+        self._ratio_cache: Dict[Tuple[str, str], float] = {}
+        self._processed_cache: Dict[str, str] = {}
+        
+    def preprocess_text(self, text: str) -> str:
+        """文本预处理"""
+        if not text:
+            return ""
+        
+        # 移除中文标点
+        text = re.sub(r'[，。！？；：""''（）【】《》、]', '', text)
+        # 移除英文标点
+        text = re.sub(r'[,.!?;:"()[\]{}<>]', '', text)
+        # 移除多余空格
+        text = re.sub(r'\s+', ' ', text)
+        return text.strip().lower()
+    
+    def chinese_tokenize(self, text: str) -> List[str]:
+        """中文分词"""
+        processed_text = self.preprocess_text(text)
+        if not processed_text:
+            return []
+            
+        if self.is_chinese(text):
+            # 中文分词
+            tokens = list(jieba.cut(processed_text))
+            return [token for token in tokens if token.strip()]
+        else:
+            # 英文分词
+            return processed_text.split()
+    
+    def is_chinese(self, text: str) -> bool:
+        """检测是否为中文"""
+        return bool(re.search(r'[\u4e00-\u9fff]', text))
+    
+    def calculate_similarity(self, word1: str, word2: str) -> float:
+        """计算词语相似度"""
+        if not word1 or not word2:
+            return 0.0
+        
+        # 基本字符串相似度
+        similarity = SequenceMatcher(None, word1, word2).ratio()
+        
+        # 如果是中文，增加字符级别匹配
+        if self.is_chinese(word1) and self.is_chinese(word2):
+            char_similarity = self.chinese_char_similarity(word1, word2)
+            similarity = max(similarity, char_similarity)
+        
+        # 如果长度相差太大，降低相似度
+        len_diff = abs(len(word1) - len(word2))
+        max_len = max(len(word1), len(word2))
+        if max_len > 0:
+            len_penalty = len_diff / max_len
+            similarity *= (1 - len_penalty * 0.3)
+        
+        return similarity
+    
+    def chinese_char_similarity(self, word1: str, word2: str) -> float:
+        """计算中文字符相似度"""
+        if len(word1) == 0 or len(word2) == 0:
+            return 0.0
+        
+        # 字符重叠度
+        chars1 = set(word1)
+        chars2 = set(word2)
+        intersection = chars1 & chars2
+        union = chars1 | chars2
+        
+        if not union:
+            return 0.0
+        
+        jaccard = len(intersection) / len(union)
+        
+        # 考虑字符顺序
+        sequence_sim = SequenceMatcher(None, word1, word2).ratio()
+        
+        # 综合评分
+        return (jaccard + sequence_sim) / 2
+    
+    def similarity_matrix(self, words1: List[str], words2: List[str]) -> np.ndarray:
+        """
+        批量计算相似度矩阵，结果与逐对调用calculate_similarity相同
+
+        - 重复的词只计算一次
+        - 字符集合用布尔矩阵表示，一次矩阵乘法得到所有词对的公共字符数，Jaccard和长度惩罚按数组广播计算
+        - 没有公共字符的词对SequenceMatcher结果必为0，跳过；其余词对的结果在实例内缓存，
+          同一次对齐中各对话单元重复扫描剩余词语时复用
+
+        Returns:
+            len(words1) x len(words2) 的float数组
+        """
+        if not words1 or not words2:
+            return np.zeros((len(words1), len(words2)))
+
+        vocab1 = list(dict.fromkeys(words1))
+        vocab2 = list(dict.fromkeys(words2))
+        position1 = {word: i for i, word in enumerate(vocab1)}
+        position2 = {word: i for i, word in enumerate(vocab2)}
+
+        chars = {char: i for i, char in enumerate(set(''.join(vocab1)) | set(''.join(vocab2)))}
+        bits1 = np.zeros((len(vocab1), len(chars)), dtype=np.float32)
+        bits2 = np.zeros((len(vocab2), len(chars)), dtype=np.float32)
+        for bits, vocab in ((bits1, vocab1), (bits2, vocab2)):
+            for i, word in enumerate(vocab):
+                bits[i, [chars[char] for char in set(word)]] = 1
+        # 公共字符数不超过字符表大小，float32矩阵乘法结果是精确整数；转为float64再做除法，与逐对计算的结果一致
+        intersection = (bits1 @ bits2.T).astype(np.float64)
+        union = bits1.sum(axis=1, dtype=np.float64)[:, None] + bits2.sum(axis=1, dtype=np.float64)[None, :] - intersection
+        jaccard = np.divide(intersection, union, out=np.zeros(intersection.shape), where=union > 0)
+
+        ratio = np.zeros(intersection.shape)
+        for i, j in zip(*np.nonzero(intersection)):
+            key = (vocab1[i], vocab2[j])
+            if key not in self._ratio_cache:
+                self._ratio_cache[key] = SequenceMatcher(None, *key).ratio()
+            ratio[i, j] = self._ratio_cache[key]
+
+        # 两个词都是中文时取字符级别匹配和SequenceMatcher的较大值
+        chinese1 = np.array([self.is_chinese(word) for word in vocab1])
+        chinese2 = np.array([self.is_chinese(word) for word in vocab2])
+        similarity = np.where(chinese1[:, None] & chinese2[None, :], np.maximum(ratio, (jaccard + ratio) / 2), ratio)
+
+        # 长度相差太大时降低相似度
+        len1 = np.array([len(word) for word in vocab1], dtype=float)[:, None]
+        len2 = np.array([len(word) for word in vocab2], dtype=float)[None, :]
+        max_len = np.maximum(len1, len2)
+        len_penalty = np.divide(np.abs(len1 - len2), max_len, out=np.zeros(similarity.shape), where=max_len > 0)
+        similarity = similarity * (1 - len_penalty * 0.3)
+
+        index1 = np.array([position1[word] for word in words1])
+        index2 = np.array([position2[word] for word in words2])
+        return similarity[np.ix_(index1, index2)]
+
+    def _preprocess_sources(self, source_words: List[Tuple[str, float, float]]) -> List[Tuple[str, str, float, float]]:
+        """预处理源词语，去掉预处理后为空的词，返回(预处理后的词, 原词, 开始, 结束)"""
+        processed_source = []
+        for word, start, end in source_words:
+            processed_word = self._processed_cache.get(word)
+            if processed_word is None:
+                processed_word = self._processed_cache[word] = self.preprocess_text(word)
+            if processed_word:
+                processed_source.append((processed_word, word, start, end))
+        return processed_source
+
+    def sequence_alignment(self, target_text: str, source_words: List[Tuple[str, float, float]], 
+                          threshold: float = 0.3) -> List[Dict]:
+        """序列对齐算法"""
+        target_words = self.chinese_tokenize(target_text)
+        if not target_words or not source_words:
+            return []
+        
+        # 预处理源词语
+        processed_source = self._preprocess_sources(source_words)
+        if not processed_source:
+            return []
+        
+        # 动态规划对齐，相似度矩阵预先批量计算
+        n, m = len(target_words), len(processed_source)
+        similarity = self.similarity_matrix(target_words, [item[0] for item in processed_source])
+        dp = np.zeros((n + 1, m + 1))
+        # 0: 匹配, 1: 跳过源词(插入), 2: 跳过目标词(删除)
+        choice = np.zeros((n + 1, m + 1), dtype=np.int8)
+        
+        # 按反对角线(i + j 相同)填充DP表：每个格子只依赖前两条反对角线，同一条上的格子一次算完，
+        # 计算顺序和逐格填充时相同，分数相同时的选择也不变
+        for d in range(2, n + m + 1):
+            i = np.arange(max(1, d - m), min(n, d - 1) + 1)
+            j = d - i
+            # 匹配当前词
+            match_score = dp[i-1, j-1] + similarity[i-1, j-1]
+            # 跳过源词（插入）
+            skip_source_score = dp[i, j-1] - 0.1
+            # 跳过目标词（删除）
+            skip_target_score = dp[i-1, j] - 0.3
+            
+            # 选择最佳，相同时的优先级为 匹配 > 跳过源词 > 跳过目标词
+            is_match = (match_score >= skip_source_score) & (match_score >= skip_target_score)
+            is_skip_source = ~is_match & (skip_source_score >= skip_target_score)
+            dp[i, j] = np.where(is_match, match_score, np.where(is_skip_source, skip_source_score, skip_target_score))
+            choice[i, j] = np.where(is_match, 0, np.where(is_skip_source, 1, 2))
+        
+        # 回溯找到最佳对齐路径
+        alignment = []
+        i, j = n, m
+        
+        while i > 0 and j > 0:
+            step = choice[i, j]
+            
+            if step == 0:
+                # 匹配
+                score = float(similarity[i-1, j-1])
+                if score >= threshold:
+                    processed_word, original_word, start, end = processed_source[j-1]
+                    alignment.append({
+                        'target_word': target_words[i-1],
+                        'source_word': processed_word,
+                        'original_word': original_word,
+                        'start': start,
+                        'end': end,
+                        'confidence': score
+                    })
+                i, j = i - 1, j - 1
+            elif step == 1:
+                j -= 1
+            else:
+                i -= 1
+        
+        alignment.reverse()
+        return alignment
+    
+    def fuzzy_match_fallback(self, target_text: str, source_words: List[Tuple[str, float, float]], 
+                            threshold: float = 0.4) -> List[Dict]:
+        """模糊匹配作为后备方案，每个目标词取未使用的源词中相似度最高的一个"""
+        target_words = self.chinese_tokenize(target_text)
+        if not target_words or not source_words:
+            return []
+        
+        processed_words = [self.preprocess_text(word) for word, _, _ in source_words]
+        similarity = self.similarity_matrix(target_words, processed_words)
+        used = np.zeros(len(source_words), dtype=bool)
+        matched_words = []
+        
+        for i, target_word in enumerate(target_words):
+            scores = np.where(used, -1.0, similarity[i])
+            # argmax取第一个最大值，与按顺序比较、只在更大时替换的结果一致
+            best_index = int(np.argmax(scores))
+            best_score = float(scores[best_index])
+            
+            if best_score > 0 and best_score >= threshold:
+                source_word, start, end = source_words[best_index]
+                matched_words.append({
+                    'target_word': target_word,
+                    'source_word': processed_words[best_index],
+                    'original_word': source_word,
+                    'start': start,
+                    'end': end,
+                    'confidence': best_score
+                })
+                used[best_index] = True
+        
+        return matched_words
+    
+    def interpolate_timing(self, alignment_result: List[Dict], unit_text: str) -> Tuple[float, float]:
+        """时间插值优化"""
+        if not alignment_result:
+            return 0.0, 0.0
+        
+        # 基本时间边界
+        start_time = alignment_result[0]['start']
+        end_time = alignment_result[-1]['end']
+        
+        # 计算平均每字符时间
+        total_chars = sum(len(item['target_word']) for item in alignment_result)
+        if total_chars > 0:
+            char_duration = (end_time - start_time) / total_chars
+            
+            # 根据完整文本长度调整
+            full_text_chars = len(self.preprocess_text(unit_text))
+            if full_text_chars > total_chars:
+                # 如果完整文本更长，扩展时间
+                additional_time = (full_text_chars - total_chars) * char_duration
+                end_time += additional_time * 0.5  # 保守扩展
+        
+        return start_time, end_time
+    
+    def smooth_timestamps(self, segments: List[Dict], smooth_factor: float = 0.1) -> List[Dict]:
+        """平滑时间戳，避免重叠"""
+        if len(segments) <= 1:
+            return segments
+        
+        smoothed = []
+        for i, segment in enumerate(segments):
+            current_segment = segment.copy()
+            
+            if i == 0:
+                smoothed.append(current_segment)
+                continue
+            
+            # 检查与前一个段的重叠
+            prev_end = smoothed[-1]['end']
+            current_start = current_segment['start']
+            
+            if current_start < prev_end:
+                # 存在重叠，调整边界
+                gap = prev_end - current_start
+                mid_point = prev_end - gap * smooth_factor
+                
+                smoothed[-1]['end'] = mid_point
+                current_segment['start'] = mid_point
+            
+            smoothed.append(current_segment)
+        
+        return smoothed
+
+# 改进的对齐函数
+def improved_align_segments(transcript: List[DialogueUnit], align_words: List, 
+                           audio_duration: float) -> List[Dict]:
+    """改进的段落对齐函数"""
+    
+    aligner = ImprovedAlignment()
+    words = [(w.word, w.time_start, w.time_end) for w in align_words]
+    segments = []
+    
+    if not words:
+        return segments
+    
+    # 预处理所有词语
+    processed_words = []
+    for word, start, end in words:
+        processed_word = aligner.preprocess_text(word)
+        if processed_word:
+            processed_words.append((word, start, end))
+    
+    current_word_index = 0
+    
+    for unit in transcript:
+        if not unit.text.strip():
+            continue
+        
+        # 获取可用的词语
+        available_words = processed_words[current_word_index:]
+        if not available_words:
+            print(f"警告: 没有更多词语可用于对齐 '{unit.text}'")
+            break
+        
+        # 首先尝试序列对齐
+        alignment_result = aligner.sequence_alignment(unit.text, available_words, threshold=0.3)
+        
+        if alignment_result:
+            # 序列对齐成功
+            start_time, end_time = aligner.interpolate_timing(alignment_result, unit.text)
+            
+            # 计算平均置信度
+            avg_confidence = sum(item['confidence'] for item in alignment_result) / len(alignment_result)
+            
+            # 更新当前词索引
+            if alignment_result:
+                last_word = alignment_result[-1]['original_word']
+                for i, (word, _, _) in enumerate(available_words):
+                    if word == last_word:
+                        current_word_index += i + 1
+                        break
+            
+            print(f"序列对齐成功: '{unit.text}' -> {start_time:.2f}-{end_time:.2f}s (置信度: {avg_confidence:.2f})")
+            
+        else:
+            # 序列对齐失败，使用模糊匹配
+            matched_words = aligner.fuzzy_match_fallback(unit.text, available_words, threshold=0.4)
+            
+            if matched_words:
+                start_time = matched_words[0]['start']
+                end_time = matched_words[-1]['end']
+                
+                # 更新当前词索引
+                last_word = matched_words[-1]['original_word']
+                for i, (word, _, _) in enumerate(available_words):
+                    if word == last_word:
+                        current_word_index += i + 1
+                        break
+                
+                avg_confidence = sum(item['confidence'] for item in matched_words) / len(matched_words)
+                print(f"模糊匹配成功: '{unit.text}' -> {start_time:.2f}-{end_time:.2f}s (置信度: {avg_confidence:.2f})")
+            else:
+                print(f"警告: 无法对齐文本 '{unit.text}'，跳过")
+                continue
+        
+        # 确保时间合理性
+        start_time = max(0, start_time)
+        end_time = min(audio_duration, max(start_time + 0.1, end_time))
+        
+        if start_time < end_time:
+            segments.append({
+                "start": start_time,
+                "end": end_time,
+                "text": unit.text,
+                "model_name": unit.model_name,
+                "emotion": unit.emotion,
+                "speed_facter": unit.speed_facter,
+                "text_lang": unit.text_lang
+            })
+    
+    # 应用时间平滑
+    segments = aligner.smooth_timestamps(segments, smooth_factor=0.1)
+    
+    return segments
+
+def pad_audio_if_needed(audio: np.ndarray, target_sr: int = 16000, min_duration: float = 0.5) -> np.ndarray:
+    """
+    如果音频太短，进行填充处理
+    """
+    min_samples = int(target_sr * min_duration)
+    
+    if len(audio) < min_samples:
+        # 如果音频极短，用静音填充
+        if len(audio) < target_sr * 0.1:  # 少于0.1秒
+            pad_length = min_samples - len(audio)
+            audio = np.pad(audio, (0, pad_length), mode='constant', constant_values=0)
+        else:
+            # 如果音频较短但有内容，重复音频内容
+            repeat_count = int(np.ceil(min_samples / len(audio)))
+            audio = np.tile(audio, repeat_count)[:min_samples]
+    
+    return audio
+
+def ensure_nltk_data():
+    """确保NLTK数据可用"""
+    try:
+        nltk.data.find('tokenizers/punkt')
+        nltk.data.find('taggers/averaged_perceptron_tagger')
+    except LookupError:
+        print("下载NLTK数据...")
+        nltk.download('punkt', quiet=True)
+        nltk.download('punkt_tab', quiet=True)
+        nltk.download('averaged_perceptron_tagger', quiet=True)
+        nltk.download('averaged_perceptron_tagger_eng', quiet=True)
+
+def convert_audio_to_wav(audio_data: bytes, target_sr: int = 16000) -> Tuple[np.ndarray, str]:
+    """
+    转换音频数据为WAV格式
+    """
+    # 创建临时文件
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
+        temp_file.write(audio_data)
+        temp_input_path = temp_file.name
+    
+    try:
+        # 使用librosa加载音频
+        audio, sr = librosa.load(temp_input_path, sr=target_sr)
+        
+        # 音频增强
+        audio = librosa.effects.preemphasis(audio)  # 预加重
+        audio = librosa.util.normalize(audio)  # 归一化
+        
+        # 创建输出临时文件
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as output_file:
+            temp_output_path = output_file.name
+        
+        # 保存处理后的音频
+        sf.write(temp_output_path, audio, target_sr)
+        
+        return audio, temp_output_path
+        
+    finally:
+        # 清理输入临时文件
+        if os.path.exists(temp_input_path):
+            os.unlink(temp_input_path)
+
+# 主要的对齐函数，由align_executor在工作进程中执行
+def align_audio_data(audio_data: bytes, transcript: List[DialogueUnit]) -> dict:
+    """
+    完整的音频文本对齐函数
+
+    Args:
+        audio_data: 已下载的音频文件内容
+        transcript: 参考文本
+    """
+    temp_files = []
+    
+    try:
+        # 转换音频格式
+        print("正在转换音频格式...")
+        try:
+            audio, temp_wav_path = convert_audio_to_wav(audio_data, target_sr=16000)
+            temp_files.append(temp_wav_path)
+        except Exception as e:
+            return {"error": f"音频格式转换失败: {str(e)}"}
+
+        # 获取音频信息
+        duration = len(audio) / 16000
+        print(f"音频信息: {len(audio)} samples, {duration:.2f}s, 采样率: 16000Hz")
+        
+        # 检查音频长度
+        MIN_DURATION = 0.3
+        if duration < MIN_DURATION:
+            return {"error": f"音频文件过短（{duration:.2f}s），需要至少 {MIN_DURATION}s"}
+        
+        # 对短音频进行填充
+        if duration < 1.0:
+            audio = pad_audio_if_needed(audio, target_sr=16000, min_duration=1.0)
+            sf.write(temp_wav_path, audio, 16000)
+            duration = len(audio) / 16000
+            print(f"音频已填充至 {duration:.2f}s")
+
+        device, compute_type = default_device()
+        print(f"使用设备: {device}")
+        registry = get_model_registry()
+
+        # ASR 转录
+        try:
+            print("正在加载 WhisperX 模型...")
+            model = registry.get_asr_model(DEFAULT_ASR_MODEL, device=device, compute_type=compute_type)
+            
+            print("正在进行 ASR 转录...")
+            result = model.transcribe(
+                audio, 
+                batch_size=4,
+                chunk_size=6,
+                print_progress=True
+            )
+            
+            if not result.get("segments"):
+                return {"error": "ASR 转录失败，未检测到语音内容"}
+            
+            detected_language = result.get("language", "zh")
+            print(f"检测到的语言: {detected_language}")
+            
+            # 加载对齐模型(已加载过的直接从缓存获取)
+            print("正在加载对齐模型...")
+            model_name = ALIGN_MODEL_NAMES.get(detected_language)
+            
+            if model_name:
+                try:
+                    align_model, metadata = registry.get_align_model(
+                        detected_language, device=device, model_name=model_name
+                    )
+                except:
+                    print("指定模型加载失败，使用默认模型")
+                    align_model, metadata = registry.get_align_model(detected_language, device=device)
+            else:
+                align_model, metadata = registry.get_align_model(detected_language, device=device)
+            
+            print("正在进行强制对齐...")
+            aligned = whisperx.align(
+                result["segments"], 
+                align_model, 
+                metadata, 
+                audio, 
+                device=device,
+                return_char_alignments=True,
+                
+            )
+            
+        except Exception as e:
+            return {"error": f"ASR/对齐处理失败: {str(e)}"}
+
+        # 提取ASR文本
+        asr_segments = aligned["segments"]
+        if not asr_segments:
+            return {"error": "对齐失败，未获得有效的语音段"}
+            
+        asr_text = " ".join([seg["text"] for seg in asr_segments])
+        print(f"ASR 识别文本: {asr_text}")
+
+        # 使用 ForceAlign 进行整体对齐
+        ref_text = " ".join([u.text for u in transcript])
+        if not ref_text.strip():
+            return {"error": "参考文本为空"}
+            
+        print(f"参考文本: {ref_text}")
+        
+        try:
+            ensure_nltk_data()
+            
+            print("正在进行 ForceAlign 对齐...")
+            fa = ForceAlign(audio_file=temp_wav_path, transcript=ref_text)
+            align_words = fa.inference()
+            
+            if not align_words:
+                return {"error": "ForceAlign 对齐失败"}
+                
+        except Exception as e:
+            return {"error": f"ForceAlign 处理失败: {str(e)}"}
+
+        # 使用改进的对齐算法
+        print("正在使用改进算法进行段落对齐...")
+        segments = improved_align_segments(transcript, align_words, duration)
+        
+        print(f"成功处理 {len(segments)} 个语音段")
+        
+        # 输出详细信息
+        for i, segment in enumerate(segments):
+            print(f"段落 {i+1}: {segment['start']:.2f}-{segment['end']:.2f}s | {segment['text']}")
+        
+        return {"segments": segments}
+        
+    except Exception as e:
+        print(f"处理过程中发生错误: {str(e)}")
+        return {"error": f"处理过程中发生错误: {str(e)}"}
+        
+    finally:
+        # 清理临时文件
+        for temp_file in temp_files:
+            if temp_file and os.path.exists(temp_file):
+                try:
+                    os.unlink(temp_file)
+                    print(f"已清理临时文件: {temp_file}")
+                except Exception as e:
+                    print(f"清理临时文件失败: {e}")
@@ -1,35 +1,40 @@
 import sys
+# 最先导入，从这里开始计算启动耗时
+from import_timing import get_import_report, mark_startup_complete, timed_import
+# 启动时要加载的重量级依赖先逐个导入，/debug/startup中给出每个模块的导入耗时；
+# 第三方库在前计入各自的耗时，后面的本项目模块只计除这些依赖之外的增量
+for _module_name in ("fastapi", "pydantic", "aiohttp", "dateutil.parser", "sqlalchemy", "pymysql", "pandas",
+                     "playwright.async_api", "database", "market_scraper", "newsCrawer"):
+    timed_import(_module_name)
 from fastapi import FastAPI, Query, UploadFile, File
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from dateutil import parser as date_parser
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
-from market_scraper import scrape_financial_data
+from scrape_cache import get_scrape_cache
+from database import (close_database_manager, encode_history_cursor, get_database_manager, parse_interval,
+                      start_partition_maintenance, stop_partition_maintenance)
+from parquet_archive import iter_timeseries_with_archive
+from number_parsing import normalize_payload
+from persistence_queue import start_persistence_queue, stop_persistence_queue
+from scrape_scheduler import get_scrape_scheduler, start_scrape_scheduler, stop_scrape_scheduler
+from browser_pool import start_browser_pool, stop_browser_pool
+from eastmoney_api import close_eastmoney_client
 from newsCrawer import get_news
+from align_executor import (AlignQueueFull, AlignTimeout, align_audio_text, get_align_executor,
+                            start_align_executor, stop_align_executor)
+from job_store import FINISHED_STATUSES, SUCCEEDED, get_job_manager, start_job_manager, stop_job_manager
 
-from whisper_timestamped import transcribe_timestamped
 import tempfile
 import json
-from forcealign import ForceAlign
-import whisperx
-import torch
 from pydantic import BaseModel
-from typing import List, Tuple, Dict, Optional
+from typing import Tuple, Optional
 import aiohttp
 import os
 import uuid
-import librosa
-import soundfile as sf
-import numpy as np
-from pydub import AudioSegment
-import io
-import nltk
-from nltk.data import find
-
-
-import re
-import jieba
-from difflib import SequenceMatcher
+from align_models import AlignRequest
 
 # 在Windows上设置事件循环策略
 if sys.platform == "win32":
@@ -40,17 +45,34 @@ app = FastAPI()
 # 挂载静态文件服务用于视频下载
 app.mount("/videos", StaticFiles(directory="generated_videos"), name="videos")
 
-class DialogueUnit(BaseModel):
-    text: str
-    model_name: str
-    emotion: str
-    speed_facter: float
-    text_lang: str
-
-class AlignRequest(BaseModel):
-    audio_url: str
-    transcript: Optional[List[DialogueUnit]] = None
-    transcript_text: Optional[str] = None
+@app.on_event("startup")
+async def on_startup():
+    # 应用启动时预热浏览器池，避免每次/scrape冷启动Chromium
+    await start_browser_pool()
+    # 创建共享的数据库引擎和连接池
+    get_database_manager()
+    # 按月创建分区、按保留期删除过期分区，之后每天执行
+    await start_partition_maintenance()
+    # 启动后台批量写库任务，并回放数据库不可用期间写入本地文件的结果
+    await start_persistence_queue()
+    # 按数据源频率定时刷新缓存，/scrape直接读取最新快照
+    await start_scrape_scheduler()
+    # /align在独立的工作进程池中执行，MODEL_WARMUP=true 时工作进程启动后预加载模型
+    await start_align_executor()
+    # 未完成的任务标记为中断，清理过期任务
+    await start_job_manager()
+    mark_startup_complete()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_job_manager()
+    await stop_align_executor()
+    await stop_scrape_scheduler()
+    await stop_browser_pool()
+    await stop_persistence_queue()
+    await stop_partition_maintenance()
+    close_database_manager()
+    await close_eastmoney_client()
 
 class VideoGenerationRequest(BaseModel):
     html_content: str
@@ -63,580 +85,21 @@ class VideoGenerationResponse(BaseModel):
     error: Optional[str] = None
     duration: Optional[float] = None
     file_size: Optional[int] = None
-# 改进的对齐算法类
-class ImprovedAlignment:
-    def __init__(self):
-        # 初始化中文分词
-        jieba.initialize()
-        
-    def preprocess_text(self, text: str) -> str:
-        """文本预处理"""
-        if not text:
-            return ""
-        
-        # 移除中文标点
-        text = re.sub(r'[，。！？；：""''（）【】《》、]', '', text)
-        # 移除英文标点
-        text = re.sub(r'[,.!?;:"()[\]{}<>]', '', text)
-        # 移除多余空格
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip().lower()
-    
-    def chinese_tokenize(self, text: str) -> List[str]:
-        """中文分词"""
-        processed_text = self.preprocess_text(text)
-        if not processed_text:
-            return []
-            
-        if self.is_chinese(text):
-            # 中文分词
-            tokens = list(jieba.cut(processed_text))
-            return [token for token in tokens if token.strip()]
-        else:
-            # 英文分词
-            return processed_text.split()
-    
-    def is_chinese(self, text: str) -> bool:
-        """检测是否为中文"""
-        return bool(re.search(r'[\u4e00-\u9fff]', text))
-    
-    def calculate_similarity(self, word1: str, word2: str) -> float:
-        """计算词语相似度"""
-        if not word1 or not word2:
-            return 0.0
-        
-        # 基本字符串相似度
-        similarity = SequenceMatcher(None, word1, word2).ratio()
-        
-        # 如果是中文，增加字符级别匹配
-        if self.is_chinese(word1) and self.is_chinese(word2):
-            char_similarity = self.chinese_char_similarity(word1, word2)
-            similarity = max(similarity, char_similarity)
-        
-        # 如果长度相差太大，降低相似度
-        len_diff = abs(len(word1) - len(word2))
-        max_len = max(len(word1), len(word2))
-        if max_len > 0:
-            len_penalty = len_diff / max_len
-            similarity *= (1 - len_penalty * 0.3)
-        
-        return similarity
-    
-    def chinese_char_similarity(self, word1: str, word2: str) -> float:
-        """计算中文字符相似度"""
-        if len(word1) == 0 or len(word2) == 0:
-            return 0.0
-        
-        # 字符重叠度
-        chars1 = set(word1)
-        chars2 = set(word2)
-        intersection = chars1 & chars2
-        union = chars1 | chars2
-        
-        if not union:
-            return 0.0
-        
-        jaccard = len(intersection) / len(union)
-        
-        # 考虑字符顺序
-        sequence_sim = SequenceMatcher(None, word1, word2).ratio()
-        
-        # 综合评分
-        return (jaccard + sequence_sim) / 2
-    
-    def sequence_alignment(self, target_text: str, source_words: List[Tuple[str, float, float]], 
-                          threshold: float = 0.3) -> List[Dict]:
-        """序列对齐算法"""
-        target_words = self.chinese_tokenize(target_text)
-        if not target_words or not source_words:
-            return []
-        
-        # 预处理源词语
-        processed_source = []
-        for word, start, end in source_words:
-            processed_word = self.preprocess_text(word)
-            if processed_word:
-                processed_source.append((processed_word, start, end))
-        
-        if not processed_source:
-            return []
-        
-        # 动态规划对齐
-        n, m = len(target_words), len(processed_source)
-        dp = [[0.0] * (m + 1) for _ in range(n + 1)]
-        parent = [[(-1, -1)] * (m + 1) for _ in range(n + 1)]
-        
-        # 填充DP表
-        for i in range(1, n + 1):
-            for j in range(1, m + 1):
-                # 匹配当前词
-                similarity = self.calculate_similarity(target_words[i-1], processed_source[j-1][0])
-                match_score = dp[i-1][j-1] + similarity
-                
-                # 跳过源词（插入）
-                skip_source_score = dp[i][j-1] - 0.1
-                
-                # 跳过目标词（删除）
-                skip_target_score = dp[i-1][j] - 0.3
-                
-                # 选择最佳
-                if match_score >= skip_source_score and match_score >= skip_target_score:
-                    dp[i][j] = match_score
-                    parent[i][j] = (i-1, j-1)
-                elif skip_source_score >= skip_target_score:
-                    dp[i][j] = skip_source_score
-                    parent[i][j] = (i, j-1)
-                else:
-                    dp[i][j] = skip_target_score
-                    parent[i][j] = (i-1, j)
-        
-        # 回溯找到最佳对齐路径
-        alignment = []
-        i, j = n, m
-        
-        while i > 0 and j > 0:
-            prev_i, prev_j = parent[i][j]
-            
-            if prev_i == i - 1 and prev_j == j - 1:
-                # 匹配
-                similarity = self.calculate_similarity(target_words[i-1], processed_source[j-1][0])
-                if similarity >= threshold:
-                    alignment.append({
-                        'target_word': target_words[i-1],
-                        'source_word': processed_source[j-1][0],
-                        'original_word': source_words[j-1][0],
-                        'start': processed_source[j-1][1],
-                        'end': processed_source[j-1][2],
-                        'confidence': similarity
-                    })
-            
-            i, j = prev_i, prev_j
-        
-        alignment.reverse()
-        return alignment
-    
-    def fuzzy_match_fallback(self, target_text: str, source_words: List[Tuple[str, float, float]], 
-                            threshold: float = 0.4) -> List[Dict]:
-        """模糊匹配作为后备方案"""
-        target_words = self.chinese_tokenize(target_text)
-        if not target_words:
-            return []
-        
-        matched_words = []
-        used_indices = set()
-        
-        for target_word in target_words:
-            best_match = None
-            best_score = 0
-            best_index = -1
-            
-            for i, (source_word, start, end) in enumerate(source_words):
-                if i in used_indices:
-                    continue
-                
-                processed_source = self.preprocess_text(source_word)
-                similarity = self.calculate_similarity(target_word, processed_source)
-                
-                if similarity > best_score and similarity >= threshold:
-                    best_match = {
-                        'target_word': target_word,
-                        'source_word': processed_source,
-                        'original_word': source_word,
-                        'start': start,
-                        'end': end,
-                        'confidence': similarity
-                    }
-                    best_score = similarity
-                    best_index = i
-            
-            if best_match:
-                matched_words.append(best_match)
-                used_indices.add(best_index)
-        
-        return matched_words
-    
-    def interpolate_timing(self, alignment_result: List[Dict], unit_text: str) -> Tuple[float, float]:
-        """时间插值优化"""
-        if not alignment_result:
-            return 0.0, 0.0
-        
-        # 基本时间边界
-        start_time = alignment_result[0]['start']
-        end_time = alignment_result[-1]['end']
-        
-        # 计算平均每字符时间
-        total_chars = sum(len(item['target_word']) for item in alignment_result)
-        if total_chars > 0:
-            char_duration = (end_time - start_time) / total_chars
-            
-            # 根据完整文本长度调整
-            full_text_chars = len(self.preprocess_text(unit_text))
-            if full_text_chars > total_chars:
-                # 如果完整文本更长，扩展时间
-                additional_time = (full_text_chars - total_chars) * char_duration
-                end_time += additional_time * 0.5  # 保守扩展
-        
-        return start_time, end_time
-    
-    def smooth_timestamps(self, segments: List[Dict], smooth_factor: float = 0.1) -> List[Dict]:
-        """平滑时间戳，避免重叠"""
-        if len(segments) <= 1:
-            return segments
-        
-        smoothed = []
-        for i, segment in enumerate(segments):
-            current_segment = segment.copy()
-            
-            if i == 0:
-                smoothed.append(current_segment)
-                continue
-            
-            # 检查与前一个段的重叠
-            prev_end = smoothed[-1]['end']
-            current_start = current_segment['start']
-            
-            if current_start < prev_end:
-                # 存在重叠，调整边界
-                gap = prev_end - current_start
-                mid_point = prev_end - gap * smooth_factor
-                
-                smoothed[-1]['end'] = mid_point
-                current_segment['start'] = mid_point
-            
-            smoothed.append(current_segment)
-        
-        return smoothed
-
-# 改进的对齐函数
-def improved_align_segments(transcript: List[DialogueUnit], align_words: List, 
-                           audio_duration: float) -> List[Dict]:
-    """改进的段落对齐函数"""
-    
-    aligner = ImprovedAlignment()
-    words = [(w.word, w.time_start, w.time_end) for w in align_words]
-    segments = []
-    
-    if not words:
-        return segments
-    
-    # 预处理所有词语
-    processed_words = []
-    for word, start, end in words:
-        processed_word = aligner.preprocess_text(word)
-        if processed_word:
-            processed_words.append((word, start, end))
-    
-    current_word_index = 0
-    
-    for unit in transcript:
-        if not unit.text.strip():
-            continue
-        
-        # 获取可用的词语
-        available_words = processed_words[current_word_index:]
-        if not available_words:
-            print(f"警告: 没有更多词语可用于对齐 '{unit.text}'")
-            break
-        
-        # 首先尝试序列对齐
-        alignment_result = aligner.sequence_alignment(unit.text, available_words, threshold=0.3)
-        
-        if alignment_result:
-            # 序列对齐成功
-            start_time, end_time = aligner.interpolate_timing(alignment_result, unit.text)
-            
-            # 计算平均置信度
-            avg_confidence = sum(item['confidence'] for item in alignment_result) / len(alignment_result)
-            
-            # 更新当前词索引
-            if alignment_result:
-                last_word = alignment_result[-1]['original_word']
-                for i, (word, _, _) in enumerate(available_words):
-                    if word == last_word:
-                        current_word_index += i + 1
-                        break
-            
-            print(f"序列对齐成功: '{unit.text}' -> {start_time:.2f}-{end_time:.2f}s (置信度: {avg_confidence:.2f})")
-            
-        else:
-            # 序列对齐失败，使用模糊匹配
-            matched_words = aligner.fuzzy_match_fallback(unit.text, available_words, threshold=0.4)
-            
-            if matched_words:
-                start_time = matched_words[0]['start']
-                end_time = matched_words[-1]['end']
-                
-                # 更新当前词索引
-                last_word = matched_words[-1]['original_word']
-                for i, (word, _, _) in enumerate(available_words):
-                    if word == last_word:
-                        current_word_index += i + 1
-                        break
-                
-                avg_confidence = sum(item['confidence'] for item in matched_words) / len(matched_words)
-                print(f"模糊匹配成功: '{unit.text}' -> {start_time:.2f}-{end_time:.2f}s (置信度: {avg_confidence:.2f})")
-            else:
-                print(f"警告: 无法对齐文本 '{unit.text}'，跳过")
-                continue
-        
-        # 确保时间合理性
-        start_time = max(0, start_time)
-        end_time = min(audio_duration, max(start_time + 0.1, end_time))
-        
-        if start_time < end_time:
-            segments.append({
-                "start": start_time,
-                "end": end_time,
-                "text": unit.text,
-                "model_name": unit.model_name,
-                "emotion": unit.emotion,
-                "speed_facter": unit.speed_facter,
-                "text_lang": unit.text_lang
-            })
-    
-    # 应用时间平滑
-    segments = aligner.smooth_timestamps(segments, smooth_factor=0.1)
-    
-    return segments
-
-def pad_audio_if_needed(audio: np.ndarray, target_sr: int = 16000, min_duration: float = 0.5) -> np.ndarray:
-    """
-    如果音频太短，进行填充处理
-    """
-    min_samples = int(target_sr * min_duration)
-    
-    if len(audio) < min_samples:
-        # 如果音频极短，用静音填充
-        if len(audio) < target_sr * 0.1:  # 少于0.1秒
-            pad_length = min_samples - len(audio)
-            audio = np.pad(audio, (0, pad_length), mode='constant', constant_values=0)
-        else:
-            # 如果音频较短但有内容，重复音频内容
-            repeat_count = int(np.ceil(min_samples / len(audio)))
-            audio = np.tile(audio, repeat_count)[:min_samples]
-    
-    return audio
-
-def ensure_nltk_data():
-    """确保NLTK数据可用"""
-    try:
-        nltk.data.find('tokenizers/punkt')
-        nltk.data.find('taggers/averaged_perceptron_tagger')
-    except LookupError:
-        print("下载NLTK数据...")
-        nltk.download('punkt', quiet=True)
-        nltk.download('punkt_tab', quiet=True)
-        nltk.download('averaged_perceptron_tagger', quiet=True)
-        nltk.download('averaged_perceptron_tagger_eng', quiet=True)
-
-def convert_audio_to_wav(audio_data: bytes, target_sr: int = 16000) -> Tuple[np.ndarray, str]:
-    """
-    转换音频数据为WAV格式
-    """
-    import librosa
-    
-    # 创建临时文件
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-        temp_file.write(audio_data)
-        temp_input_path = temp_file.name
-    
-    try:
-        # 使用librosa加载音频
-        audio, sr = librosa.load(temp_input_path, sr=target_sr)
-        
-        # 音频增强
-        audio = librosa.effects.preemphasis(audio)  # 预加重
-        audio = librosa.util.normalize(audio)  # 归一化
-        
-        # 创建输出临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as output_file:
-            temp_output_path = output_file.name
-        
-        # 保存处理后的音频
-        sf.write(temp_output_path, audio, target_sr)
-        
-        return audio, temp_output_path
-        
-    finally:
-        # 清理输入临时文件
-        if os.path.exists(temp_input_path):
-            os.unlink(temp_input_path)
-
-# 主要的对齐API函数
-async def align_audio_text(req: AlignRequest):
-    """
-    完整的音频文本对齐函数
-    """
-    temp_files = []
-    
-    try:
-        # 解析 transcript_text
-        if req.transcript_text:
-            transcript_list = json.loads(req.transcript_text)
-            req.transcript = [DialogueUnit(**item) for item in transcript_list]
-        elif req.transcript is None:
-            req.transcript = []
-
-        # 下载音频
-        print("正在下载音频文件...")
-        async with aiohttp.ClientSession() as session:
-            async with session.get(req.audio_url) as response:
-                if response.status != 200:
-                    return {"error": f"下载失败，HTTP状态码: {response.status}"}
-                
-                audio_data = await response.read()
-                content_type = response.headers.get('content-type', '')
-                print(f"下载完成，文件大小: {len(audio_data)} bytes, Content-Type: {content_type}")
-
-        # 检查文件大小
-        if len(audio_data) < 1000:
-            return {"error": "音频文件过小，可能下载不完整"}
-
-        # 转换音频格式
-        print("正在转换音频格式...")
-        try:
-            audio, temp_wav_path = convert_audio_to_wav(audio_data, target_sr=16000)
-            temp_files.append(temp_wav_path)
-        except Exception as e:
-            return {"error": f"音频格式转换失败: {str(e)}"}
-
-        # 获取音频信息
-        duration = len(audio) / 16000
-        print(f"音频信息: {len(audio)} samples, {duration:.2f}s, 采样率: 16000Hz")
-        
-        # 检查音频长度
-        MIN_DURATION = 0.3
-        if duration < MIN_DURATION:
-            return {"error": f"音频文件过短（{duration:.2f}s），需要至少 {MIN_DURATION}s"}
-        
-        # 对短音频进行填充
-        if duration < 1.0:
-            audio = pad_audio_if_needed(audio, target_sr=16000, min_duration=1.0)
-            sf.write(temp_wav_path, audio, 16000)
-            duration = len(audio) / 16000
-            print(f"音频已填充至 {duration:.2f}s")
-
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"使用设备: {device}")
-
-        # ASR 转录
-        compute_type = "float16" if device == "cuda" else "float32"
-        
-        try:
-            print("正在加载 WhisperX 模型...")
-            model = whisperx.load_model("large-v3", device=device, compute_type=compute_type)
-            
-            print("正在进行 ASR 转录...")
-            result = model.transcribe(
-                audio, 
-                batch_size=4,
-                chunk_size=6,
-                print_progress=True
-            )
-            
-            if not result.get("segments"):
-                return {"error": "ASR 转录失败，未检测到语音内容"}
-            
-            detected_language = result.get("language", "zh")
-            print(f"检测到的语言: {detected_language}")
-            
-            # 加载对齐模型
-            print("正在加载对齐模型...")
-            if detected_language == "zh":
-                model_name = "jonatasgrosman/wav2vec2-large-xlsr-53-chinese-zh-cn"
-            else:
-                model_name = None
-            
-            if model_name:
-                try:
-                    align_model, metadata = whisperx.load_align_model(
-                        language_code=detected_language,
-                        device=device,
-                        model_name=model_name
-                    )
-                except:
-                    print("指定模型加载失败，使用默认模型")
-                    align_model, metadata = whisperx.load_align_model(
-                        language_code=detected_language,
-                        device=device
-                    )
-            else:
-                align_model, metadata = whisperx.load_align_model(
-                    language_code=detected_language,
-                    device=device
-                )
-            
-            print("正在进行强制对齐...")
-            aligned = whisperx.align(
-                result["segments"], 
-                align_model, 
-                metadata, 
-                audio, 
-                device=device,
-                return_char_alignments=True,
-                
-            )
-            
-        except Exception as e:
-            return {"error": f"ASR/对齐处理失败: {str(e)}"}
-
-        # 提取ASR文本
-        asr_segments = aligned["segments"]
-        if not asr_segments:
-            return {"error": "对齐失败，未获得有效的语音段"}
-            
-        asr_text = " ".join([seg["text"] for seg in asr_segments])
-        print(f"ASR 识别文本: {asr_text}")
-
-        # 使用 ForceAlign 进行整体对齐
-        ref_text = " ".join([u.text for u in req.transcript])
-        if not ref_text.strip():
-            return {"error": "参考文本为空"}
-            
-        print(f"参考文本: {ref_text}")
-        
-        try:
-            ensure_nltk_data()
-            
-            print("正在进行 ForceAlign 对齐...")
-            fa = ForceAlign(audio_file=temp_wav_path, transcript=ref_text)
-            align_words = fa.inference()
-            
-            if not align_words:
-                return {"error": "ForceAlign 对齐失败"}
-                
-        except Exception as e:
-            return {"error": f"ForceAlign 处理失败: {str(e)}"}
-
-        # 使用改进的对齐算法
-        print("正在使用改进算法进行段落对齐...")
-        segments = improved_align_segments(req.transcript, align_words, duration)
-        
-        print(f"成功处理 {len(segments)} 个语音段")
-        
-        # 输出详细信息
-        for i, segment in enumerate(segments):
-            print(f"段落 {i+1}: {segment['start']:.2f}-{segment['end']:.2f}s | {segment['text']}")
-        
-        return {"segments": segments}
-        
-    except Exception as e:
-        print(f"处理过程中发生错误: {str(e)}")
-        return {"error": f"处理过程中发生错误: {str(e)}"}
-        
-    finally:
-        # 清理临时文件
-        for temp_file in temp_files:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                    print(f"已清理临时文件: {temp_file}")
-                except Exception as e:
-                    print(f"清理临时文件失败: {e}")
 
 @app.post("/align")
 async def align(req: AlignRequest):
-    return await align_audio_text(req)
+    # 对齐在工作进程中执行，不阻塞事件循环；任务已满时返回429
+    try:
+        return await align_audio_text(req)
+    except AlignQueueFull as e:
+        return JSONResponse(status_code=429, content={"error": str(e)}, headers={"Retry-After": "30"})
+    except AlignTimeout as e:
+        return JSONResponse(status_code=504, content={"error": str(e)})
+
+@app.get("/debug/startup")
+async def get_startup_report():
+    """启动耗时、Web进程各模块的导入耗时和内存增量，以及/align工作进程池的任务数(音频依赖只在工作进程中导入)"""
+    return {"success": True, **get_import_report(), "align_executor": get_align_executor().stats()}
 
 @app.get("/news")
 # 定义一个异步函数news，用于获取新闻
@@ -650,102 +113,126 @@ async def news(
     return await get_news(start, end)
 
 @app.get("/scrape")
-async def scrape(time: str = Query(..., description="时间参数，例如2025-06-29T10:00:00 或任意可识别的时间字符串")):
+async def scrape(time: str = Query(..., description="时间参数，例如2025-06-29T10:00:00 或任意可识别的时间字符串"),
+                 refresh: bool = Query(False, description="忽略缓存，等待重新爬取"),
+                 normalize: bool = Query(False, description="额外返回normalized字段：数值文本转换为数值")):
     try:
         parsed_time = date_parser.parse(time)
     except Exception:
         parsed_time = datetime.now()
 
-    # 记录爬取开始时间
-    scrape_start_time = datetime.now()
-    
-    # 执行数据爬取
-    data = await scrape_financial_data()
-    
-    # 保存数据到MySQL数据库
+    # 从缓存获取数据，过期的数据源在后台刷新，并发请求共享同一次爬取；
+    # 定时刷新开启时由调度器负责刷新，这里只读取最新快照。
+    # 缓存按固定间隔把所有数据源合并成完整快照落库，这里不再写库，避免轮询重复写入旧数据
+    data, sources_meta = await get_scrape_cache().get(
+        force_refresh=refresh,
+        revalidate=not get_scrape_scheduler().running,
+        request_time=parsed_time.isoformat()
+    )
+    # 原始文本保持不变，数值化结果放在单独的字段中
+    normalized = {"normalized": normalize_payload(data)} if normalize else {}
+
+    return {
+        "time": parsed_time.isoformat(),
+        "data": data,
+        "sources": sources_meta,
+        **normalized
+    }
+
+@app.get("/scrape/history")
+async def get_scrape_history(
+    limit: int = Query(10, description="返回记录数量，默认10条；format=ndjson时为导出上限，0表示全部"),
+    cursor: Optional[str] = Query(None, description="上一页返回的next_cursor"),
+    include_children: bool = Query(False, description="是否附带各子表数据"),
+    format: str = Query("json", description="json: 分页返回; ndjson: 逐行流式导出")
+):
+    """获取爬取记录历史，按(scrape_time, id)倒序做游标分页"""
+    db_manager = get_database_manager()
+    if format == "ndjson":
+        def stream():
+            count, last = 0, None
+            batch_size = min(limit + 1, 500) if limit else 500
+            try:
+                for record in db_manager.iter_records(cursor, include_children, batch_size):
+                    if limit and count >= limit:
+                        # 达到上限且还有更多记录时，最后一行给出继续导出用的游标
+                        yield json.dumps({"next_cursor": encode_history_cursor(last["scrape_time"], last["id"])}) + "\n"
+                        break
+                    yield json.dumps(record, ensure_ascii=False) + "\n"
+                    count, last = count + 1, record
+            except Exception as e:
+                print(f"导出爬取记录失败: {e}")
+                yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+    if format != "json":
+        return {"success": False, "error": f"不支持的格式: {format}", "records": []}
+
     try:
-        from database import get_database_manager
-        db_manager = get_database_manager()
-        
-        # 测试数据库连接
-        if db_manager.test_connection():
-            record_id = db_manager.save_scrape_data(
-                scrape_time=scrape_start_time,
-                request_time=time,
-                data=data
-            )
-            
-            if record_id:
-                print(f"数据已保存到数据库，记录ID: {record_id}")
-                # 在返回数据中添加数据库记录信息
-                return {
-                    "time": parsed_time.isoformat(),
-                    "data": data,
-                    "database": {
-                        "saved": True,
-                        "record_id": record_id,
-                        "save_time": scrape_start_time.isoformat()
-                    }
-                }
-            else:
-                print("数据保存到数据库失败")
-                return {
-                    "time": parsed_time.isoformat(),
-                    "data": data,
-                    "database": {
-                        "saved": False,
-                        "error": "数据保存失败"
-                    }
-                }
-        else:
-            print("数据库连接失败，跳过数据保存")
-            return {
-                "time": parsed_time.isoformat(),
-                "data": data,
-                "database": {
-                    "saved": False,
-                    "error": "数据库连接失败"
-                }
-            }
-    except Exception as db_error:
-        print(f"数据库操作异常: {db_error}")
-        # 即使数据库保存失败，也要返回爬取的数据
+        records, next_cursor = await db_manager.get_records_page_async(limit, cursor, include_children)
+        return {
+            "success": True,
+            "records": records,
+            "count": len(records),
+            "next_cursor": next_cursor
+        }
+    except Exception as e:
         return {
-            "time": parsed_time.isoformat(),
-            "data": data,
-            "database": {
-                "saved": False,
-                "error": str(db_error)
-            }
+            "success": False,
+            "error": str(e),
+            "records": []
         }
 
-@app.get("/scrape/history")
-async def get_scrape_history(limit: int = Query(10, description="返回记录数量，默认10条")):
-    """获取最近的爬取记录历史"""
+@app.get("/scrape/latest")
+async def get_scrape_latest(
+    source: Optional[str] = Query(None, description="数据源 macro/crypto/turnover/a_stock，默认全部"),
+    indicator: Optional[str] = Query(None, description="指标代码，如 DXY、BTC、SH、上涨家数")
+):
+    """最近一次爬取的汇总及各指标最新值，读取内存中的最新快照索引"""
     try:
-        from database import get_database_manager
         db_manager = get_database_manager()
-        
-        if db_manager.test_connection():
-            records = db_manager.get_recent_records(limit=limit)
-            return {
-                "success": True,
-                "records": records,
-                "count": len(records)
-            }
-        else:
-            return {
-                "success": False,
-                "error": "数据库连接失败",
-                "records": []
-            }
+        latest = await db_manager.get_latest_values_async(source, indicator)
+        return {"success": True, **latest}
     except Exception as e:
         return {
             "success": False,
-            "error": str(e),
-            "records": []
+            "error": str(e)
         }
 
+@app.get("/timeseries")
+async def get_timeseries(
+    indicator: str = Query(..., description="指标代码，如 DXY、BTC、SH、上涨家数"),
+    start: Optional[str] = Query(None, alias="from", description="起始时间，默认24小时前"),
+    end: Optional[str] = Query(None, alias="to", description="结束时间，默认当前时间"),
+    interval: str = Query("5m", description="降采样时间桶，如 30s、5m、1h、1d"),
+    agg: str = Query("ohlc", description="ohlc: 每个桶的开高低收; last: 每个桶的最后一个值"),
+    source: Optional[str] = Query(None, description="数据源 macro/crypto/turnover/a_stock，默认按指标推断")
+):
+    """按时间桶降采样的指标序列，以NDJSON逐行流式返回"""
+    try:
+        end_time = date_parser.parse(end) if end else datetime.now()
+        start_time = date_parser.parse(start) if start else end_time - timedelta(days=1)
+        interval_seconds = parse_interval(interval)
+        db_manager = get_database_manager()
+        source = db_manager.resolve_timeseries_source(indicator, source)
+        if agg not in ("ohlc", "last"):
+            raise ValueError(f"不支持的聚合方式: {agg}")
+    except (ValueError, OverflowError) as e:
+        return {"success": False, "error": str(e)}
+
+    def stream():
+        try:
+            # 已归档为Parquet的月份直接读取归档文件
+            for point in iter_timeseries_with_archive(db_manager, indicator, start_time, end_time,
+                                                      interval_seconds, source, agg):
+                yield json.dumps(point, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print(f"查询时间序列失败: {e}")
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+
+    # 同步生成器由Starlette在线程池中迭代，不阻塞事件循环
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 async def download_audio_and_get_duration(audio_url: str) -> Tuple[bytes, float]:
     """下载音频并获取时长"""
     async with aiohttp.ClientSession() as session:
@@ -762,6 +249,7 @@ async def download_audio_and_get_duration(audio_url: str) -> Tuple[bytes, float]
     
     try:
         # 加载音频获取时长
+        librosa = await asyncio.to_thread(timed_import, "librosa")
         audio, sr = librosa.load(temp_path, sr=None)
         duration = len(audio) / sr
         return audio_data, duration
@@ -1083,4 +571,74 @@ async def generate_video_with_audio(request: VideoGenerationRequest):
                     os.unlink(temp_file)
                     print(f"已清理临时文件: {temp_file}")
                 except Exception as e:
-                    print(f"清理临时文件失败: {e}")
\ No newline at end of file
+                    print(f"清理临时文件失败: {e}")
+
+# 长任务的异步接口：提交后立即返回job_id，通过状态/结果接口或SSE获取进度，结果保存在本地SQLite
+async def _submit_job(kind: str, request: BaseModel, run, is_success, on_done=None):
+    job = await get_job_manager().submit(kind, jsonable_encoder(request), run, is_success, on_done)
+    return JSONResponse(status_code=202, content={"success": True, "job": job})
+
+@app.post("/jobs/align")
+async def submit_align_job(req: AlignRequest):
+    # 提交时即占用对齐名额，直到任务结束才归还；名额已满时直接返回429，不创建任务
+    executor = get_align_executor()
+    try:
+        executor.reserve()
+    except AlignQueueFull as e:
+        return JSONResponse(status_code=429, content={"success": False, "error": str(e)},
+                            headers={"Retry-After": "30"})
+    return await _submit_job("align", req, lambda: align_audio_text(req, reserved=True),
+                             lambda result: "error" not in result, on_done=executor.release)
+
+@app.post("/jobs/generate-video")
+async def submit_generate_video_job(request: VideoGenerationRequest):
+    async def run():
+        return jsonable_encoder(await generate_video(request))
+    return await _submit_job("generate-video", request, run, lambda result: result["success"])
+
+@app.post("/jobs/generate-video-with-audio")
+async def submit_generate_video_with_audio_job(request: VideoGenerationRequest):
+    async def run():
+        return jsonable_encoder(await generate_video_with_audio(request))
+    return await _submit_job("generate-video-with-audio", request, run, lambda result: result["success"])
+
+@app.get("/jobs")
+async def list_jobs(
+    kind: Optional[str] = Query(None, description="任务类型: align / generate-video / generate-video-with-audio"),
+    limit: int = Query(50, ge=1, le=500, description="返回条数")
+):
+    return {"success": True, "jobs": await get_job_manager().list(kind, limit)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """任务状态，不含请求参数和结果"""
+    job = await get_job_manager().get(job_id, include_payload=False)
+    if job is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "任务不存在"})
+    return {"success": True, "job": job}
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """任务结果，任务未结束时返回当前状态"""
+    job = await get_job_manager().get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "任务不存在"})
+    if job["status"] not in FINISHED_STATUSES:
+        return JSONResponse(status_code=202, content={"success": False, "job": job, "error": "任务尚未完成"})
+    return {"success": job["status"] == SUCCEEDED, "job": job}
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str):
+    """任务状态变化的SSE事件流，任务结束后关闭；空闲时定期发送注释行保持连接"""
+    manager = get_job_manager()
+    if await manager.get(job_id, include_payload=False) is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "任务不存在"})
+
+    async def stream():
+        async for event in manager.events(job_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: status\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,300 @@
+"""
+Playwright浏览器池
+进程内只启动一个Chromium实例，按需分发预热好的context/page，
+context在使用N次后或崩溃时自动回收重建
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from playwright.async_api import async_playwright, Error as PlaywrightError
+
+from resource_profiles import apply_resource_profile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36 Edg/138.0.0.0"
+
+# 回收context时保存cookies，新context加载，替代原来的持久化user_data目录
+STORAGE_STATE_PATH = os.path.join("user_data", "storage_state.json")
+
+
+def _read_storage_state() -> dict:
+    with open(STORAGE_STATE_PATH, encoding="utf-8") as f:
+        storage_state = json.load(f)
+    if not isinstance(storage_state, dict):
+        raise ValueError("storage_state不是JSON对象")
+    return storage_state
+
+
+def _write_storage_state(storage_state: dict):
+    directory = os.path.dirname(STORAGE_STATE_PATH)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".storage_state.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(storage_state, f)
+        os.replace(tmp_path, STORAGE_STATE_PATH)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class PoolWaitTracker:
+    """
+    累计一个任务(及其子任务)等待池中空闲page的时间，调用方据此把排队时间排除在超时之外。
+    子任务并发等待时重叠的部分只计一次
+    """
+
+    def __init__(self):
+        self._waited = 0.0
+        self._waiting = 0
+        self._since = 0.0
+
+    def begin(self):
+        if self._waiting == 0:
+            self._since = time.monotonic()
+        self._waiting += 1
+
+    def end(self):
+        self._waiting -= 1
+        if self._waiting == 0:
+            self._waited += time.monotonic() - self._since
+
+    @property
+    def waited(self) -> float:
+        """累计等待秒数，包括正在进行的等待"""
+        if self._waiting:
+            return self._waited + time.monotonic() - self._since
+        return self._waited
+
+
+# 当前任务的等待计时器，由调用方设置，page()在等待空闲page期间计时
+pool_wait_tracker: ContextVar[Optional[PoolWaitTracker]] = ContextVar("pool_wait_tracker", default=None)
+
+
+class _PooledContext:
+    """池中的单个context及其使用统计"""
+
+    def __init__(self, context):
+        self.context = context
+        self.uses = 0
+        self.broken = False
+
+
+class BrowserPool:
+    """进程级共享的浏览器/context池"""
+
+    def __init__(self, headless: bool = True, max_contexts: int = 4, max_uses: int = 20, warm_contexts: int = 1):
+        """
+        Args:
+            headless: 是否无头模式
+            max_contexts: 同时借出的context上限
+            max_uses: 单个context最多使用次数，超过后关闭重建
+            warm_contexts: 启动时预先创建的context数量
+        """
+        self.headless = headless
+        self.max_contexts = max_contexts
+        self.max_uses = max_uses
+        self.warm_contexts = warm_contexts
+
+        self._playwright = None
+        self._browser = None
+        self._idle: List[_PooledContext] = []
+        self._semaphore = asyncio.Semaphore(max_contexts)
+        # _lock保护浏览器的启动和重启，_start_lock保证并发的首次调用只启动一次playwright
+        self._lock = asyncio.Lock()
+        self._start_lock = asyncio.Lock()
+        # 多个context同时回收时串行写storage_state文件
+        self._state_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._playwright is not None
+
+    async def start(self):
+        """启动playwright和浏览器，并预热context；重复调用或并发调用时只启动一次"""
+        if self.started:
+            return
+        async with self._start_lock:
+            if self.started:
+                return
+            self._playwright = await async_playwright().start()
+            try:
+                await self._ensure_browser()
+                for _ in range(self.warm_contexts):
+                    self._idle.append(_PooledContext(await self._new_context()))
+            except BaseException:
+                # 启动失败时恢复到未启动状态，下次调用重新启动
+                await self.stop()
+                raise
+        logger.info(f"浏览器池已启动: headless={self.headless}, max_contexts={self.max_contexts}, max_uses={self.max_uses}")
+
+    async def stop(self):
+        """关闭所有context和浏览器"""
+        if not self.started:
+            return
+        for pooled in self._idle:
+            await self._close_context(pooled)
+        self._idle.clear()
+        try:
+            if self._browser:
+                await self._browser.close()
+        except Exception as e:
+            logger.warning(f"关闭浏览器时出错: {e}")
+        self._browser = None
+        await self._playwright.stop()
+        self._playwright = None
+        logger.info("浏览器池已关闭")
+
+    async def _ensure_browser(self):
+        """确保浏览器处于连接状态，崩溃后自动重新启动"""
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                logger.warning("浏览器连接已断开，正在重新启动...")
+                self._idle.clear()
+            self._browser = await self._playwright.chromium.launch(
+                headless=self.headless,
+                args=['--no-sandbox', '--disable-dev-shm-usage']
+            )
+            self._browser.on("disconnected", self._on_browser_disconnected)
+            return self._browser
+
+    def _on_browser_disconnected(self, browser):
+        logger.warning("浏览器进程已退出，池中的context将全部重建")
+        for pooled in self._idle:
+            pooled.broken = True
+
+    async def _new_context(self):
+        browser = await self._ensure_browser()
+        options = {
+            "user_agent": DEFAULT_USER_AGENT,
+            "viewport": {"width": 1920, "height": 1080},
+        }
+        storage_state = await self._load_storage_state()
+        if storage_state is not None:
+            try:
+                return await browser.new_context(storage_state=storage_state, **options)
+            except PlaywrightError as e:
+                logger.warning(f"加载 {STORAGE_STATE_PATH} 创建context失败，改用空白context: {e}")
+        return await browser.new_context(**options)
+
+    async def _load_storage_state(self) -> Optional[dict]:
+        """读取保存的cookies，文件不存在或已损坏时返回None"""
+        async with self._state_lock:
+            if not os.path.exists(STORAGE_STATE_PATH):
+                return None
+            try:
+                return await asyncio.to_thread(_read_storage_state)
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取 {STORAGE_STATE_PATH} 失败，改用空白context: {e}")
+                return None
+
+    async def _save_storage_state(self, context):
+        """写入临时文件后原子替换，并发回收或中途退出都不会留下不完整的文件"""
+        async with self._state_lock:
+            storage_state = await context.storage_state()
+            await asyncio.to_thread(_write_storage_state, storage_state)
+
+    async def _close_context(self, pooled: _PooledContext):
+        try:
+            if not pooled.broken:
+                await self._save_storage_state(pooled.context)
+            await pooled.context.close()
+        except Exception as e:
+            logger.debug(f"关闭context时出错: {e}")
+
+    async def _acquire_context(self) -> _PooledContext:
+        while self._idle:
+            pooled = self._idle.pop()
+            if not pooled.broken and self._browser is not None and self._browser.is_connected():
+                return pooled
+            await self._close_context(pooled)
+        return _PooledContext(await self._new_context())
+
+    async def _release_context(self, pooled: _PooledContext):
+        pooled.uses += 1
+        if pooled.broken or pooled.uses >= self.max_uses:
+            logger.info(f"回收context (已使用{pooled.uses}次, 崩溃={pooled.broken})")
+            await self._close_context(pooled)
+        else:
+            self._idle.append(pooled)
+
+    @asynccontextmanager
+    async def page(self, profile: Optional[str] = "default"):
+        """
+        借出一个page，使用完毕后自动关闭page并归还context
+
+        Args:
+            profile: 资源拦截配置名(见resource_profiles.RESOURCE_PROFILES)，None表示不拦截
+
+        用法:
+            async with get_browser_pool().page(profile="yahoo") as page:
+                await page.goto(url)
+        """
+        if not self.started:
+            await self.start()
+        tracker = pool_wait_tracker.get()
+        if tracker is not None:
+            tracker.begin()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            if tracker is not None:
+                tracker.end()
+        try:
+            pooled = await self._acquire_context()
+            page = None
+            try:
+                page = await pooled.context.new_page()
+                page.on("crash", lambda _: setattr(pooled, "broken", True))
+                await apply_resource_profile(page, profile)
+                yield page
+            except PlaywrightError as e:
+                if "closed" in str(e).lower() or "crash" in str(e).lower():
+                    pooled.broken = True
+                raise
+            finally:
+                if page is not None:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pooled.broken = True
+                await self._release_context(pooled)
+        finally:
+            self._semaphore.release()
+
+
+_browser_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """获取进程级浏览器池实例（使用环境变量配置）"""
+    global _browser_pool
+    if _browser_pool is None:
+        _browser_pool = BrowserPool(
+            headless=os.getenv('BROWSER_HEADLESS', 'true').lower() != 'false',
+            max_contexts=int(os.getenv('BROWSER_POOL_MAX_CONTEXTS', 4)),
+            max_uses=int(os.getenv('BROWSER_POOL_MAX_USES', 20)),
+            warm_contexts=int(os.getenv('BROWSER_POOL_WARM_CONTEXTS', 1))
+        )
+    return _browser_pool
+
+
+async def start_browser_pool():
+    """在应用启动时调用"""
+    await get_browser_pool().start()
+
+
+async def stop_browser_pool():
+    """在应用关闭时调用"""
+    if _browser_pool is not None:
+        await _browser_pool.stop()
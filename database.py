@@ -2,14 +2,20 @@
 数据库连接和数据保存模块
 用于/scrape接口的数据持久化
 """
+import asyncio
+import base64
 import json
 import re
+import threading
+import time
 import traceback
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+from datetime import date, datetime
+from typing import Callable, Dict, Any, Optional, List, Tuple
 from decimal import Decimal
 import pymysql
-from sqlalchemy import create_engine, text
+from number_parsing import extract_numbers, parse_decimal, parse_int
+from payload_codec import LEGACY_CODEC, apply_delta, decode_payload, diff_snapshots, encode_payload
+from sqlalchemy import bindparam, create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 import logging
@@ -18,10 +24,176 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# /timeseries 可查询的数据源: 表、指标列、数值表达式，均有(指标列, created_at)索引
+TIMESERIES_SOURCES = {
+    'macro': {
+        'table': 'global_macro_indicators',
+        'key': 'indicator_code',
+        'value': 'price',
+        'known_keys': ('DXY', 'WTI', 'XAU_USD', 'USD_CNH'),
+    },
+    'crypto': {
+        'table': 'crypto_data',
+        'key': 'crypto_symbol',
+        'value': 'current_price',
+        'known_keys': ('BTC', 'ETH', 'USDT'),
+    },
+    'turnover': {
+        # 早期数据的total_turnover为NULL(查询时跳过)，已有数据库需执行migrations/005_backfill_market_turnover.sql补齐
+        'table': 'market_turnover',
+        'key': 'market_type',
+        'value': 'total_turnover',
+        'known_keys': ('SH', 'SZ'),
+    },
+    'a_stock': {
+        'table': 'a_stock_statistics',
+        'key': 'metric_name',
+        'value': 'CAST(metric_value AS DECIMAL(20,4))',
+        # metric_value为文本，只取纯数值的行
+        'filter': "AND metric_value REGEXP '^-?[0-9]+([.][0-9]+)?$'",
+    },
+}
+
+# /scrape/history 可附带的子表数据: 名称 -> 表名，均有以record_id开头的索引
+HISTORY_CHILD_TABLES = {
+    'global_macro': 'global_macro_indicators',
+    'us_gainers': 'us_stock_gainers',
+    'a_stock': 'a_stock_statistics',
+    'market_turnover': 'market_turnover',
+    'crypto': 'crypto_data',
+}
+
+# 按created_at月分区的表，子表在前，删除过期分区时先删子表
+PARTITIONED_TABLES = (
+    'global_macro_indicators',
+    'us_stock_gainers',
+    'a_stock_statistics',
+    'market_turnover',
+    'crypto_data',
+    'raw_data_backup',
+    'scrape_records',
+)
+
+# 兜底分区，新月份的分区从中拆分出来
+FUTURE_PARTITION = 'p_future'
+
+_INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_interval(interval: str) -> int:
+    """把 30s / 5m / 1h / 1d 解析为秒数"""
+    match = re.fullmatch(r'\s*(\d+)\s*([smhd])\s*', interval or '')
+    if not match:
+        raise ValueError(f"无法解析的interval: {interval}，格式如 30s、5m、1h、1d")
+    return int(match.group(1)) * _INTERVAL_UNITS[match.group(2)]
+
+
+def encode_history_cursor(scrape_time: Any, record_id: int) -> str:
+    """把(scrape_time, id)编码为不透明的分页游标"""
+    if isinstance(scrape_time, datetime):
+        scrape_time = scrape_time.isoformat()
+    return base64.urlsafe_b64encode(f"{scrape_time}|{record_id}".encode('utf-8')).decode('ascii')
+
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析encode_history_cursor生成的游标"""
+    try:
+        scrape_time, _, record_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').partition('|')
+        return datetime.fromisoformat(scrape_time), int(record_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+def apply_snapshot_chain(rows: List[tuple], record_id: int, keyframe_record_id: int) -> Optional[Dict[str, Any]]:
+    """
+    依次解码并应用raw_data_backup中的关键帧和差分，MySQL和Parquet归档的还原共用
+
+    Args:
+        rows: 按record_id排序的(snapshot_type, raw_json, raw_blob, codec)
+        record_id: 要还原的记录，用于错误信息
+        keyframe_record_id: 所属关键帧，用于错误信息
+    """
+    snapshot = None
+    for row_type, raw_json, raw_blob, codec in rows:
+        payload = decode_payload(raw_blob if raw_blob is not None else raw_json, codec)
+        if row_type == 'delta':
+            if snapshot is None:
+                raise ValueError(f"记录 {record_id} 的关键帧 {keyframe_record_id} 缺失，无法还原")
+            snapshot = apply_delta(snapshot, payload)
+        else:
+            snapshot = payload
+    return snapshot
+
+
+def add_months(month_start: date, months: int) -> date:
+    """月初日期加减若干个月"""
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_month(partition_name: str) -> Optional[date]:
+    """由分区名p202501得到该月月初，非月分区返回None"""
+    match = re.fullmatch(r'p(\d{4})(\d{2})', partition_name or '')
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def _jsonable(value: Any) -> Any:
+    """把查询结果中的Decimal / datetime转换为可JSON序列化的值"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _DeltaChain:
+    """原始数据备份的差分链状态：当前关键帧、上一次快照、自关键帧以来的快照数及关键帧所在月份"""
+
+    def __init__(self, keyframe_record_id: Optional[int] = None, previous: Optional[Dict[str, Any]] = None,
+                 count: int = 0, month: Optional[str] = None):
+        self.keyframe_record_id = keyframe_record_id
+        self.previous = previous
+        self.count = count
+        self.month = month
+
+    def copy(self) -> '_DeltaChain':
+        return _DeltaChain(self.keyframe_record_id, self.previous, self.count, self.month)
+
+
+class _LatestIndex:
+    """内存中的最新快照索引：最近一次爬取的汇总信息及(source, indicator)的最新值"""
+
+    def __init__(self, summary: Optional[Dict[str, Any]] = None,
+                 values: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None,
+                 loaded_at: Optional[float] = None):
+        self.summary = summary
+        self.values = values if values is not None else {}
+        # 最近一次从数据库加载的时间(time.monotonic)，None表示尚未加载；
+        # 其他进程的写入只能通过重新加载看到，本进程的写入在提交后直接合并
+        self.loaded_at = loaded_at
+
+    def copy(self) -> '_LatestIndex':
+        return _LatestIndex(self.summary, dict(self.values), self.loaded_at)
+
+    def expired(self, ttl: float) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= ttl
+
+    def update(self, summary: Optional[Dict[str, Any]], entries: List[Dict[str, Any]]):
+        """合并新数据，爬取时间早于现有值的(回放的旧数据)不覆盖"""
+        if summary and (self.summary is None or summary['scrape_time'] >= self.summary['scrape_time']):
+            self.summary = summary
+        for entry in entries:
+            key = (entry['source'], entry['indicator'])
+            current = self.values.get(key)
+            if current is None or entry['scrape_time'] >= current['scrape_time']:
+                self.values[key] = entry
+
+
 class DatabaseManager:
     """数据库管理器"""
     
-    def __init__(self, host='localhost', port=3306, user='root', password='', database='financial_scraper'):
+    def __init__(self, host='localhost', port=3306, user='root', password='', database='financial_scraper',
+                 pool_size=5, max_overflow=10, keyframe_interval=20, latest_ttl=5.0):
         """
         初始化数据库连接
         
@@ -31,12 +203,28 @@ class DatabaseManager:
             user: 数据库用户名
             password: 数据库密码
             database: 数据库名称
+            pool_size: 连接池常驻连接数
+            max_overflow: 连接池允许额外创建的连接数
+            keyframe_interval: 原始数据备份每N次保存一次完整快照，其余只保存与上一次的差异，<=1表示不做差分
+            latest_ttl: 最新快照内存索引的有效期(秒)，过期后读取时重新从数据库加载，
+                多进程部署时其他进程写入的数据最多延迟这么久可见
         """
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.database = database
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.keyframe_interval = keyframe_interval
+        self.latest_ttl = latest_ttl
+        # 差分链状态只在事务提交后更新，写入串行化，保证差分的基准快照一定已落库
+        self._delta_chain = _DeltaChain()
+        self._delta_lock = threading.Lock()
+        # 最新快照索引，与差分链一样在提交后整体替换，读取时无需加锁
+        self._latest = _LatestIndex()
+        # 同一时刻只有一个线程重新加载，其他线程继续读取旧索引
+        self._latest_load_lock = threading.Lock()
         
         # 构建数据库URL
         self.database_url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}?charset=utf8mb4"
@@ -51,8 +239,10 @@ class DatabaseManager:
         try:
             self.engine = create_engine(
                 self.database_url,
-                pool_pre_ping=True,
+                pool_pre_ping=True,  # 借出连接时自动检测并替换失效连接，无需每次请求前SELECT 1
                 pool_recycle=3600,
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
                 echo=False  # 设为True可以看到SQL语句
             )
             self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
@@ -61,6 +251,25 @@ class DatabaseManager:
             logger.error(f"数据库连接初始化失败: {e}")
             raise
     
+    def dispose(self):
+        """关闭连接池中的所有连接"""
+        if self.engine is not None:
+            self.engine.dispose()
+            logger.info("数据库连接池已关闭")
+
+    async def save_scrape_data_async(self, scrape_time: datetime, request_time: str, data: Dict[str, Any]) -> Optional[int]:
+        """在线程池中执行save_scrape_data，避免同步的pymysql阻塞事件循环"""
+        return await asyncio.to_thread(self.save_scrape_data, scrape_time, request_time, data)
+
+    async def get_recent_records_async(self, limit: int = 10) -> List[Dict]:
+        """在线程池中执行get_recent_records"""
+        return await asyncio.to_thread(self.get_recent_records, limit)
+
+    async def get_records_page_async(self, limit: int = 10, cursor: Optional[str] = None,
+                                     include_children: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """在线程池中执行get_records_page"""
+        return await asyncio.to_thread(self.get_records_page, limit, cursor, include_children)
+
     def test_connection(self) -> bool:
         """测试数据库连接"""
         try:
@@ -83,65 +292,164 @@ class DatabaseManager:
         Returns:
             record_id: 主记录ID，失败返回None
         """
-        start_time = datetime.now()
-        session = self.SessionLocal()
-        record_id = None
-        
         try:
-            # 分析数据统计信息
-            total_sources = len(data)
-            successful_sources = sum(1 for v in data.values() if not self._is_error_data(v))
-            failed_sources = total_sources - successful_sources
-            
-            # 1. 插入主记录
-            insert_main_sql = text("""
-                INSERT INTO scrape_records 
-                (scrape_time, request_time, total_data_sources, successful_sources, failed_sources, processing_duration_ms)
-                VALUES (:scrape_time, :request_time, :total_sources, :successful_sources, :failed_sources, :duration)
-            """)
-            
-            processing_duration = int((datetime.now() - start_time).total_seconds() * 1000)
-            
-            result = session.execute(insert_main_sql, {
-                'scrape_time': scrape_time,
-                'request_time': request_time,
-                'total_sources': total_sources,
-                'successful_sources': successful_sources,
-                'failed_sources': failed_sources,
-                'duration': processing_duration
-            })
-            
-            record_id = result.lastrowid
-            logger.info(f"主记录插入成功，ID: {record_id}")
-            
-            # 2. 保存全球宏观指标数据
-            self._save_global_macro_data(session, record_id, data)
-            
-            # 3. 保存美股涨幅榜数据  
-            self._save_us_gainers_data(session, record_id, data)
-            
-            # 4. 保存A股统计数据
-            self._save_a_stock_stats_data(session, record_id, data)
-            
-            # 5. 保存市场成交额数据
-            self._save_market_turnover_data(session, record_id, data)
-            
-            # 6. 保存原始数据备份
-            self._save_raw_data_backup(session, record_id, data)
-            
-            # 提交事务
-            session.commit()
-            logger.info(f"数据保存成功，记录ID: {record_id}")
-            
-            return record_id
-            
+            return self.save_scrape_batch([(scrape_time, request_time, data)])[0]
         except Exception as e:
-            session.rollback()
             logger.error(f"数据保存失败: {e}")
             logger.error(f"错误详情: {traceback.format_exc()}")
             return None
-        finally:
-            session.close()
+
+    def save_scrape_batch(self, snapshots: List[Tuple[datetime, str, Dict[str, Any]]]) -> List[int]:
+        """
+        在一个事务中保存多次爬取数据，失败时回滚并抛出异常，由调用方决定重试
+        
+        Args:
+            snapshots: (scrape_time, request_time, data) 列表
+            
+        Returns:
+            与snapshots顺序一致的主记录ID列表
+        """
+        with self._delta_lock:
+            session = self.SessionLocal()
+            chain = self._delta_chain.copy()
+            latest = self._latest.copy()
+            try:
+                record_ids = [self._save_snapshot(session, *snapshot, chain=chain, latest=latest)
+                              for snapshot in snapshots]
+                # 提交事务
+                session.commit()
+                self._delta_chain = chain
+                self._latest = latest
+                logger.info(f"数据保存成功，记录ID: {record_ids}")
+                return record_ids
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+    def _save_snapshot(self, session, scrape_time: datetime, request_time: str, data: Dict[str, Any],
+                       chain: Optional[_DeltaChain] = None, latest: Optional['_LatestIndex'] = None) -> int:
+        """
+        在当前事务中写入一次爬取数据，返回主记录ID
+        主记录和各子表的created_at都取scrape_time，回放数据库不可用期间暂存的结果时
+        按抓取时间(而非回放时间)进入时间序列和月分区
+        """
+        start_time = datetime.now()
+
+        # 分析数据统计信息
+        total_sources = len(data)
+        successful_sources = sum(1 for v in data.values() if not self._is_error_data(v))
+        failed_sources = total_sources - successful_sources
+        
+        # 1. 插入主记录
+        insert_main_sql = text("""
+            INSERT INTO scrape_records 
+            (scrape_time, request_time, total_data_sources, successful_sources, failed_sources, processing_duration_ms,
+             created_at)
+            VALUES (:scrape_time, :request_time, :total_sources, :successful_sources, :failed_sources, :duration,
+                    :scrape_time)
+        """)
+        
+        processing_duration = int((datetime.now() - start_time).total_seconds() * 1000)
+        
+        result = session.execute(insert_main_sql, {
+            'scrape_time': scrape_time,
+            'request_time': request_time,
+            'total_sources': total_sources,
+            'successful_sources': successful_sources,
+            'failed_sources': failed_sources,
+            'duration': processing_duration
+        })
+        
+        record_id = result.lastrowid
+        logger.info(f"主记录插入成功，ID: {record_id}")
+        
+        # 2. 保存全球宏观指标数据
+        macro_rows = self._save_global_macro_data(session, record_id, data, scrape_time)
+        
+        # 3. 保存美股涨幅榜数据  
+        gainers_rows = self._save_us_gainers_data(session, record_id, data, scrape_time)
+        
+        # 4. 保存A股统计数据
+        a_stock_rows = self._save_a_stock_stats_data(session, record_id, data, scrape_time)
+        
+        # 5. 保存市场成交额数据
+        turnover_rows = self._save_market_turnover_data(session, record_id, data, scrape_time)
+        
+        # 6. 保存加密货币数据
+        crypto_rows = self._save_crypto_data(session, record_id, data, scrape_time)
+        
+        # 7. 保存原始数据备份
+        self._save_raw_data_backup(session, record_id, data, chain, scrape_time)
+        
+        # 8. 更新各指标最新值
+        entries = self._latest_entries(record_id, scrape_time, macro_rows, a_stock_rows, turnover_rows, crypto_rows)
+        self._save_latest_values(session, entries)
+        if latest is not None:
+            latest.update({
+                'id': record_id,
+                'scrape_time': scrape_time,
+                'total_data_sources': total_sources,
+                'successful_sources': successful_sources,
+                'failed_sources': failed_sources,
+                'processing_duration_ms': processing_duration,
+                'macro_indicators_count': len({r['code'] for r in macro_rows if not r['is_error']}),
+                'us_gainers_count': len({r['symbol'] for r in gainers_rows if not r['is_error']}),
+                'a_stock_metrics_count': len({r['metric_name'] for r in a_stock_rows if not r['is_error']}),
+                'market_turnover_count': len({r['market_type'] for r in turnover_rows if not r['is_error']}),
+            }, entries)
+        
+        return record_id
+
+    def _latest_entries(self, record_id: int, scrape_time: datetime, macro_rows: List[Dict[str, Any]],
+                        a_stock_rows: List[Dict[str, Any]], turnover_rows: List[Dict[str, Any]],
+                        crypto_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """由本次写入的子表行得到latest_indicator_values的行，source与TIMESERIES_SOURCES一致"""
+        def entry(source, indicator, value=None, value_text=None, change_percent=None):
+            return {
+                'source': source,
+                'indicator': indicator,
+                'record_id': record_id,
+                'scrape_time': scrape_time,
+                'value': value,
+                'value_text': value_text[:200] if value_text else value_text,
+                'change_percent': change_percent,
+            }
+
+        entries = []
+        for r in macro_rows:
+            if not r['is_error']:
+                entries.append(entry('macro', r['code'], r['price'], r['price_text'], r['change_percent']))
+        for r in crypto_rows:
+            if not r['is_error']:
+                entries.append(entry('crypto', r['symbol'], r['price'], None, r['change_percent']))
+        for r in turnover_rows:
+            if not r['is_error']:
+                entries.append(entry('turnover', r['market_type'], r['total_turnover'], r['turnover_text']))
+        for r in a_stock_rows:
+            # 只保留标量指标，列表类数据(涨停股列表等)不适合作为"最新值"
+            if r['is_error'] or r['additional_info'] is not None:
+                continue
+            value = r['metric_value']
+            number = Decimal(value) if re.fullmatch(r'-?\d+(\.\d+)?', value or '') else None
+            entries.append(entry('a_stock', r['metric_name'], number, value))
+        return entries
+
+    def _save_latest_values(self, session, entries: List[Dict[str, Any]]):
+        """upsert最新值，只有爬取时间不早于已有值时才覆盖(回放的旧数据不会覆盖新数据)"""
+        upsert_sql = text("""
+            INSERT INTO latest_indicator_values 
+            (source, indicator, record_id, scrape_time, value, value_text, change_percent)
+            VALUES (:source, :indicator, :record_id, :scrape_time, :value, :value_text, :change_percent)
+            ON DUPLICATE KEY UPDATE
+                record_id = IF(VALUES(scrape_time) >= scrape_time, VALUES(record_id), record_id),
+                value = IF(VALUES(scrape_time) >= scrape_time, VALUES(value), value),
+                value_text = IF(VALUES(scrape_time) >= scrape_time, VALUES(value_text), value_text),
+                change_percent = IF(VALUES(scrape_time) >= scrape_time, VALUES(change_percent), change_percent),
+                scrape_time = GREATEST(scrape_time, VALUES(scrape_time))
+        """)
+        self._executemany(session, upsert_sql, entries)
     
     def _is_error_data(self, data: Any) -> bool:
         """判断数据是否为错误数据"""
@@ -149,41 +457,17 @@ class DatabaseManager:
             return 'error' in data
         return False
     
-    def _safe_decimal(self, value: str, default: Optional[Decimal] = None) -> Optional[Decimal]:
-        """安全转换为Decimal类型"""
-        if not value:
-            return default
-        try:
-            # 先尝试提取百分比数字
-            if '%' in str(value):
-                percent_match = re.search(r'([+-]?\d+\.?\d*)%', str(value))
-                if percent_match:
-                    return Decimal(percent_match.group(1))
-            
-            # 移除非数字字符（保留小数点和负号）
-            clean_value = re.sub(r'[^\d.-]', '', str(value))
-            if clean_value:
-                return Decimal(clean_value)
-        except:
-            pass
-        return default
-    
-    def _safe_int(self, value: str, default: Optional[int] = None) -> Optional[int]:
-        """安全转换为int类型"""
-        if not value:
-            return default
-        try:
-            clean_value = re.sub(r'[^\d-]', '', str(value))
-            if clean_value:
-                return int(clean_value)
-        except:
-            pass
-        return default
-    
-    def _save_global_macro_data(self, session, record_id: int, data: Dict[str, Any]):
-        """保存全球宏观指标数据"""
+    def _executemany(self, session, sql, rows: List[Dict[str, Any]], created_at: Optional[datetime] = None):
+        """一次executemany写入多行，没有数据时跳过；created_at为None时由数据库取当前时间"""
+        if rows:
+            session.execute(sql, [dict(row, created_at=created_at) for row in rows])
+
+    def _save_global_macro_data(self, session, record_id: int, data: Dict[str, Any],
+                                created_at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """保存全球宏观指标数据，返回写入的行"""
         # 全球宏观指标的key列表
         macro_keys = ['DXY', 'WTI', 'XAU_USD', 'USD_CNH']
+        rows = []
         
         for key in macro_keys:
             if key in data:
@@ -200,26 +484,13 @@ class DatabaseManager:
                 if not is_error:
                     price_text = item_data.get('price', '')
                     change_text = item_data.get('涨跌幅', '')
-                    price = self._safe_decimal(price_text)
-                    
+                    price = parse_decimal(price_text)
                     # 解析涨跌幅百分比
-                    if change_text:
-                        percent_match = re.search(r'([+-]?\d+\.?\d*)%', change_text)
-                        if percent_match:
-                            change_percent = self._safe_decimal(percent_match.group(1))
+                    change_percent = parse_decimal(change_text, percent=True)
                 else:
                     error_msg = item_data.get('error', '')
                 
-                # 插入数据
-                insert_sql = text("""
-                    INSERT INTO global_macro_indicators 
-                    (record_id, indicator_code, indicator_name, price, price_text, 
-                     change_percent, change_percent_text, is_error, error_message)
-                    VALUES (:record_id, :code, :name, :price, :price_text, 
-                            :change_percent, :change_text, :is_error, :error_msg)
-                """)
-                
-                session.execute(insert_sql, {
+                rows.append({
                     'record_id': record_id,
                     'code': key,
                     'name': self._get_indicator_name(key),
@@ -230,9 +501,20 @@ class DatabaseManager:
                     'is_error': is_error,
                     'error_msg': error_msg
                 })
+
+        insert_sql = text("""
+            INSERT INTO global_macro_indicators 
+            (record_id, indicator_code, indicator_name, price, price_text, 
+             change_percent, change_percent_text, is_error, error_message, created_at)
+            VALUES (:record_id, :code, :name, :price, :price_text, 
+                    :change_percent, :change_text, :is_error, :error_msg, COALESCE(:created_at, CURRENT_TIMESTAMP))
+        """)
+        self._executemany(session, insert_sql, rows, created_at)
+        return rows
     
-    def _save_us_gainers_data(self, session, record_id: int, data: Dict[str, Any]):
-        """保存美股涨幅榜数据"""
+    def _save_us_gainers_data(self, session, record_id: int, data: Dict[str, Any],
+                              created_at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """保存美股涨幅榜数据，返回写入的行"""
         # 支持多种可能的key名称
         possible_keys = ['US_stock_gainers', '美股涨幅前五', 'us_gainers']
         gainers_data = None
@@ -244,75 +526,80 @@ class DatabaseManager:
                 used_key = key
                 break
         
-        if gainers_data is not None:
-            if self._is_error_data(gainers_data):
-                # 保存错误信息
-                insert_sql = text("""
-                    INSERT INTO us_stock_gainers 
-                    (record_id, stock_symbol, is_error, error_message, ranking_position)
-                    VALUES (:record_id, 'ERROR', TRUE, :error_msg, 1)
-                """)
-                session.execute(insert_sql, {
-                    'record_id': record_id,
-                    'error_msg': gainers_data.get('error', '') if isinstance(gainers_data, dict) else str(gainers_data)
-                })
-            elif isinstance(gainers_data, list):
-                # 处理list格式的美股数据
-                for i, stock_item in enumerate(gainers_data, 1):
-                    if isinstance(stock_item, dict):
-                        insert_sql = text("""
-                            INSERT INTO us_stock_gainers 
-                            (record_id, stock_symbol, stock_name, current_price, 
-                             price_change, change_percent, volume, ranking_position, is_error)
-                            VALUES (:record_id, :symbol, :name, :price, 
-                                    :price_change, :change_percent, :volume, :ranking, FALSE)
-                        """)
-                        
-                        # 处理中文key映射 - 按字段位置直接匹配
-                        keys = list(stock_item.keys())
-                        
-                        symbol = stock_item.get(keys[1], '') if len(keys) > 1 else ''  # 股票代码
-                        name = stock_item.get(keys[2], '') if len(keys) > 2 else ''    # 股票名称  
-                        price = stock_item.get(keys[3], '') if len(keys) > 3 else ''   # 价格
-                        change = stock_item.get(keys[4], '') if len(keys) > 4 else ''  # 涨跌（点）
-                        change_percent = stock_item.get(keys[5], '') if len(keys) > 5 else ''  # 涨跌百分比
-                        volume = stock_item.get(keys[6], '') if len(keys) > 6 else ''  # 成交量
-                        
-                        session.execute(insert_sql, {
-                            'record_id': record_id,
-                            'symbol': symbol,
-                            'name': name,
-                            'price': self._safe_decimal(price),
-                            'price_change': self._safe_decimal(change),
-                            'change_percent': self._safe_decimal(change_percent),
-                            'volume': self._safe_int(volume),
-                            'ranking': i
-                        })
-            elif isinstance(gainers_data, dict):
-                # 处理dict格式的美股数据（旧格式兼容）
-                for i, (symbol, stock_data) in enumerate(gainers_data.items(), 1):
-                    if isinstance(stock_data, dict):
-                        insert_sql = text("""
-                            INSERT INTO us_stock_gainers 
-                            (record_id, stock_symbol, stock_name, current_price, 
-                             price_change, change_percent, volume, ranking_position, is_error)
-                            VALUES (:record_id, :symbol, :name, :price, 
-                                    :price_change, :change_percent, :volume, :ranking, FALSE)
-                        """)
-                        
-                        session.execute(insert_sql, {
-                            'record_id': record_id,
-                            'symbol': symbol,
-                            'name': stock_data.get('name', ''),
-                            'price': self._safe_decimal(stock_data.get('price')),
-                            'price_change': self._safe_decimal(stock_data.get('change')),
-                            'change_percent': self._safe_decimal(stock_data.get('change_percent')),
-                            'volume': self._safe_int(stock_data.get('volume')),
-                            'ranking': i
-                        })
+        if gainers_data is None:
+            return []
+
+        rows = []
+        if self._is_error_data(gainers_data):
+            # 保存错误信息
+            rows.append({
+                'record_id': record_id,
+                'symbol': 'ERROR',
+                'name': None,
+                'price': None,
+                'price_change': None,
+                'change_percent': None,
+                'volume': None,
+                'ranking': 1,
+                'is_error': True,
+                'error_msg': gainers_data.get('error', '') if isinstance(gainers_data, dict) else str(gainers_data)
+            })
+        elif isinstance(gainers_data, list):
+            # 处理list格式的美股数据
+            for i, stock_item in enumerate(gainers_data, 1):
+                if isinstance(stock_item, dict):
+                    # 处理中文key映射 - 按字段位置直接匹配
+                    keys = list(stock_item.keys())
+                    
+                    symbol = stock_item.get(keys[1], '') if len(keys) > 1 else ''  # 股票代码
+                    name = stock_item.get(keys[2], '') if len(keys) > 2 else ''    # 股票名称  
+                    price = stock_item.get(keys[3], '') if len(keys) > 3 else ''   # 价格
+                    change = stock_item.get(keys[4], '') if len(keys) > 4 else ''  # 涨跌（点）
+                    change_percent = stock_item.get(keys[5], '') if len(keys) > 5 else ''  # 涨跌百分比
+                    volume = stock_item.get(keys[6], '') if len(keys) > 6 else ''  # 成交量
+                    
+                    rows.append({
+                        'record_id': record_id,
+                        'symbol': symbol,
+                        'name': name,
+                        'price': parse_decimal(price),
+                        'price_change': parse_decimal(change),
+                        'change_percent': parse_decimal(change_percent),
+                        'volume': parse_int(volume),
+                        'ranking': i,
+                        'is_error': False,
+                        'error_msg': None
+                    })
+        elif isinstance(gainers_data, dict):
+            # 处理dict格式的美股数据（旧格式兼容）
+            for i, (symbol, stock_data) in enumerate(gainers_data.items(), 1):
+                if isinstance(stock_data, dict):
+                    rows.append({
+                        'record_id': record_id,
+                        'symbol': symbol,
+                        'name': stock_data.get('name', ''),
+                        'price': parse_decimal(stock_data.get('price')),
+                        'price_change': parse_decimal(stock_data.get('change')),
+                        'change_percent': parse_decimal(stock_data.get('change_percent')),
+                        'volume': parse_int(stock_data.get('volume')),
+                        'ranking': i,
+                        'is_error': False,
+                        'error_msg': None
+                    })
+
+        insert_sql = text("""
+            INSERT INTO us_stock_gainers 
+            (record_id, stock_symbol, stock_name, current_price, 
+             price_change, change_percent, volume, ranking_position, is_error, error_message, created_at)
+            VALUES (:record_id, :symbol, :name, :price, 
+                    :price_change, :change_percent, :volume, :ranking, :is_error, :error_msg, COALESCE(:created_at, CURRENT_TIMESTAMP))
+        """)
+        self._executemany(session, insert_sql, rows, created_at)
+        return rows
     
-    def _save_a_stock_stats_data(self, session, record_id: int, data: Dict[str, Any]):
-        """保存A股统计数据"""
+    def _save_a_stock_stats_data(self, session, record_id: int, data: Dict[str, Any],
+                                 created_at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """保存A股统计数据，返回写入的行"""
         # A股相关的数据keys（支持更多实际key）
         a_stock_keys = [
             'Astock_stats', 'stock_updown_summary', 'stock_limit_summary',
@@ -320,6 +607,7 @@ class DatabaseManager:
             'industry_top_gainers', 'industry_top_losers', 'industry_top_inflows',
             'northbound_trade', 'stock_limit_up_list', 'stock_limit_down_list'
         ]
+        rows = []
         
         for key in a_stock_keys:
             if key in data:
@@ -328,98 +616,250 @@ class DatabaseManager:
                 
                 if is_error:
                     # 保存错误信息
-                    insert_sql = text("""
-                        INSERT INTO a_stock_statistics 
-                        (record_id, metric_name, metric_type, is_error, error_message)
-                        VALUES (:record_id, :metric_name, :metric_type, TRUE, :error_msg)
-                    """)
-                    session.execute(insert_sql, {
+                    rows.append({
                         'record_id': record_id,
                         'metric_name': key,
+                        'metric_value': None,
                         'metric_type': 'error',
+                        'additional_info': None,
+                        'is_error': True,
                         'error_msg': stats_data.get('error', '')
                     })
-                else:
+                elif isinstance(stats_data, dict):
                     # 保存统计数据
-                    if isinstance(stats_data, dict):
-                        for metric_name, metric_value in stats_data.items():
-                            insert_sql = text("""
-                                INSERT INTO a_stock_statistics 
-                                (record_id, metric_name, metric_value, metric_type, 
-                                 additional_info, is_error)
-                                VALUES (:record_id, :metric_name, :metric_value, :metric_type, 
-                                        :additional_info, FALSE)
-                            """)
-                            
-                            # 处理复杂数据结构
-                            additional_info = None
-                            if isinstance(metric_value, (dict, list)):
-                                additional_info = json.dumps(metric_value, ensure_ascii=False)
-                                metric_value = str(metric_value)
-                            
-                            session.execute(insert_sql, {
-                                'record_id': record_id,
-                                'metric_name': metric_name,
-                                'metric_value': str(metric_value),
-                                'metric_type': key,
-                                'additional_info': additional_info
-                            })
+                    for metric_name, metric_value in stats_data.items():
+                        # 处理复杂数据结构
+                        additional_info = None
+                        if isinstance(metric_value, (dict, list)):
+                            additional_info = json.dumps(metric_value, ensure_ascii=False)
+                            metric_value = str(metric_value)
+                        
+                        rows.append({
+                            'record_id': record_id,
+                            'metric_name': metric_name,
+                            'metric_value': str(metric_value),
+                            'metric_type': key,
+                            'additional_info': additional_info,
+                            'is_error': False,
+                            'error_msg': None
+                        })
+
+        insert_sql = text("""
+            INSERT INTO a_stock_statistics 
+            (record_id, metric_name, metric_value, metric_type, 
+             additional_info, is_error, error_message, created_at)
+            VALUES (:record_id, :metric_name, :metric_value, :metric_type, 
+                    :additional_info, :is_error, :error_msg, COALESCE(:created_at, CURRENT_TIMESTAMP))
+        """)
+        self._executemany(session, insert_sql, rows, created_at)
+        return rows
     
-    def _save_market_turnover_data(self, session, record_id: int, data: Dict[str, Any]):
-        """保存市场成交额数据"""
-        if 'market_total_turnover' in data:
-            turnover_data = data['market_total_turnover']
-            
-            if self._is_error_data(turnover_data):
-                # 保存错误信息
-                insert_sql = text("""
-                    INSERT INTO market_turnover 
-                    (record_id, market_type, is_error, error_message)
-                    VALUES (:record_id, 'ERROR', TRUE, :error_msg)
-                """)
-                session.execute(insert_sql, {
+    def _save_market_turnover_data(self, session, record_id: int, data: Dict[str, Any],
+                                   created_at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """保存市场成交额数据，返回写入的行"""
+        if 'market_total_turnover' not in data:
+            return []
+
+        turnover_data = data['market_total_turnover']
+        rows = []
+        if self._is_error_data(turnover_data):
+            # 保存错误信息
+            rows.append({
+                'record_id': record_id,
+                'market_type': 'ERROR',
+                'market_name': None,
+                'index_value': None,
+                'index_change_percent': None,
+                'total_turnover': None,
+                'turnover_text': None,
+                'is_error': True,
+                'error_msg': turnover_data.get('error', '')
+            })
+        else:
+            # 保存沪深市场数据
+            for market_key, market_info in turnover_data.items():
+                market_type = 'SH' if '沪市' in market_key else 'SZ' if '深市' in market_key else 'OTHER'
+                # 文本形如 "3450.12 +12.30 +0.36% 5123.45亿"：指数点位、涨跌、涨跌幅、总成交额
+                numbers = extract_numbers(str(market_info))
+                index_value = next((n for n in numbers if not n.unit and not n.percent), None)
+                change_percent = next((n for n in numbers if n.percent), None)
+                turnover = next((n for n in numbers if n.unit in ('万', '亿', '万亿')), None)
+                rows.append({
                     'record_id': record_id,
-                    'error_msg': turnover_data.get('error', '')
+                    'market_type': market_type,
+                    'market_name': market_key,
+                    'index_value': parse_decimal(index_value.text) if index_value else None,
+                    'index_change_percent': parse_decimal(change_percent.text) if change_percent else None,
+                    'total_turnover': parse_decimal(turnover.text) if turnover else None,
+                    'turnover_text': str(market_info),
+                    'is_error': False,
+                    'error_msg': None
                 })
-            else:
-                # 保存沪深市场数据
-                for market_key, market_info in turnover_data.items():
-                    market_type = 'SH' if '沪市' in market_key else 'SZ' if '深市' in market_key else 'OTHER'
-                    
-                    insert_sql = text("""
-                        INSERT INTO market_turnover 
-                        (record_id, market_type, market_name, turnover_text, is_error)
-                        VALUES (:record_id, :market_type, :market_name, :turnover_text, FALSE)
-                    """)
-                    
-                    session.execute(insert_sql, {
-                        'record_id': record_id,
-                        'market_type': market_type,
-                        'market_name': market_key,
-                        'turnover_text': str(market_info)
-                    })
+
+        insert_sql = text("""
+            INSERT INTO market_turnover 
+            (record_id, market_type, market_name, index_value, index_change_percent, 
+             total_turnover, turnover_text, is_error, error_message, created_at)
+            VALUES (:record_id, :market_type, :market_name, :index_value, :index_change_percent, 
+                    :total_turnover, :turnover_text, :is_error, :error_msg, COALESCE(:created_at, CURRENT_TIMESTAMP))
+        """)
+        self._executemany(session, insert_sql, rows, created_at)
+        return rows
+
+    def _save_crypto_data(self, session, record_id: int, data: Dict[str, Any],
+                          created_at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """保存加密货币数据，返回写入的行"""
+        if 'CRYPTOCURRENCY_DATA' not in data:
+            return []
+
+        crypto_data = data['CRYPTOCURRENCY_DATA']
+        rows = []
+        if self._is_error_data(crypto_data) or not isinstance(crypto_data, list):
+            # 保存错误信息
+            rows.append({
+                'record_id': record_id,
+                'symbol': 'ERROR',
+                'name': None,
+                'price': None,
+                'price_change': None,
+                'change_percent': None,
+                'is_error': True,
+                'error_msg': crypto_data.get('error', '') if isinstance(crypto_data, dict) else str(crypto_data)
+            })
+        else:
+            for item in crypto_data:
+                if not isinstance(item, dict):
+                    continue
+                name = item.get('名称 (Name)', '')
+                rows.append({
+                    'record_id': record_id,
+                    'symbol': self._get_crypto_symbol(name),
+                    'name': name,
+                    'price': parse_decimal(item.get('价格 (Price)')),
+                    'price_change': parse_decimal(item.get('24h涨跌值 (Change)')),
+                    'change_percent': parse_decimal(item.get('24h涨跌幅 (%)')),
+                    'is_error': False,
+                    'error_msg': None
+                })
+
+        insert_sql = text("""
+            INSERT INTO crypto_data 
+            (record_id, crypto_symbol, crypto_name, current_price, 
+             price_change_24h, change_percent_24h, is_error, error_message, created_at)
+            VALUES (:record_id, :symbol, :name, :price, 
+                    :price_change, :change_percent, :is_error, :error_msg, COALESCE(:created_at, CURRENT_TIMESTAMP))
+        """)
+        self._executemany(session, insert_sql, rows, created_at)
+        return rows
     
-    def _save_raw_data_backup(self, session, record_id: int, data: Dict[str, Any]):
-        """保存原始数据备份"""
+    def _save_raw_data_backup(self, session, record_id: int, data: Dict[str, Any],
+                              chain: Optional[_DeltaChain] = None, created_at: Optional[datetime] = None):
+        """
+        保存原始数据备份，默认压缩后存入raw_blob，codec见payload_codec
+        
+        每keyframe_interval次保存一个完整快照(keyframe)，其余只保存与上一次快照相比
+        变化/移除的顶层key(delta)，通过reconstruct_snapshot还原；
+        跨月时总是保存关键帧，差分链不跨分区，删除过期分区不会影响之后的快照还原；
+        月份取自created_at(即抓取时间，未传入时取数据库时钟)，与分区依据的时间一致
+        """
         try:
-            raw_json = json.dumps(data, ensure_ascii=False, indent=2)
-            data_size = len(raw_json.encode('utf-8'))
+            if created_at is None:
+                created_at = session.execute(text("SELECT CURRENT_TIMESTAMP")).scalar()
+            month = created_at.strftime('%Y%m')
+            is_keyframe = (chain is None or chain.previous is None or chain.month != month
+                           or self.keyframe_interval <= 1 or chain.count >= self.keyframe_interval)
+            if is_keyframe:
+                snapshot_type, keyframe_record_id = 'keyframe', record_id
+                payload, codec = encode_payload(data)
+            else:
+                snapshot_type, keyframe_record_id = 'delta', chain.keyframe_record_id
+                payload, codec = encode_payload(diff_snapshots(chain.previous, data))
+            raw_json, raw_blob = (payload.decode('utf-8'), None) if codec == LEGACY_CODEC else (None, payload)
             
             insert_sql = text("""
                 INSERT INTO raw_data_backup 
-                (record_id, data_source, raw_json, data_size)
-                VALUES (:record_id, :data_source, :raw_json, :data_size)
+                (record_id, data_source, raw_json, raw_blob, codec, snapshot_type, keyframe_record_id, data_size, created_at)
+                VALUES (:record_id, :data_source, :raw_json, :raw_blob, :codec, :snapshot_type, :keyframe_record_id, :data_size,
+                        :created_at)
             """)
             
             session.execute(insert_sql, {
                 'record_id': record_id,
                 'data_source': 'scrape_api_full',
                 'raw_json': raw_json,
-                'data_size': data_size
+                'raw_blob': raw_blob,
+                'codec': codec,
+                'snapshot_type': snapshot_type,
+                'keyframe_record_id': keyframe_record_id,
+                'data_size': len(payload),
+                'created_at': created_at
             })
+
+            if chain is not None:
+                chain.keyframe_record_id = keyframe_record_id
+                chain.previous = data
+                chain.count = 1 if is_keyframe else chain.count + 1
+                chain.month = month
             
         except Exception as e:
             logger.warning(f"原始数据备份保存失败: {e}")
+            if chain is not None:
+                # 差分链断开，下一次保存完整快照
+                chain.previous = None
+
+    def load_raw_data(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """
+        读取并解码某次爬取的原始数据备份，兼容未压缩的旧数据和差分存储
+        
+        Args:
+            record_id: scrape_records主键
+            
+        Returns:
+            原始爬取数据，不存在时返回None；MySQL中的分区已删除时从Parquet归档还原
+        """
+        snapshot = self.reconstruct_snapshot(record_id)
+        if snapshot is None:
+            # parquet_archive依赖本模块，在此处导入避免循环引用
+            from parquet_archive import get_parquet_archive
+            archive = get_parquet_archive()
+            if archive is not None:
+                snapshot = archive.reconstruct_snapshot(record_id)
+        return snapshot
+
+    def reconstruct_snapshot(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """
+        还原某次爬取的完整数据：读取所属关键帧及其后到record_id为止的差分，依次应用
+        
+        Args:
+            record_id: scrape_records主键
+            
+        Returns:
+            完整的爬取数据，不存在时返回None
+        """
+        session = self.SessionLocal()
+        try:
+            row = session.execute(text("""
+                SELECT snapshot_type, keyframe_record_id FROM raw_data_backup 
+                WHERE record_id = :record_id AND data_source = 'scrape_api_full'
+                ORDER BY id DESC LIMIT 1
+            """), {'record_id': record_id}).fetchone()
+            if row is None:
+                return None
+            snapshot_type, keyframe_record_id = row
+            if snapshot_type != 'delta':
+                keyframe_record_id = record_id
+
+            rows = session.execute(text("""
+                SELECT record_id, snapshot_type, raw_json, raw_blob, codec FROM raw_data_backup 
+                WHERE data_source = 'scrape_api_full'
+                  AND (record_id = :keyframe_record_id
+                       OR (keyframe_record_id = :keyframe_record_id AND record_id <= :record_id))
+                ORDER BY record_id, id
+            """), {'keyframe_record_id': keyframe_record_id, 'record_id': record_id}).fetchall()
+
+            return apply_snapshot_chain([row[1:] for row in rows], record_id, keyframe_record_id)
+        finally:
+            session.close()
     
     def _get_indicator_name(self, code: str) -> str:
         """获取指标中文名称"""
@@ -430,20 +870,57 @@ class DatabaseManager:
             'USD_CNH': '美元离岸人民币'
         }
         return name_map.get(code, code)
+
+    def _get_crypto_symbol(self, name: str) -> str:
+        """由加密货币名称得到符号"""
+        symbol_map = {
+            '比特币 (Bitcoin)': 'BTC',
+            '以太坊 (Ethereum)': 'ETH',
+            '泰达币 (USDT)': 'USDT'
+        }
+        return symbol_map.get(name, name[:20])
     
     def get_recent_records(self, limit: int = 10) -> List[Dict]:
         """获取最近的爬取记录"""
+        try:
+            records, _ = self.get_records_page(limit)
+            return records
+        except Exception as e:
+            logger.error(f"查询最近记录失败: {e}")
+            return []
+
+    def get_records_page(self, limit: int = 10, cursor: Optional[str] = None,
+                         include_children: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """
+        按(scrape_time, id)倒序分页查询爬取记录
+        
+        Args:
+            limit: 每页记录数
+            cursor: 上一页返回的next_cursor，None表示第一页
+            include_children: 是否附带各子表数据(每张子表一次批量查询)
+            
+        Returns:
+            (records, next_cursor)，没有更多记录时next_cursor为None
+        """
         session = self.SessionLocal()
         try:
-            query_sql = text("""
+            params = {'limit': limit + 1}
+            where = ""
+            if cursor:
+                # 展开写法而非行构造器比较，保证走idx_scrape_time的范围扫描(二级索引隐含主键id)
+                params['cursor_time'], params['cursor_id'] = decode_history_cursor(cursor)
+                where = """WHERE scrape_time < :cursor_time
+                   OR (scrape_time = :cursor_time AND id < :cursor_id)"""
+            query_sql = text(f"""
                 SELECT id, scrape_time, total_data_sources, successful_sources, 
                        failed_sources, processing_duration_ms, created_at
                 FROM scrape_records 
-                ORDER BY scrape_time DESC 
+                {where}
+                ORDER BY scrape_time DESC, id DESC 
                 LIMIT :limit
             """)
             
-            result = session.execute(query_sql, {'limit': limit})
+            result = session.execute(query_sql, params)
             records = []
             for row in result:
                 records.append({
@@ -455,13 +932,345 @@ class DatabaseManager:
                     'processing_duration_ms': row[5],
                     'created_at': row[6].isoformat() if row[6] else None
                 })
-            return records
+
+            next_cursor = None
+            if len(records) > limit:
+                records = records[:limit]
+                last = records[-1]
+                next_cursor = encode_history_cursor(last['scrape_time'], last['id'])
+
+            if include_children and records:
+                self._attach_children(session, records)
+            return records, next_cursor
+        finally:
+            session.close()
+
+    def iter_records(self, cursor: Optional[str] = None, include_children: bool = False,
+                     batch_size: int = 500):
+        """
+        从cursor开始按(scrape_time, id)倒序逐页读取全部记录，用于导出
+        每页单独查询，不在整个导出期间占用连接和事务
+        
+        Yields:
+            与get_records_page相同结构的记录
+        """
+        while True:
+            records, cursor = self.get_records_page(batch_size, cursor, include_children)
+            yield from records
+            if cursor is None:
+                break
+
+    def _attach_children(self, session, records: List[Dict]):
+        """每张子表一次 WHERE record_id IN (...) 查询，按record_id分组挂到records上"""
+        by_id = {record['id']: record for record in records}
+        for record in records:
+            record['children'] = {name: [] for name in HISTORY_CHILD_TABLES}
+        for name, table in HISTORY_CHILD_TABLES.items():
+            query_sql = text(f"""
+                SELECT * FROM {table} WHERE record_id IN :record_ids ORDER BY record_id, id
+            """).bindparams(bindparam('record_ids', expanding=True))
+            for row in session.execute(query_sql, {'record_ids': list(by_id)}).mappings():
+                by_id[row['record_id']]['children'][name].append(
+                    {key: _jsonable(value) for key, value in row.items()}
+                )
+
+    def get_latest_values(self, source: Optional[str] = None, indicator: Optional[str] = None) -> Dict[str, Any]:
+        """
+        读取最新快照，数据来自内存索引，索引超过latest_ttl秒时从数据库重新加载
+        
+        Args:
+            source: 只返回该数据源(macro/crypto/turnover/a_stock)的指标
+            indicator: 只返回该指标
+            
+        Returns:
+            {"summary": 最近一次爬取的汇总, "values": {source: {indicator: 最新值}}}
+        """
+        if self._latest.expired(self.latest_ttl):
+            self._reload_latest()
+        latest = self._latest
+        if source and indicator:
+            # 主键直接查找
+            entry = latest.values.get((source, indicator))
+            items = [entry] if entry else []
+        else:
+            items = [entry for (entry_source, entry_indicator), entry in latest.values.items()
+                     if (not source or entry_source == source) and (not indicator or entry_indicator == indicator)]
+
+        values: Dict[str, Dict[str, Any]] = {}
+        for entry in items:
+            values.setdefault(entry['source'], {})[entry['indicator']] = {
+                key: _jsonable(value) for key, value in entry.items() if key not in ('source', 'indicator')
+            }
+        summary = latest.summary and {key: _jsonable(value) for key, value in latest.summary.items()}
+        return {'summary': summary, 'values': values}
+
+    async def get_latest_values_async(self, source: Optional[str] = None,
+                                      indicator: Optional[str] = None) -> Dict[str, Any]:
+        """在线程池中执行get_latest_values(索引过期时需要查询数据库)"""
+        return await asyncio.to_thread(self.get_latest_values, source, indicator)
+
+    def _reload_latest(self):
+        """
+        重新加载内存索引；已有索引时只等待不阻塞，其他线程正在加载就直接使用旧索引
+        加载失败时已有索引继续使用，到下次读取再重试
+        """
+        loaded = self._latest.loaded_at is not None
+        if not self._latest_load_lock.acquire(blocking=not loaded):
+            return
+        try:
+            if self._latest.expired(self.latest_ttl):
+                self._load_latest()
         except Exception as e:
-            logger.error(f"查询最近记录失败: {e}")
-            return []
+            if not loaded:
+                raise
+            logger.error(f"重新加载最新快照索引失败，继续使用旧索引: {e}")
+        finally:
+            self._latest_load_lock.release()
+
+    def _load_latest(self):
+        """从latest_indicator_values和最新一条scrape_records加载内存索引"""
+        started = time.monotonic()
+        session = self.SessionLocal()
+        try:
+            rows = session.execute(text("""
+                SELECT source, indicator, record_id, scrape_time, value, value_text, change_percent
+                FROM latest_indicator_values
+            """)).mappings().all()
+            entries = [dict(row) for row in rows]
+
+            summary = None
+            row = session.execute(text("""
+                SELECT id, scrape_time, total_data_sources, successful_sources, 
+                       failed_sources, processing_duration_ms
+                FROM scrape_records 
+                ORDER BY scrape_time DESC, id DESC 
+                LIMIT 1
+            """)).mappings().fetchone()
+            if row is not None:
+                summary = dict(row)
+                # 只统计这一条记录，各子表都有以record_id开头的索引
+                for name, table, column in (
+                    ('macro_indicators_count', 'global_macro_indicators', 'indicator_code'),
+                    ('us_gainers_count', 'us_stock_gainers', 'stock_symbol'),
+                    ('a_stock_metrics_count', 'a_stock_statistics', 'metric_name'),
+                    ('market_turnover_count', 'market_turnover', 'market_type'),
+                ):
+                    summary[name] = session.execute(text(f"""
+                        SELECT COUNT(DISTINCT {column}) FROM {table} 
+                        WHERE record_id = :record_id AND is_error = FALSE
+                    """), {'record_id': summary['id']}).scalar()
         finally:
             session.close()
 
+        with self._delta_lock:
+            latest = self._latest.copy()
+            latest.update(summary, entries)
+            latest.loaded_at = started
+            self._latest = latest
+        logger.debug(f"最新快照索引已加载: {len(entries)} 个指标")
+
+    def _list_partitions(self, conn, table: str) -> List[str]:
+        """按顺序列出表的分区名，未分区的表返回空列表"""
+        rows = conn.execute(text("""
+            SELECT PARTITION_NAME FROM information_schema.PARTITIONS 
+            WHERE TABLE_SCHEMA = :database AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """), {'database': self.database, 'table': table}).fetchall()
+        return [row[0] for row in rows]
+
+    def _db_this_month(self, conn) -> date:
+        """数据库时钟的当月月初；created_at由数据库填写，分区月份以数据库时间为准"""
+        return conn.execute(text("SELECT CURRENT_DATE")).scalar().replace(day=1)
+
+    def ensure_partitions(self, months_ahead: int = 2) -> Dict[str, List[str]]:
+        """
+        为各分区表创建当月至未来months_ahead个月的分区(从p_future拆分)；
+        首次执行时从p_future中最早的数据所在月份开始创建，迁移前的历史数据按月落入各自的分区
+        
+        Args:
+            months_ahead: 提前创建的月数
+            
+        Returns:
+            表名 -> 新建的分区名列表
+        """
+        created = {}
+        with self.engine.connect() as conn:
+            this_month = self._db_this_month(conn)
+            for table in PARTITIONED_TABLES:
+                partitions = self._list_partitions(conn, table)
+                if FUTURE_PARTITION not in partitions:
+                    logger.warning(f"表 {table} 未按月分区，跳过分区维护(见 migrations/004_monthly_partitions.sql)")
+                    continue
+                existing = [month for month in map(_partition_month, partitions) if month]
+                # 新分区只能追加在已有月分区之后；维护中断过的月份也补上，其数据会从p_future移入
+                if existing:
+                    month = add_months(max(existing), 1)
+                else:
+                    # 迁移后已有数据都在p_future中，只建当月分区会把全部历史留到当月分区过期才删除
+                    oldest = conn.execute(text(
+                        f"SELECT MIN(created_at) FROM {table} PARTITION ({FUTURE_PARTITION})"
+                    )).scalar()
+                    month = min(this_month, oldest.date().replace(day=1)) if oldest else this_month
+                months = []
+                while month <= add_months(this_month, months_ahead):
+                    months.append(month)
+                    month = add_months(month, 1)
+                if not months:
+                    continue
+
+                definitions = [
+                    f"PARTITION p{month:%Y%m} VALUES LESS THAN "
+                    f"(UNIX_TIMESTAMP('{add_months(month, 1):%Y-%m-%d} 00:00:00'))"
+                    for month in months
+                ]
+                definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+                conn.execute(text(
+                    f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(definitions)})"
+                ))
+                created[table] = [f"p{month:%Y%m}" for month in months]
+                logger.info(f"表 {table} 新建分区: {', '.join(created[table])}")
+        return created
+
+    def drop_expired_partitions(self, retention_months: int) -> Dict[str, List[str]]:
+        """
+        整个删除超过保留期的月分区，代替逐行DELETE
+        
+        Args:
+            retention_months: 除当月外保留的月数，<=0表示不删除
+            
+        Returns:
+            表名 -> 已删除的分区名列表
+        """
+        if retention_months <= 0:
+            return {}
+        dropped = {}
+        with self.engine.connect() as conn:
+            cutoff = add_months(self._db_this_month(conn), -retention_months)
+            for table in PARTITIONED_TABLES:
+                expired = [name for name in self._list_partitions(conn, table)
+                           if _partition_month(name) and _partition_month(name) < cutoff]
+                if not expired:
+                    continue
+                conn.execute(text(f"ALTER TABLE {table} DROP PARTITION {', '.join(expired)}"))
+                dropped[table] = expired
+                logger.info(f"表 {table} 删除过期分区: {', '.join(expired)}")
+        return dropped
+
+    def expired_months(self, retention_months: int) -> List[date]:
+        """scrape_records中超过保留期、将被drop_expired_partitions删除的月份"""
+        if retention_months <= 0:
+            return []
+        with self.engine.connect() as conn:
+            cutoff = add_months(self._db_this_month(conn), -retention_months)
+            months = [_partition_month(name) for name in self._list_partitions(conn, 'scrape_records')]
+        return [month for month in months if month and month < cutoff]
+
+    def maintain_partitions(self, retention_months: int = 0, months_ahead: int = 2,
+                            before_drop: Optional[Callable[[List[date]], None]] = None) -> Dict[str, Any]:
+        """
+        创建未来分区并删除过期分区
+        
+        Args:
+            retention_months: 除当月外保留的月数，<=0表示不删除
+            months_ahead: 提前创建的月数
+            before_drop: 删除前以过期月份列表调用(如先归档为Parquet)，抛出异常时不删除
+        """
+        created = self.ensure_partitions(months_ahead)
+        if before_drop is not None:
+            months = self.expired_months(retention_months)
+            if months:
+                before_drop(months)
+        return {
+            'created': created,
+            'dropped': self.drop_expired_partitions(retention_months),
+        }
+
+    def resolve_timeseries_source(self, indicator: str, source: Optional[str] = None) -> str:
+        """未指定source时按指标代码推断所在的表"""
+        if source:
+            if source not in TIMESERIES_SOURCES:
+                raise ValueError(f"未知的数据源: {source}，可选: {', '.join(TIMESERIES_SOURCES)}")
+            return source
+        for name, spec in TIMESERIES_SOURCES.items():
+            if indicator in spec.get('known_keys', ()):
+                return name
+        return 'a_stock'
+
+    def iter_timeseries(self, indicator: str, start: datetime, end: datetime, interval_seconds: int,
+                        source: Optional[str] = None, agg: str = 'ohlc', batch_size: int = 500):
+        """
+        按时间桶降采样查询指标序列，结果以游标流式读取
+        
+        Args:
+            indicator: 指标代码，如 DXY / BTC / SH / 上涨家数
+            start: 起始时间(含)
+            end: 结束时间(不含)
+            interval_seconds: 时间桶大小(秒)
+            source: TIMESERIES_SOURCES中的数据源，None表示按指标推断
+            agg: ohlc 返回每个桶的开高低收，last 只返回桶内最后一个值
+            batch_size: 每次从游标读取的行数
+            
+        Yields:
+            {"ts": 桶起始unix时间, "time": ISO时间, "open", "high", "low", "close", "count"}
+        """
+        if agg not in ('ohlc', 'last'):
+            raise ValueError(f"不支持的聚合方式: {agg}")
+        if interval_seconds <= 0:
+            raise ValueError("interval必须大于0")
+        spec = TIMESERIES_SOURCES[self.resolve_timeseries_source(indicator, source)]
+        value = spec['value']
+        # 桶内首/末值：按时间排序拼接后取第一个元素(MySQL没有FIRST/LAST聚合函数)
+        columns = ["SUBSTRING_INDEX(GROUP_CONCAT(v.val ORDER BY v.created_at DESC, v.id DESC), ',', 1) AS close_value"]
+        if agg == 'ohlc':
+            columns = [
+                "SUBSTRING_INDEX(GROUP_CONCAT(v.val ORDER BY v.created_at, v.id), ',', 1) AS open_value",
+                "MAX(v.val) AS high_value",
+                "MIN(v.val) AS low_value",
+            ] + columns
+
+        query_sql = text(f"""
+            SELECT FLOOR(UNIX_TIMESTAMP(v.created_at) / :interval) * :interval AS bucket,
+                   {', '.join(columns)},
+                   COUNT(*) AS samples
+            FROM (
+                SELECT id, created_at, {value} AS val
+                FROM {spec['table']}
+                WHERE {spec['key']} = :indicator
+                  AND created_at >= :start AND created_at < :end
+                  AND is_error = FALSE
+                  {spec.get('filter', '')}
+            ) v
+            WHERE v.val IS NOT NULL
+            GROUP BY bucket
+            ORDER BY bucket
+        """)
+
+        with self.engine.connect().execution_options(stream_results=True) as conn:
+            result = conn.execute(query_sql, {
+                'indicator': indicator,
+                'start': start,
+                'end': end,
+                'interval': interval_seconds
+            })
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    bucket = int(row[0])
+                    point = {'ts': bucket, 'time': datetime.fromtimestamp(bucket).isoformat()}
+                    if agg == 'ohlc':
+                        point.update({
+                            'open': float(row[1]),
+                            'high': float(row[2]),
+                            'low': float(row[3]),
+                            'close': float(row[4]),
+                        })
+                    else:
+                        point['close'] = float(row[1])
+                    point['count'] = int(row[-1])
+                    yield point
+
 # 全局数据库管理器实例（使用环境变量配置）
 import os
 from dotenv import load_dotenv
@@ -469,12 +1278,73 @@ from dotenv import load_dotenv
 # 加载.env文件
 load_dotenv()
 
+_database_manager: Optional[DatabaseManager] = None
+
+
 def get_database_manager():
-    """获取数据库管理器实例"""
-    return DatabaseManager(
-        host=os.getenv('DB_HOST', 'localhost'),
-        port=int(os.getenv('DB_PORT', 3306)),
-        user=os.getenv('DB_USER', 'root'),
-        password=os.getenv('DB_PASSWORD', ''),
-        database=os.getenv('DB_DATABASE', 'financial_scraper')
-    )
\ No newline at end of file
+    """获取进程级数据库管理器实例，首次调用时创建，之后共享同一个引擎和连接池"""
+    global _database_manager
+    if _database_manager is None:
+        _database_manager = DatabaseManager(
+            host=os.getenv('DB_HOST', 'localhost'),
+            port=int(os.getenv('DB_PORT', 3306)),
+            user=os.getenv('DB_USER', 'root'),
+            password=os.getenv('DB_PASSWORD', ''),
+            database=os.getenv('DB_DATABASE', 'financial_scraper'),
+            pool_size=int(os.getenv('DB_POOL_SIZE', 5)),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            keyframe_interval=int(os.getenv('SNAPSHOT_KEYFRAME_INTERVAL', 20)),
+            latest_ttl=float(os.getenv('LATEST_INDEX_TTL', 5))
+        )
+    return _database_manager
+
+
+def close_database_manager():
+    """在应用关闭时调用"""
+    global _database_manager
+    if _database_manager is not None:
+        _database_manager.dispose()
+        _database_manager = None
+
+_partition_task: Optional[asyncio.Task] = None
+
+
+def partition_maintenance_enabled() -> bool:
+    return os.getenv('DB_PARTITION_MAINTENANCE', 'true').lower() != 'false'
+
+
+async def _partition_maintenance_loop(interval: float):
+    # parquet_archive依赖本模块，在此处导入避免循环引用
+    from parquet_archive import get_parquet_archive
+
+    retention_months = int(os.getenv('DB_RETENTION_MONTHS', 0))
+    months_ahead = int(os.getenv('DB_PARTITION_MONTHS_AHEAD', 2))
+    while True:
+        try:
+            db_manager = get_database_manager()
+            archive = get_parquet_archive()
+            # 配置了PARQUET_ARCHIVE_DIR时，过期分区先归档为Parquet再删除
+            before_drop = (lambda months: archive.export_months(db_manager, months)) if archive else None
+            await asyncio.to_thread(db_manager.maintain_partitions, retention_months, months_ahead, before_drop)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"分区维护失败: {e}")
+        await asyncio.sleep(interval)
+
+
+async def start_partition_maintenance():
+    """在应用启动时调用：立即维护一次分区，之后按DB_PARTITION_MAINTENANCE_INTERVAL(秒，默认每天)执行"""
+    global _partition_task
+    if partition_maintenance_enabled() and _partition_task is None:
+        interval = float(os.getenv('DB_PARTITION_MAINTENANCE_INTERVAL', 86400))
+        _partition_task = asyncio.ensure_future(_partition_maintenance_loop(interval))
+
+
+async def stop_partition_maintenance():
+    """在应用关闭时调用"""
+    global _partition_task
+    if _partition_task is not None:
+        _partition_task.cancel()
+        await asyncio.gather(_partition_task, return_exceptions=True)
+        _partition_task = None
@@ -15,7 +15,7 @@ USE financial_scraper;
 -- 1. 主记录表 - 存储每次爬取的基本信息
 -- ================================================================
 CREATE TABLE IF NOT EXISTS scrape_records (
-    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    id BIGINT AUTO_INCREMENT,
     scrape_time DATETIME NOT NULL COMMENT '爬取时间',
     request_time VARCHAR(100) COMMENT '请求传入的时间参数',
     total_data_sources INT DEFAULT 0 COMMENT '总数据源数量',
@@ -24,15 +24,17 @@ CREATE TABLE IF NOT EXISTS scrape_records (
     processing_duration_ms INT COMMENT '处理耗时(毫秒)',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at),
     INDEX idx_scrape_time (scrape_time),
     INDEX idx_created_at (created_at)
-) ENGINE=InnoDB COMMENT='爬取记录主表';
+) ENGINE=InnoDB COMMENT='爬取记录主表'
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
 
 -- ================================================================
 -- 2. 全球宏观指标表 - 存储Investing.com数据
 -- ================================================================
 CREATE TABLE IF NOT EXISTS global_macro_indicators (
-    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    id BIGINT AUTO_INCREMENT,
     record_id BIGINT NOT NULL COMMENT '关联scrape_records主键',
     indicator_code VARCHAR(20) NOT NULL COMMENT '指标代码(DXY,WTI,XAU_USD,USD_CNH)',
     indicator_name VARCHAR(100) COMMENT '指标名称',
@@ -43,16 +45,17 @@ CREATE TABLE IF NOT EXISTS global_macro_indicators (
     is_error BOOLEAN DEFAULT FALSE COMMENT '是否获取失败',
     error_message TEXT COMMENT '错误信息',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (record_id) REFERENCES scrape_records(id) ON DELETE CASCADE,
+    PRIMARY KEY (id, created_at),
     INDEX idx_record_indicator (record_id, indicator_code),
     INDEX idx_indicator_time (indicator_code, created_at)
-) ENGINE=InnoDB COMMENT='全球宏观指标数据';
+) ENGINE=InnoDB COMMENT='全球宏观指标数据'
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
 
 -- ================================================================
 -- 3. 美股涨幅榜表 - 存储Yahoo Finance涨幅前五数据
 -- ================================================================
 CREATE TABLE IF NOT EXISTS us_stock_gainers (
-    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    id BIGINT AUTO_INCREMENT,
     record_id BIGINT NOT NULL COMMENT '关联scrape_records主键',
     stock_symbol VARCHAR(20) NOT NULL COMMENT '股票代码',
     stock_name VARCHAR(200) COMMENT '股票名称',
@@ -64,16 +67,17 @@ CREATE TABLE IF NOT EXISTS us_stock_gainers (
     is_error BOOLEAN DEFAULT FALSE COMMENT '是否获取失败',
     error_message TEXT COMMENT '错误信息',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (record_id) REFERENCES scrape_records(id) ON DELETE CASCADE,
+    PRIMARY KEY (id, created_at),
     INDEX idx_record_ranking (record_id, ranking_position),
     INDEX idx_symbol_time (stock_symbol, created_at)
-) ENGINE=InnoDB COMMENT='美股涨幅榜数据';
+) ENGINE=InnoDB COMMENT='美股涨幅榜数据'
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
 
 -- ================================================================
 -- 4. A股统计数据表 - 存储同花顺统计数据
 -- ================================================================
 CREATE TABLE IF NOT EXISTS a_stock_statistics (
-    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    id BIGINT AUTO_INCREMENT,
     record_id BIGINT NOT NULL COMMENT '关联scrape_records主键',
     metric_name VARCHAR(100) NOT NULL COMMENT '统计指标名称',
     metric_value VARCHAR(200) COMMENT '指标值',
@@ -82,16 +86,17 @@ CREATE TABLE IF NOT EXISTS a_stock_statistics (
     is_error BOOLEAN DEFAULT FALSE COMMENT '是否获取失败',
     error_message TEXT COMMENT '错误信息',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (record_id) REFERENCES scrape_records(id) ON DELETE CASCADE,
+    PRIMARY KEY (id, created_at),
     INDEX idx_record_metric (record_id, metric_name),
     INDEX idx_metric_time (metric_name, created_at)
-) ENGINE=InnoDB COMMENT='A股统计数据';
+) ENGINE=InnoDB COMMENT='A股统计数据'
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
 
 -- ================================================================
 -- 5. 市场成交额表 - 存储新浪财经总成交额数据  
 -- ================================================================
 CREATE TABLE IF NOT EXISTS market_turnover (
-    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    id BIGINT AUTO_INCREMENT,
     record_id BIGINT NOT NULL COMMENT '关联scrape_records主键',
     market_type VARCHAR(20) NOT NULL COMMENT '市场类型(SH沪市/SZ深市)',
     market_name VARCHAR(50) COMMENT '市场名称',
@@ -103,16 +108,17 @@ CREATE TABLE IF NOT EXISTS market_turnover (
     is_error BOOLEAN DEFAULT FALSE COMMENT '是否获取失败',
     error_message TEXT COMMENT '错误信息',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (record_id) REFERENCES scrape_records(id) ON DELETE CASCADE,
+    PRIMARY KEY (id, created_at),
     INDEX idx_record_market (record_id, market_type),
     INDEX idx_market_time (market_type, created_at)
-) ENGINE=InnoDB COMMENT='市场成交额数据';
+) ENGINE=InnoDB COMMENT='市场成交额数据'
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
 
 -- ================================================================
 -- 6. 加密货币数据表 - 存储crypto相关数据(预留)
 -- ================================================================
 CREATE TABLE IF NOT EXISTS crypto_data (
-    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    id BIGINT AUTO_INCREMENT,
     record_id BIGINT NOT NULL COMMENT '关联scrape_records主键',
     crypto_symbol VARCHAR(20) NOT NULL COMMENT '加密货币符号',
     crypto_name VARCHAR(100) COMMENT '加密货币名称',
@@ -124,30 +130,54 @@ CREATE TABLE IF NOT EXISTS crypto_data (
     is_error BOOLEAN DEFAULT FALSE COMMENT '是否获取失败',
     error_message TEXT COMMENT '错误信息',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (record_id) REFERENCES scrape_records(id) ON DELETE CASCADE,
+    PRIMARY KEY (id, created_at),
     INDEX idx_record_crypto (record_id, crypto_symbol),
     INDEX idx_crypto_time (crypto_symbol, created_at)
-) ENGINE=InnoDB COMMENT='加密货币数据';
+) ENGINE=InnoDB COMMENT='加密货币数据'
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
 
 -- ================================================================
 -- 7. 原始数据存储表 - 存储完整JSON数据备份
 -- ================================================================
 CREATE TABLE IF NOT EXISTS raw_data_backup (
-    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    id BIGINT AUTO_INCREMENT,
     record_id BIGINT NOT NULL COMMENT '关联scrape_records主键',
     data_source VARCHAR(50) NOT NULL COMMENT '数据源标识',
-    raw_json LONGTEXT COMMENT '原始JSON数据',
+    raw_json LONGTEXT COMMENT '原始JSON数据(codec为空或json时使用)',
+    raw_blob LONGBLOB COMMENT '压缩后的原始数据',
+    codec VARCHAR(32) COMMENT '编码方式，如msgpack+zstd、json+zlib，为空表示raw_json中的JSON文本',
+    snapshot_type VARCHAR(10) DEFAULT 'keyframe' COMMENT 'keyframe: 完整快照, delta: 与上一次快照的差异',
+    keyframe_record_id BIGINT COMMENT '所属关键帧的record_id',
     data_size INT COMMENT '数据大小(bytes)',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (record_id) REFERENCES scrape_records(id) ON DELETE CASCADE,
-    INDEX idx_record_source (record_id, data_source)
-) ENGINE=InnoDB COMMENT='原始数据备份';
+    PRIMARY KEY (id, created_at),
+    INDEX idx_record_source (record_id, data_source),
+    INDEX idx_keyframe (keyframe_record_id, record_id)
+) ENGINE=InnoDB COMMENT='原始数据备份'
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+
+-- ================================================================
+-- 8. 最新指标值表 - 每个指标只保留最新一次的值，写入时upsert维护
+-- 看板按主键(source, indicator)直接查询，不再聚合历史表；不设外键，清理历史数据不影响
+-- ================================================================
+CREATE TABLE IF NOT EXISTS latest_indicator_values (
+    source VARCHAR(20) NOT NULL COMMENT '数据源(macro/crypto/turnover/a_stock)',
+    indicator VARCHAR(100) NOT NULL COMMENT '指标代码或名称',
+    record_id BIGINT NOT NULL COMMENT '最新值所在的scrape_records主键',
+    scrape_time DATETIME NOT NULL COMMENT '最新值的爬取时间',
+    value DECIMAL(25,8) COMMENT '数值',
+    value_text VARCHAR(200) COMMENT '原始文本',
+    change_percent DECIMAL(8,4) COMMENT '涨跌幅百分比',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, indicator)
+) ENGINE=InnoDB COMMENT='各指标最新值';
 
 -- ================================================================
 -- 创建视图 - 便于数据查询和分析
 -- ================================================================
 
 -- 最新爬取记录视图
+-- 每次读取都要关联4张子表聚合，仅用于临时分析；看板请使用latest_indicator_values表或GET /scrape/latest
 CREATE OR REPLACE VIEW v_latest_scrape_summary AS
 SELECT 
     sr.id,
@@ -183,27 +213,16 @@ VALUES (0, 'config', '{"version": "1.0", "created_by": "financial_scraper", "des
 
 -- 创建应用专用用户 (可选)
 -- CREATE USER 'scraper_app'@'localhost' IDENTIFIED BY 'your_secure_password';
--- GRANT SELECT, INSERT, UPDATE ON financial_scraper.* TO 'scraper_app'@'localhost';
+-- ALTER/DROP用于按月创建和删除分区
+-- GRANT SELECT, INSERT, UPDATE, ALTER, DROP ON financial_scraper.* TO 'scraper_app'@'localhost';
 -- FLUSH PRIVILEGES;
 
 -- ================================================================
--- 索引优化建议
--- ================================================================
-
--- 如果数据量很大，可以考虑添加分区表
--- ALTER TABLE scrape_records 
--- PARTITION BY RANGE (TO_DAYS(scrape_time)) (
---     PARTITION p_2025_01 VALUES LESS THAN (TO_DAYS('2025-02-01')),
---     PARTITION p_2025_02 VALUES LESS THAN (TO_DAYS('2025-03-01')),
---     -- 继续添加分区...
--- );
-
--- ================================================================
--- 数据清理定时任务建议 (可选)
+-- 分区与数据保留
 -- ================================================================
 
--- 清理30天前的数据 (根据需要调整保留时间)
--- CREATE EVENT IF NOT EXISTS cleanup_old_data
--- ON SCHEDULE EVERY 1 DAY
--- DO
---   DELETE FROM scrape_records WHERE created_at < DATE_SUB(NOW(), INTERVAL 30 DAY);
\ No newline at end of file
+-- 爬取记录表及各子表按created_at月分区(分区名p202501形式，p_future兜底)：
+-- - 分区表不支持外键，主键需包含分区列，因此主键为(id, created_at)，子表与主表的关联由应用维护
+-- - 当月及之后的分区由DatabaseManager.ensure_partitions在启动时和每天自动创建
+-- - 超过DB_RETENTION_MONTHS的历史分区由DatabaseManager.drop_expired_partitions整个删除，不逐行DELETE
+-- 已有数据库升级见 migrations/004_monthly_partitions.sql
@@ -0,0 +1,176 @@
+"""
+东方财富push2接口直连客户端
+使用进程级共享的aiohttp会话(keep-alive连接复用)直接请求push2 JSON接口，
+无需启动浏览器；请求失败时由调用方回退到浏览器爬取
+"""
+import asyncio
+import logging
+import os
+from typing import List, Optional
+
+import aiohttp
+
+from xhr_capture import format_cn_amount, parse_eastmoney_clist, parse_eastmoney_quote, parse_json_or_jsonp
+
+logger = logging.getLogger(__name__)
+
+CLIST_URL = "https://push2.eastmoney.com/api/qt/clist/get"
+STOCK_URL = "https://push2.eastmoney.com/api/qt/stock/get"
+UT_TOKEN = "bd1d9ddb04089700cf9c27f6f7426281"
+
+# 行业板块
+INDUSTRY_BOARD_FS = "m:90 t:2 f:!50"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36 Edg/138.0.0.0",
+    "Referer": "https://quote.eastmoney.com/",
+    "Accept": "application/json, text/javascript, */*; q=0.01",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+}
+
+
+def eastmoney_api_enabled() -> bool:
+    """EASTMONEY_API_ENABLED=false 时关闭直连，全部走浏览器"""
+    return os.getenv('EASTMONEY_API_ENABLED', 'true').lower() != 'false'
+
+
+class EastMoneyApiClient:
+    """push2接口客户端，会话在首次请求时创建并在进程内复用"""
+
+    def __init__(self, timeout: float = 5, max_connections: int = 10):
+        """
+        Args:
+            timeout: 单次请求超时(秒)
+            max_connections: 连接池大小
+        """
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60, ttl_dns_cache=300)
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    headers=DEFAULT_HEADERS,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout)
+                )
+            return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get_json(self, url: str, params: dict):
+        """
+        GET请求并解析JSON/JSONP
+
+        Returns:
+            解析后的数据，请求或解析失败返回None
+        """
+        try:
+            session = await self._get_session()
+            async with session.get(url, params=params) as response:
+                if response.status != 200:
+                    logger.warning(f"请求 {url} 返回状态码 {response.status}")
+                    return None
+                return parse_json_or_jsonp(await response.text())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"请求 {url} 失败: {e}")
+            return None
+        except ValueError as e:
+            # 响应解码失败(UnicodeDecodeError)或不是合法的JSON/JSONP
+            logger.warning(f"解析 {url} 的响应失败: {e}")
+            return None
+
+    async def get_clist(self, fs: str, fid: str, fields: str, po: int = 1, pz: int = 500) -> List[dict]:
+        """请求clist列表接口，fltt=2使数值以实际小数返回"""
+        params = {
+            "pn": 1,
+            "pz": pz,
+            "po": po,
+            "np": 1,
+            "ut": UT_TOKEN,
+            "fltt": 2,
+            "invt": 2,
+            "fid": fid,
+            "fs": fs,
+            "fields": fields,
+        }
+        return parse_eastmoney_clist(await self.get_json(CLIST_URL, params))
+
+    async def get_sector_money_flow(self) -> List[dict]:
+        """行业板块资金流向全量列表(按主力净流入f62排序)"""
+        return await self.get_clist(
+            fs="m:90 t:2",
+            fid="f62",
+            fields="f12,f14,f2,f3,f62,f184,f66,f69,f72,f75,f78,f81,f84,f87,f204,f205,f124"
+        )
+
+    async def get_index_quote(self, secid: str) -> Optional[dict]:
+        """
+        指数实时行情
+
+        Returns:
+            {"price": ..., "change_pct": "x.xx%"}，失败返回None
+        """
+        params = {
+            "secid": secid,
+            "ut": UT_TOKEN,
+            "fltt": 2,
+            "invt": 2,
+            "fields": "f43,f169,f170,f152",
+        }
+        payload = await self.get_json(STOCK_URL, params)
+        return parse_eastmoney_quote(payload, "fltt=2")
+
+    async def get_industry_ranking(self, ascending: bool = False, limit: int = 5) -> List[dict]:
+        """
+        行业板块涨跌幅排行
+
+        Returns:
+            [{"name": ..., "change_pct": "x.xx%"}]，失败返回空列表
+        """
+        items = await self.get_clist(INDUSTRY_BOARD_FS, fid="f3", fields="f12,f14,f3",
+                                     po=0 if ascending else 1, pz=limit)
+        rows = []
+        for item in items[:limit]:
+            if not item.get("f14") or item.get("f3") in (None, "-", ""):
+                return []
+            rows.append({"name": item["f14"], "change_pct": f"{float(item['f3']):.2f}%"})
+        return rows
+
+    async def get_industry_inflows(self, limit: int = 3) -> List[dict]:
+        """
+        行业板块主力净流入排行
+
+        Returns:
+            [{"name": ..., "inflow_amount": "x.xx亿"}]，失败返回空列表
+        """
+        items = await self.get_clist(INDUSTRY_BOARD_FS, fid="f62", fields="f12,f14,f62", pz=limit)
+        rows = []
+        for item in items[:limit]:
+            if not item.get("f14") or item.get("f62") in (None, "-", ""):
+                return []
+            rows.append({"name": item["f14"], "inflow_amount": format_cn_amount(item["f62"])})
+        return rows
+
+
+_client: Optional[EastMoneyApiClient] = None
+
+
+def get_eastmoney_client() -> EastMoneyApiClient:
+    """获取进程级push2客户端（使用环境变量配置）"""
+    global _client
+    if _client is None:
+        _client = EastMoneyApiClient(timeout=float(os.getenv('EASTMONEY_API_TIMEOUT', 5)))
+    return _client
+
+
+async def close_eastmoney_client():
+    """在应用关闭时调用"""
+    if _client is not None:
+        await _client.close()
@@ -0,0 +1,104 @@
+"""
+模块导入耗时统计
+whisperx、torch等音频依赖只在首次/align时导入，这里记录应用启动耗时和每个模块(包括启动时导入的模块)的导入耗时、
+常驻内存增量，由/debug/startup返回，用于跟踪各模块的导入成本
+"""
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows没有resource模块，不统计内存
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_PROCESS_START = time.monotonic()
+_startup_seconds: Optional[float] = None
+_imports: Dict[str, Dict[str, Any]] = {}
+_import_lock = threading.Lock()
+
+
+def _max_rss_mb() -> Optional[float]:
+    """进程的峰值常驻内存(MB)，Linux上ru_maxrss单位为KB，macOS上为字节"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _rss_mb() -> Optional[float]:
+    """
+    进程当前的常驻内存(MB)，Linux上读取/proc/self/statm；
+    没有/proc的系统(macOS)退回峰值内存，此时低于之前峰值的导入增量记为0
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return _max_rss_mb()
+
+
+def timed_import(module_name: str):
+    """
+    导入模块并记录耗时，已导入的模块直接返回
+    多个请求同时触发首次导入时只有一个线程执行导入
+
+    Args:
+        module_name: 模块名，如 "whisperx"
+
+    Returns:
+        模块对象
+    """
+    module = sys.modules.get(module_name)
+    if module is not None and module_name in _imports:
+        return module
+    with _import_lock:
+        already_loaded = module_name in sys.modules
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        if module_name not in _imports:
+            seconds = time.perf_counter() - started
+            rss_after = _rss_mb()
+            _imports[module_name] = {
+                "seconds": round(seconds, 3),
+                "rss_delta_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+                "already_loaded": already_loaded,
+                "during_startup": _startup_seconds is None,
+                "loaded_at": datetime.now().isoformat(),
+            }
+            logger.info(f"导入 {module_name} 耗时 {seconds:.2f}秒")
+    return module
+
+
+def mark_startup_complete():
+    """在应用启动完成时调用，记录从进程启动到可以处理请求的耗时"""
+    global _startup_seconds
+    _startup_seconds = time.monotonic() - _PROCESS_START
+    logger.info(f"应用启动耗时 {_startup_seconds:.2f}秒")
+
+
+def get_import_report() -> Dict[str, Any]:
+    """
+    启动耗时报告
+
+    Returns:
+        startup_seconds: 启动耗时，uptime_seconds: 运行时长，rss_mb: 当前常驻内存，max_rss_mb: 峰值内存，
+        imports: 模块名 -> 导入耗时、导入前后常驻内存的差值(已由其他模块导入时约为0)、导入时间、是否在启动阶段导入
+    """
+    return {
+        "startup_seconds": round(_startup_seconds, 3) if _startup_seconds is not None else None,
+        "uptime_seconds": round(time.monotonic() - _PROCESS_START, 3),
+        "rss_mb": _rss_mb(),
+        "max_rss_mb": _max_rss_mb(),
+        "imports": dict(_imports),
+    }
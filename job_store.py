@@ -0,0 +1,271 @@
+"""
+长任务的异步执行和本地持久化
+/align、/generate-video等耗时数分钟的请求改为提交任务：接口立即返回job_id，任务在后台执行，
+状态和结果写入本地SQLite(JOB_STORE_PATH)，客户端断开或重连后仍可查询；
+进程重启时未完成的任务标记为失败(interrupted)，过期任务按JOB_RETENTION_HOURS清理。
+状态变化同时推送给/jobs/{job_id}/events的SSE订阅者
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    request TEXT,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+"""
+
+_COLUMNS = ("id", "kind", "status", "request", "result", "error", "created_at", "started_at", "finished_at")
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _to_job(row: tuple, include_payload: bool = True) -> dict:
+    job = dict(zip(_COLUMNS, row))
+    for field in ("request", "result"):
+        if include_payload and job[field] is not None:
+            job[field] = json.loads(job[field])
+        elif not include_payload:
+            job.pop(field)
+    return job
+
+
+class JobStore:
+    """SQLite中的任务表，每次操作使用独立连接，可在线程池中调用"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create(self, kind: str, request: Any) -> dict:
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, request, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(request, ensure_ascii=False, default=str), _now())
+            )
+        return self.get(job_id, include_payload=False)
+
+    def update(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        """更新状态，进入running时记录开始时间，进入结束状态时记录结果和结束时间"""
+        with self._connect() as conn:
+            if status == RUNNING:
+                conn.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?", (status, _now(), job_id))
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                    (status, json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                     error, _now() if status in FINISHED_STATUSES else None, job_id)
+                )
+
+    def get(self, job_id: str, include_payload: bool = True) -> Optional[dict]:
+        """
+        Args:
+            include_payload: 是否包含请求参数和结果，查询状态时不读取
+        """
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _to_job(row, include_payload) if row else None
+
+    def list(self, kind: Optional[str] = None, limit: int = 50) -> List[dict]:
+        """按创建时间倒序列出任务，不含请求参数和结果"""
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM jobs"
+        params: list = []
+        if kind:
+            sql += " WHERE kind = ?"
+            params.append(kind)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [_to_job(row, include_payload=False) for row in rows]
+
+    def fail_unfinished(self, error: str) -> int:
+        """把未完成的任务标记为失败，用于进程重启后(任务不会被恢复执行)"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?)",
+                (FAILED, error, _now(), QUEUED, RUNNING)
+            )
+        return cursor.rowcount
+
+    def delete_before(self, before: datetime) -> int:
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM jobs WHERE created_at < ?", (before.isoformat(),))
+        return cursor.rowcount
+
+
+class JobManager:
+    """在事件循环中执行任务协程，状态写入JobStore并通知SSE订阅者"""
+
+    def __init__(self, store: JobStore, retention_hours: float = 72):
+        self.store = store
+        self.retention_hours = retention_hours
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def start(self):
+        interrupted = await asyncio.to_thread(self.store.fail_unfinished, "服务重启，任务已中断")
+        if interrupted:
+            logger.warning(f"{interrupted} 个未完成的任务因服务重启标记为失败")
+        if self.retention_hours:
+            before = datetime.now() - timedelta(hours=self.retention_hours)
+            deleted = await asyncio.to_thread(self.store.delete_before, before)
+            if deleted:
+                logger.info(f"已清理 {deleted} 个过期任务")
+
+    async def stop(self):
+        """取消执行中的任务并标记为失败"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, kind: str, request: Any,
+                     run: Callable[[], Awaitable[Any]],
+                     is_success: Callable[[Any], bool] = lambda result: True,
+                     on_done: Optional[Callable[[], None]] = None) -> dict:
+        """
+        创建任务并在后台执行
+
+        Args:
+            kind: 任务类型，如 align / generate-video
+            request: 请求参数(可JSON序列化)，随任务保存便于排查
+            run: 执行任务的协程函数，返回值作为结果保存
+            is_success: 根据结果判断任务是否成功(如结果中带error时为失败)
+            on_done: 任务结束(包括被取消)时调用，用于归还提交时占用的资源；创建任务失败时也会调用
+
+        Returns:
+            任务信息(不含请求参数和结果)
+        """
+        try:
+            job = await asyncio.to_thread(self.store.create, kind, request)
+        except BaseException:
+            if on_done is not None:
+                on_done()
+            raise
+        self._tasks[job["id"]] = asyncio.ensure_future(self._run(job["id"], run, is_success, on_done))
+        return job
+
+    async def _run(self, job_id: str, run: Callable[[], Awaitable[Any]], is_success: Callable[[Any], bool],
+                   on_done: Optional[Callable[[], None]] = None):
+        try:
+            await self._set_status(job_id, RUNNING)
+            result = await run()
+            if is_success(result):
+                await self._set_status(job_id, SUCCEEDED, result=result)
+            else:
+                error = result.get("error") if isinstance(result, dict) else None
+                await self._set_status(job_id, FAILED, result=result, error=error)
+        except asyncio.CancelledError:
+            await self._set_status(job_id, FAILED, error="服务关闭，任务已中断")
+        except Exception as e:
+            logger.error(f"任务 {job_id} 执行失败: {e}")
+            await self._set_status(job_id, FAILED, error=str(e))
+        finally:
+            self._tasks.pop(job_id, None)
+            if on_done is not None:
+                on_done()
+
+    async def _set_status(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        await asyncio.to_thread(self.store.update, job_id, status, result, error)
+        event = {"job_id": job_id, "status": status, "time": _now()}
+        if error:
+            event["error"] = error
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    async def get(self, job_id: str, include_payload: bool = True) -> Optional[dict]:
+        return await asyncio.to_thread(self.store.get, job_id, include_payload)
+
+    async def list(self, kind: Optional[str] = None, limit: int = 50) -> List[dict]:
+        return await asyncio.to_thread(self.store.list, kind, limit)
+
+    async def events(self, job_id: str, heartbeat: float = 15):
+        """
+        任务状态事件流，先返回当前状态，之后每次状态变化返回一个事件，任务结束后停止
+        超过heartbeat秒没有事件时返回None，调用方据此发送心跳保持连接
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            job = await self.get(job_id, include_payload=False)
+            if job is None:
+                return
+            yield {"job_id": job_id, "status": job["status"], "time": _now(), "error": job["error"]}
+            status = job["status"]
+            while status not in FINISHED_STATUSES:
+                if job_id not in self._tasks:
+                    # 订阅前任务已经结束，重新读取一次最终状态
+                    job = await self.get(job_id, include_payload=False)
+                    if job["status"] != status:
+                        yield {"job_id": job_id, "status": job["status"], "time": _now(), "error": job["error"]}
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                status = event["status"]
+                yield event
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    self._subscribers.pop(job_id, None)
+
+
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """获取进程级任务管理器（使用环境变量配置）"""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(
+            JobStore(os.getenv('JOB_STORE_PATH', os.path.join("data", "jobs.sqlite3"))),
+            retention_hours=float(os.getenv('JOB_RETENTION_HOURS', 72))
+        )
+    return _job_manager
+
+
+async def start_job_manager():
+    """在应用启动时调用"""
+    await get_job_manager().start()
+
+
+async def stop_job_manager():
+    """在应用关闭时调用"""
+    if _job_manager is not None:
+        await _job_manager.stop()
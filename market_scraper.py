@@ -1,14 +1,23 @@
 import asyncio
 import logging
+import os
 import sys # 导入sys模块
+import time
 import traceback
 import pandas as pd # 导入pandas
 from datetime import datetime
 import json
 import re
-from playwright.async_api import async_playwright, TimeoutError
+from playwright.async_api import TimeoutError
 from playwright.sync_api import sync_playwright # 导入sync_playwright
 from tonghuashun_stats import scrape_today
+from browser_pool import PoolWaitTracker, get_browser_pool, pool_wait_tracker, stop_browser_pool
+from page_waits import wait_for_numeric_text, wait_for_text_change
+from xhr_capture import (JsonResponseCapture, network_extraction_enabled, parse_eastmoney_quote,
+                         parse_eastmoney_clist, parse_northbound_kamt, format_cn_amount)
+from table_extract import Column, extract_table, to_float
+from number_parsing import parse_number, parse_numbers
+from eastmoney_api import close_eastmoney_client, eastmoney_api_enabled, get_eastmoney_client
 # 配置日志记录
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -20,52 +29,24 @@ class SimpleSectorFlowScraper:
 
     async def scrape_yahoo_sectors(self):
         """从Yahoo Finance爬取板块数据"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.headless)
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
-            page = await context.new_page()
+        async with get_browser_pool().page(profile="yahoo") as page:
             try:
                 print("正在访问Yahoo Finance板块页面...")
                 await page.goto('https://finance.yahoo.com/sectors/', wait_until='domcontentloaded', timeout=60000)
-                await page.wait_for_timeout(8000)
+                # 等待表格出现数值，原8秒固定等待作为上限
+                await wait_for_numeric_text(page, 'table.yf-k3njn8 tbody td', timeout=8000)
                 # 适配新版Yahoo Finance板块表格结构
                 await page.wait_for_selector('table.yf-k3njn8', timeout=10000)
-                sector_data = await page.evaluate('''
-                    () => {
-                        const data = [];
-                        const table = document.querySelector('table.yf-k3njn8');
-                        if (table) {
-                            const rows = table.querySelectorAll('tbody tr');
-                            rows.forEach(row => {
-                                const cells = row.querySelectorAll('td');
-                                if (cells.length === 3) {
-                                    const name = cells[0].textContent.trim();
-                                    const weightText = cells[1].textContent.trim();
-                                    const ytdReturnText = cells[2].textContent.trim();
-                                    // 提取百分比数值
-                                    const weightMatch = weightText.match(/([+-]?\\d+\\.?\\d*)%/);
-                                    const ytdReturnMatch = ytdReturnText.match(/([+-]?\\d+\\.?\\d*)%/);
-                                    if (name && ytdReturnMatch) {
-                                        data.push({
-                                            name: name,
-                                            percentage: parseFloat(ytdReturnMatch[1]),
-                                            changeText: ytdReturnText,
-                                            volumeText: weightMatch ? weightMatch[1] : '0'
-                                        });
-                                    }
-                                }
-                            });
-                        }
-                        return data;
-                    }
-                ''')
+                sector_data = await extract_table(page, 'table.yf-k3njn8 tbody tr', {
+                    "name": Column("td:nth-child(1)"),
+                    "weight": Column("td:nth-child(2)", type=to_float, required=False, default=0.0),
+                    "percentage": Column("td:nth-child(3)", type=to_float),
+                })
                 print(f"从Yahoo Finance获取到 {len(sector_data)} 条原始数据")
                 processed_data = []
                 for item in sector_data:
                     # 这里volume用权重百分比，实际资金流量需结合市值等，暂用权重模拟
-                    volume = float(item['volumeText'])
+                    volume = item['weight']
                     net_flow = abs(item['percentage']) * volume if volume else abs(item['percentage'])
                     processed_data.append({
                         'sector_name': item['name'],
@@ -75,7 +56,6 @@ class SimpleSectorFlowScraper:
                         'flow_direction': 'inflow' if item['percentage'] > 0 else 'outflow',
                         'timestamp': datetime.now().isoformat()
                     })
-                await browser.close()
                 return processed_data
             except Exception as e:
                 print(f"Yahoo Finance爬取失败: {e}")
@@ -84,28 +64,21 @@ class SimpleSectorFlowScraper:
                     print("已保存调试截图: yahoo_finance_debug.png")
                 except:
                     pass
-                await browser.close()
                 return []
 
     async def scrape_marketwatch_sectors(self):
         """从MarketWatch爬取板块数据 - 备选数据源"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.headless)
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
-            page = await context.new_page()
+        async with get_browser_pool().page(profile="marketwatch") as page:
             try:
                 print("正在访问MarketWatch板块页面...")
                 await page.goto('https://www.marketwatch.com/investing/sectors', wait_until='domcontentloaded')
-                await page.wait_for_timeout(3000)
+                await wait_for_numeric_text(page, 'table td', timeout=3000)
                 # 由于页面可能被验证码拦截或结构变化，以下选择器可能无效
                 # 增加异常处理和提示
                 try:
                     await page.wait_for_selector('.table--primary, .data-table, table', timeout=10000)
                 except Exception:
                     print("MarketWatch页面未找到预期的表格元素，可能被验证码拦截或页面结构已变更。")
-                    await browser.close()
                     return []
                 sector_data = await page.evaluate('''
                     () => {
@@ -167,51 +140,27 @@ class SimpleSectorFlowScraper:
                         'flow_direction': 'inflow' if item['percentage'] > 0 else 'outflow',
                         'timestamp': datetime.now().isoformat()
                     })
-                await browser.close()
                 return processed_data
             except Exception as e:
                 print(f"MarketWatch爬取失败: {e}")
-                await browser.close()
                 return []
 
     async def scrape_finviz_sectors(self):
         """从Finviz爬取板块数据"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=self.headless)
-            context = await browser.new_context()
-            page = await context.new_page()
+        async with get_browser_pool().page(profile="finviz") as page:
             try:
                 await page.goto('https://finviz.com/groups.ashx?g=sector&v=210&o=name', wait_until='domcontentloaded')
-                await page.wait_for_timeout(3000)
+                await wait_for_numeric_text(page, '.groups-table td', timeout=3000)
                 await page.wait_for_selector('.groups-table', timeout=15000)
-                sector_data = await page.evaluate('''
-                    () => {
-                        const rows = document.querySelectorAll('.groups-table tr');
-                        const data = [];
-                        for (let i = 1; i < rows.length; i++) {
-                            const cells = rows[i].querySelectorAll('td');
-                            if (cells.length >= 7) {
-                                const name = cells[0].textContent.trim();
-                                const changeText = cells[2].textContent.trim();
-                                const volumeText = cells[6].textContent.trim();
-                                const changeMatch = changeText.match(/([+-]?\\d+\\.?\\d*)%/);
-                                if (changeMatch) {
-                                    const percentage = parseFloat(changeMatch[1]);
-                                    data.push({
-                                        name: name,
-                                        percentage: percentage,
-                                        changeText: changeText,
-                                        volumeText: volumeText
-                                    });
-                                }
-                            }
-                        }
-                        return data;
-                    }
-                ''')
+                # 表头行没有td，会因必需列缺失被跳过
+                sector_data = await extract_table(page, '.groups-table tr', {
+                    "name": Column("td:nth-child(1)"),
+                    "percentage": Column("td:nth-child(3)", type=to_float),
+                    "volumeText": Column("td:nth-child(7)"),
+                })
                 processed_data = []
                 for item in sector_data:
-                    volume = self._parse_volume(item['volumeText'])
+                    volume = parse_number(item['volumeText'], default=0.0)
                     net_flow = abs(item['percentage']) * volume if volume else abs(item['percentage'])
                     processed_data.append({
                         'sector_name': item['name'],
@@ -221,34 +170,11 @@ class SimpleSectorFlowScraper:
                         'flow_direction': 'inflow' if item['percentage'] > 0 else 'outflow',
                         'timestamp': datetime.now().isoformat()
                     })
-                await browser.close()
                 return processed_data
             except Exception as e:
                 print(f"Finviz爬取失败: {e}")
-                await browser.close()
                 return []
 
-    def _parse_volume(self, volume_text: str) -> float:
-        """解析成交量字符串"""
-        try:
-            volume_text = volume_text.strip().replace(',', '').replace('$', '')
-            multiplier = 1
-            if volume_text.endswith('K'):
-                multiplier = 1000
-                volume_text = volume_text[:-1]
-            elif volume_text.endswith('M'):
-                multiplier = 1000000
-                volume_text = volume_text[:-1]
-            elif volume_text.endswith('B'):
-                multiplier = 1000000000
-                volume_text = volume_text[:-1]
-            elif volume_text.endswith('T'):
-                multiplier = 1000000000000
-                volume_text = volume_text[:-1]
-            return float(volume_text) * multiplier
-        except:
-            return 0.0
-
     def get_top_sectors(self, sector_data: list, top_n: int = 5):
         """获取资金流入/流出最多的板块"""
         if not sector_data:
@@ -349,47 +275,19 @@ async def scrape_sp500(page):
 
 async def scrape_yahoo_sectors(headless: bool = True):
     """从Yahoo Finance爬取板块资金流向数据"""
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        context = await browser.new_context()
-        page = await context.new_page()
+    async with get_browser_pool().page(profile="yahoo") as page:
         try:
             await page.goto('https://finance.yahoo.com/sectors/', wait_until='domcontentloaded')
-            await page.wait_for_timeout(3000)
+            await wait_for_numeric_text(page, '[data-testid="sector-table"] tbody td', timeout=3000)
             await page.wait_for_selector('[data-testid="sector-table"]', timeout=15000)
-            sector_data = await page.evaluate('''
-                () => {
-                    const rows = document.querySelectorAll('[data-testid="sector-table"] tbody tr');
-                    const data = [];
-                    rows.forEach(row => {
-                        const cells = row.querySelectorAll('td');
-                        if (cells.length >= 4) {
-                            const nameElem = cells[0].querySelector('a');
-                            const changeElem = cells[2];
-                            const volumeElem = cells[3];
-                            if (nameElem && changeElem) {
-                                const name = nameElem.textContent.trim();
-                                const changeText = changeElem.textContent.trim();
-                                const volumeText = volumeElem ? volumeElem.textContent.trim() : '0';
-                                const changeMatch = changeText.match(/([+-]?\\d+\\.?\\d*)%/);
-                                if (changeMatch) {
-                                    const percentage = parseFloat(changeMatch[1]);
-                                    data.push({
-                                        name: name,
-                                        percentage: percentage,
-                                        changeText: changeText,
-                                        volumeText: volumeText
-                                    });
-                                }
-                            }
-                        }
-                    });
-                    return data;
-                }
-            ''')
+            sector_data = await extract_table(page, '[data-testid="sector-table"] tbody tr', {
+                "name": Column("td:nth-child(1) a"),
+                "percentage": Column("td:nth-child(3)", type=to_float),
+                "volumeText": Column("td:nth-child(4)", required=False, default="0"),
+            })
             processed_data = []
             for item in sector_data:
-                volume = _parse_volume(item['volumeText'])
+                volume = parse_number(item['volumeText'], default=0.0)
                 net_flow = abs(item['percentage']) * volume if volume else abs(item['percentage'])
                 processed_data.append({
                     'sector_name': item['name'],
@@ -399,33 +297,11 @@ async def scrape_yahoo_sectors(headless: bool = True):
                     'flow_direction': 'inflow' if item['percentage'] > 0 else 'outflow',
                     'timestamp': datetime.now().isoformat()
                 })
-            await browser.close()
             return processed_data
         except Exception as e:
             print(f"Yahoo Finance爬取失败: {e}")
-            await browser.close()
             return []
 
-def _parse_volume(volume_text: str) -> float:
-    """解析成交量字符串"""
-    try:
-        volume_text = volume_text.strip().replace(',', '').replace('$', '')
-        multiplier = 1
-        if volume_text.endswith('K'):
-            multiplier = 1000
-            volume_text = volume_text[:-1]
-        elif volume_text.endswith('M'):
-            multiplier = 1000000
-            volume_text = volume_text[:-1]
-        elif volume_text.endswith('B'):
-            multiplier = 1000000000
-            volume_text = volume_text[:-1]
-        elif volume_text.endswith('T'):
-            multiplier = 1000000000000
-            volume_text = volume_text[:-1]
-        return float(volume_text) * multiplier
-    except:
-        return 0.0
 
 def get_top_sectors(sector_data: list, top_n: int = 5):
     """获取资金流入/流出最多的板块"""
@@ -479,9 +355,7 @@ async def get_daily_market_sectors():
     
     sectors_data = []
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
+        async with get_browser_pool().page(profile="finviz") as page:
             # 隐藏爬虫指纹
             # 移除手动设置User-Agent和viewport_size，由stealth_async处理
             await page.set_extra_http_headers({
@@ -502,26 +376,14 @@ async def get_daily_market_sectors():
             
             await page.goto(url, timeout=150000) # 增加导航超时时间到150秒
             await page.wait_for_load_state('domcontentloaded') # 等待DOM加载完成
-            await asyncio.sleep(15) # 增加额外等待时间，确保数据加载
-            rows_locator = page.locator(".groups_table tr.styled-row")
-            
-            for i in range(await rows_locator.count()):
-                row = rows_locator.nth(i)
-                sector_name_element = row.locator("td:nth-child(2) a")
-                daily_change_element = row.locator("td:nth-child(10) span")
-                logging.info(f"板块: {await sector_name_element.inner_html()}, 涨跌幅: {await daily_change_element.inner_html()}")
-
-                if await sector_name_element.count() > 0 and await daily_change_element.count() > 0:
-                    sector_name = await sector_name_element.inner_text()
-                    change_str = await daily_change_element.inner_text()
-                    
-                    
-                    try:
-                        change_pct = float(change_str.strip('%'))
-                        sectors_data.append({"板块 (Sector)": sector_name, "日涨跌幅 (Daily Change)": change_pct})
-                    except (ValueError, TypeError):
-                        continue
-            await browser.close()
+            # 等待涨跌幅列出现数值，原15秒固定等待作为上限
+            await wait_for_numeric_text(page, ".groups_table tr.styled-row td:nth-child(10) span", timeout=15000)
+            sectors_data = await extract_table(page, ".groups_table tr.styled-row", {
+                "板块 (Sector)": Column("td:nth-child(2) a"),
+                "日涨跌幅 (Daily Change)": Column("td:nth-child(10) span", type=to_float),
+            })
+            for sector in sectors_data:
+                logging.info(f"板块: {sector['板块 (Sector)']}, 涨跌幅: {sector['日涨跌幅 (Daily Change)']}")
     except Exception as e:
         logging.error(f"❌ 美股板块数据抓取失败 (Failed to scrape sector data): {e}")
         return
@@ -566,9 +428,7 @@ async def get_crypto_data():
     crypto_results = []
     
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False,) # 可以设置为True，如果不需要显示浏览器
-            page = await browser.new_page()
+        async with get_browser_pool().page(profile="yahoo") as page:
             # 隐藏爬虫指纹
             # 移除手动设置User-Agent和viewport_size，由stealth_async处理
             await page.set_extra_http_headers({
@@ -591,7 +451,8 @@ async def get_crypto_data():
                 url = f"https://finance.yahoo.com/quote/{ticker}"
                 try:
                     await page.goto(url, timeout=120000, wait_until='domcontentloaded') # 增加导航超时时间到120秒
-                    await asyncio.sleep(10) # 增加额外等待时间，确保数据加载
+                    # 价格出现数值即可读取，原10秒固定等待作为上限
+                    await wait_for_numeric_text(page, 'span[data-testid="qsp-price"]', timeout=10000)
                     
                     # await page.wait_for_selector('span[data-testid="qsp-price"', timeout=60000) # 使用更具体的选择器并增加超时时间
                     # await page.wait_for_timeout(60000) # 等待60秒以确保数据加载
@@ -609,7 +470,6 @@ async def get_crypto_data():
                 except Exception as e:
                     logging.error(f"❌ 抓取 {name} ({ticker}) 数据失败 (Failed to scrape {name}): {e}")
                     continue
-            await browser.close()
     except Exception as e:
         logging.error(f"❌ 加密货币数据抓取失败 (Failed to scrape crypto data): {e}")
         return
@@ -639,46 +499,31 @@ async def remove_eastmoney_mask(page):
             close_btn = await page.query_selector('img[src*="ic_close.png"]')
             if close_btn:
                 await close_btn.click()
-                await asyncio.sleep(1)  # 等待遮罩消失
+                # 等待遮罩消失，最多1秒
+                try:
+                    await page.wait_for_selector('div[style*="position: fixed"][style*="z-index: 99998"]', state='hidden', timeout=1000)
+                except TimeoutError:
+                    pass
                 logging.info("已移除遮罩层")
         else:
             logging.info("页面无遮罩层，继续处理")
     except Exception as e:
         logging.info(f"处理遮罩层时出现异常: {str(e)}")
 
-async def scrape_financial_data(debug=False):
-    """
-    异步爬取多个财经网站的关键金融数据。
-    整合了 Investing.com, 东方财富, 同花顺, 新浪财经的数据源。
-    具有独立的异常处理机制，增强了程序的鲁棒性。
-    
-    Args:
-        debug: 是否开启调试模式，开启后会显示浏览器界面，便于调试
-    """
-    results = {}
-    logging.info("开始执行金融数据爬取任务...")
+# ========== scrape_financial_data 各数据源任务 ==========
+# 每个任务独立从浏览器池借用page，返回需要合并到结果中的dict片段
 
-    async with async_playwright() as p:
-        # 启动浏览器并设置context
-        context = await p.chromium.launch_persistent_context(
-            user_data_dir="user_data",
-            headless=not debug,
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36 Edg/138.0.0.0"
-        )
-        
-        
-        page = await context.new_page()
-        if debug:
-            logging.info("调试模式已开启，浏览器界面将会显示")
-
-        # 1. Investing.com - 全球宏观指标
-        logging.info("正在从 Investing.com 爬取全球宏观指标...")
-        investing_map = {
-            "DXY": "https://www.investing.com/indices/usdollar",
-            "WTI": "https://www.investing.com/commodities/crude-oil",
-            "XAU_USD": "https://www.investing.com/currencies/xau-usd",
-            "USD_CNH": "https://www.investing.com/currencies/usd-cnh",
-        }
+async def _scrape_investing_macro():
+    """Investing.com - 全球宏观指标"""
+    results = {}
+    logging.info("正在从 Investing.com 爬取全球宏观指标...")
+    investing_map = {
+        "DXY": "https://www.investing.com/indices/usdollar",
+        "WTI": "https://www.investing.com/commodities/crude-oil",
+        "XAU_USD": "https://www.investing.com/currencies/xau-usd",
+        "USD_CNH": "https://www.investing.com/currencies/usd-cnh",
+    }
+    async with get_browser_pool().page(profile="investing") as page:
         for name, url in investing_map.items():
             try:
                 await page.goto(url, timeout=60000)
@@ -693,48 +538,32 @@ async def scrape_financial_data(debug=False):
             except Exception as e:
                 logging.error(f"爬取 {name} ({url}) 时发生错误: {e}")
                 results[name] = {"error": str(e)}
-        # 2. Yahoo Finance - 美股涨幅前五 (推荐使用，结构更稳定)
-        logging.info("正在从 Yahoo Finance 爬取美股涨幅前五...")
-        us_gainers_url = "https://finance.yahoo.com/markets/stocks/gainers/"
+    return results
+
+
+async def _scrape_us_gainers():
+    """Yahoo Finance - 美股涨幅前五 (推荐使用，结构更稳定)"""
+    results = {}
+    logging.info("正在从 Yahoo Finance 爬取美股涨幅前五...")
+    us_gainers_url = "https://finance.yahoo.com/markets/stocks/gainers/"
+    async with get_browser_pool().page(profile="yahoo") as page:
         try:
             await page.goto(us_gainers_url, timeout=60000)
             await page.wait_for_selector('table tbody tr', timeout=15000)
-            await asyncio.sleep(3)  # 额外等待数据加载
-            
-            # 获取前5行数据
-            top_gainers = []
-            for i in range(5):
-                try:
-                    row_selector = f'table tbody tr:nth-child({i+1})'
-                    symbol = await page.locator(f'{row_selector} td:nth-child(1)').inner_text()
-                    name = await page.locator(f'{row_selector} td:nth-child(2)').inner_text()
-                    
-                    # 从fin-streamer元素的data-value属性获取价格
-                    price_element = page.locator(f'{row_selector} td:nth-child(4) fin-streamer[data-field="regularMarketPrice"]')
-                    price = await price_element.get_attribute('data-value') or 'N/A'
-                    
-                    # 其他字段
-                    symbol = await page.locator(f'{row_selector} td:nth-child(1)').inner_text()
-                    name = await page.locator(f'{row_selector} td:nth-child(2)').inner_text()
-                    change = await page.locator(f'{row_selector} td:nth-child(5)').inner_text()
-                    change_pct = await page.locator(f'{row_selector} td:nth-child(6)').inner_text()
-                    volume = await page.locator(f'{row_selector} td:nth-child(7)').inner_text()
-                    
-                    top_gainers.append({
-                        "排名": i + 1,
-                        "股票代码": symbol.strip(),
-                        "股票名称": name.strip(),
-                        "价格": price.strip(),
-                        "涨幅（点）": change.strip(),
-                        "涨幅百分比": change_pct.strip(),
-                        "成交额": volume.strip()
-                    })
-                except Exception as e:
-                    logging.error(f"获取第 {i+1} 个涨幅股票时出错: {e}")
-                    top_gainers.append({
-                        "rank": i + 1,
-                        "error": str(e)
-                    })
+            # 等待前5行涨幅百分比出现数值，最多3秒
+            await wait_for_numeric_text(page, 'table tbody tr td:nth-child(6)', timeout=3000, min_count=5)
+
+            # 一次evaluate获取前5行数据，价格取fin-streamer元素的data-value属性
+            rows = await extract_table(page, 'table tbody tr', {
+                "股票代码": Column("td:nth-child(1)"),
+                "股票名称": Column("td:nth-child(2)"),
+                "价格": Column('td:nth-child(4) fin-streamer[data-field="regularMarketPrice"]', attr="data-value",
+                             required=False, default="N/A"),
+                "涨幅（点）": Column("td:nth-child(5)"),
+                "涨幅百分比": Column("td:nth-child(6)"),
+                "成交额": Column("td:nth-child(7)"),
+            }, limit=5)
+            top_gainers = [{"排名": i + 1, **row} for i, row in enumerate(rows)]
             results["美股涨幅前五"] = top_gainers
             logging.info(f"成功获取美股涨幅前五: {len([g for g in top_gainers if 'error' not in g])} 只股票")
         except TimeoutError:
@@ -743,88 +572,119 @@ async def scrape_financial_data(debug=False):
         except Exception as e:
             logging.error(f"爬取Yahoo Finance涨幅榜时发生错误: {e}")
             results["US_TOP_GAINERS"] = {"error": str(e)}
-        
-        logging.info("Yahoo Finance爬取完成")
 
-        # 集成新版 Yahoo Finance 板块资金流向（多源）
-        logging.info("正在从 Yahoo Finance/MarketWatch/Finviz 爬取板块资金流向数据（新版）...")
-        try:
-            sector_scraper = SimpleSectorFlowScraper(headless=True)
-            all_data = []
-            data_sources = [
-                ("Yahoo Finance", sector_scraper.scrape_yahoo_sectors),
-                ("MarketWatch", sector_scraper.scrape_marketwatch_sectors),
-                ("Finviz", sector_scraper.scrape_finviz_sectors)
-            ]
-            for source_name, scrape_func in data_sources:
-                logging.info(f"开始爬取{source_name}板块数据...")
-                try:
-                    data = await scrape_func()
-                    if data:
-                        logging.info(f"成功获取{source_name}板块数据: {len(data)}条")
-                        all_data.extend(data)
-                    else:
-                        logging.warning(f"{source_name}未获取到数据")
-                except Exception as e:
-                    logging.error(f"{source_name}爬取出错: {e}")
-            if all_data:
-                # 去重处理（基于板块名称）
-                unique_sectors = {}
-                for item in all_data:
-                    sector_name = item['sector_name']
-                    if sector_name not in unique_sectors:
-                        unique_sectors[sector_name] = item
-                    else:
-                        existing = unique_sectors[sector_name]
-                        if item['volume'] > existing['volume']:
-                            unique_sectors[sector_name] = item
-                final_data = list(unique_sectors.values())
-                top_sectors = sector_scraper.get_top_sectors(final_data)
-                results["yahoo_sector_money_flow"] = {
-                    "raw_data": final_data,
-                    "analysis": top_sectors,
-                    "data_sources_used": len([d for d in data_sources if d[1] in [sector_scraper.scrape_yahoo_sectors, sector_scraper.scrape_marketwatch_sectors, sector_scraper.scrape_finviz_sectors]])
-                }
-                logging.info(f"成功获取美股板块资金流向（多源）: {len(final_data)}条")
+    logging.info("Yahoo Finance爬取完成")
+    return results
+
+
+async def _scrape_us_sector_flow():
+    """集成新版 Yahoo Finance 板块资金流向（多源）"""
+    results = {}
+    logging.info("正在从 Yahoo Finance/MarketWatch/Finviz 爬取板块资金流向数据（新版）...")
+    try:
+        sector_scraper = SimpleSectorFlowScraper(headless=True)
+        all_data = []
+        data_sources = [
+            ("Yahoo Finance", sector_scraper.scrape_yahoo_sectors),
+            ("MarketWatch", sector_scraper.scrape_marketwatch_sectors),
+            ("Finviz", sector_scraper.scrape_finviz_sectors)
+        ]
+        # 三个板块数据源互不依赖，并发爬取
+        source_results = await asyncio.gather(
+            *(scrape_func() for _, scrape_func in data_sources),
+            return_exceptions=True
+        )
+        for (source_name, _), data in zip(data_sources, source_results):
+            if isinstance(data, Exception):
+                logging.error(f"{source_name}爬取出错: {data}")
+            elif data:
+                logging.info(f"成功获取{source_name}板块数据: {len(data)}条")
+                all_data.extend(data)
             else:
-                results["yahoo_sector_money_flow"] = {"error": "未能获取到任何板块资金流向数据"}
-        except Exception as e:
-            logging.error(f"爬取美股板块资金流向失败: {e}")
-            results["yahoo_sector_money_flow"] = {"error": str(e)}
-
-        logging.info("正在爬取美股三大指数")
-        results["道琼斯指数数据"] = await scrape_dow_jones(page)
-        results["纳斯达克指数数据"] = await scrape_nasdaq(page)
-        results["标普500指数数据"] = await scrape_sp500(page)
-        logging.info("美股三大指数爬取完成")
-       
-        # 新增：美股每日板块数据
-        logging.info("正在爬取美股每日板块数据...")
-        sector_data = await get_daily_market_sectors()
-        if sector_data:
-            results["US_MARKET_SECTORS"] = sector_data
-        else:
-            results["US_MARKET_SECTORS"] = {"error": "Failed to get sector data"}
-        
-        # 新增：加密货币数据
-        logging.info("正在爬取加密货币数据...")
-        crypto_data = await get_crypto_data()
-        if crypto_data:
-            results["CRYPTOCURRENCY_DATA"] = crypto_data
+                logging.warning(f"{source_name}未获取到数据")
+        if all_data:
+            # 去重处理（基于板块名称）
+            unique_sectors = {}
+            for item in all_data:
+                sector_name = item['sector_name']
+                if sector_name not in unique_sectors:
+                    unique_sectors[sector_name] = item
+                else:
+                    existing = unique_sectors[sector_name]
+                    if item['volume'] > existing['volume']:
+                        unique_sectors[sector_name] = item
+            final_data = list(unique_sectors.values())
+            top_sectors = sector_scraper.get_top_sectors(final_data)
+            results["yahoo_sector_money_flow"] = {
+                "raw_data": final_data,
+                "analysis": top_sectors,
+                "data_sources_used": len(data_sources)
+            }
+            logging.info(f"成功获取美股板块资金流向（多源）: {len(final_data)}条")
         else:
-            results["CRYPTOCURRENCY_DATA"] = {"error": "Failed to get crypto data"}
+            results["yahoo_sector_money_flow"] = {"error": "未能获取到任何板块资金流向数据"}
+    except Exception as e:
+        logging.error(f"爬取美股板块资金流向失败: {e}")
+        results["yahoo_sector_money_flow"] = {"error": str(e)}
+    return results
 
 
-        # 2. 东方财富网 - A股核心数据
-        logging.info("正在从东方财富网爬取A股市场数据...")
-        # 2.1 A股三大指数
-        eastmoney_indices = {
-            "shanghai_index": ("上证指数", "https://quote.eastmoney.com/zs000001.html"),
-            "shenzhen_index": ("深证成指", "https://quote.eastmoney.com/zs399001.html"),
-            "gem_index": ("创业板指", "https://quote.eastmoney.com/zs399006.html"),
+async def _scrape_us_indices():
+    """美股三大指数"""
+    logging.info("正在爬取美股三大指数")
+    async with get_browser_pool().page(profile="investing") as page:
+        results = {
+            "道琼斯指数数据": await scrape_dow_jones(page),
+            "纳斯达克指数数据": await scrape_nasdaq(page),
+            "标普500指数数据": await scrape_sp500(page),
         }
+    logging.info("美股三大指数爬取完成")
+    return results
+
+
+async def _scrape_us_market_sectors():
+    """美股每日板块数据"""
+    logging.info("正在爬取美股每日板块数据...")
+    sector_data = await get_daily_market_sectors()
+    if sector_data:
+        return {"US_MARKET_SECTORS": sector_data}
+    return {"US_MARKET_SECTORS": {"error": "Failed to get sector data"}}
+
 
-        for key, (name, url) in eastmoney_indices.items():
+async def _scrape_crypto():
+    """加密货币数据"""
+    logging.info("正在爬取加密货币数据...")
+    crypto_data = await get_crypto_data()
+    if crypto_data:
+        return {"CRYPTOCURRENCY_DATA": crypto_data}
+    return {"CRYPTOCURRENCY_DATA": {"error": "Failed to get crypto data"}}
+
+
+async def _scrape_eastmoney_indices():
+    """东方财富网 - A股三大指数"""
+    results = {}
+    logging.info("正在从东方财富网爬取A股市场数据...")
+    # key -> (名称, 页面URL, push2行情接口secid)
+    eastmoney_indices = {
+        "shanghai_index": ("上证指数", "https://quote.eastmoney.com/zs000001.html", "1.000001"),
+        "shenzhen_index": ("深证成指", "https://quote.eastmoney.com/zs399001.html", "0.399001"),
+        "gem_index": ("创业板指", "https://quote.eastmoney.com/zs399006.html", "0.399006"),
+    }
+
+    # 优先直连push2接口，失败的指数再打开页面爬取
+    pending = dict(eastmoney_indices)
+    if eastmoney_api_enabled():
+        client = get_eastmoney_client()
+        quotes = await asyncio.gather(*(client.get_index_quote(secid) for _, _, secid in pending.values()))
+        for key, quote in zip(list(pending), quotes):
+            if quote:
+                results[key] = quote
+                logging.info(f"成功获取 {pending.pop(key)[0]} (API): {quote}")
+        if not pending:
+            return results
+
+    async with get_browser_pool().page(profile="eastmoney") as page:
+        for key, (name, url, secid) in pending.items():
             try:
                 # 设置东方财富特定headers
                 eastmoney_headers = {
@@ -843,11 +703,22 @@ async def scrape_financial_data(debug=False):
                     "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36 Edg/138.0.0.0"
                 }
 
-                await page.goto(url, timeout=60000)
-                await remove_eastmoney_mask(page)
+                quote = None
+                async with JsonResponseCapture(page, rf'push2.*\.eastmoney\.com/api/qt/stock/get.*secid={re.escape(secid)}') as capture:
+                    await page.goto(url, timeout=60000)
+                    if network_extraction_enabled():
+                        # 直接解析行情XHR，无需等待DOM渲染，原3秒固定等待作为上限
+                        captured_url, payload = await capture.next(timeout=3000, with_url=True)
+                        quote = parse_eastmoney_quote(payload, captured_url or "")
                 await page.set_extra_http_headers(eastmoney_headers)
-                # await page.wait_for_load_state('domcontentloaded')  # 等待页面加载完成
-                await asyncio.sleep(3)  # 等待额外的时间以确保数据加载
+                if quote:
+                    results[key] = quote
+                    logging.info(f"成功获取 {name} (XHR): {results[key]}")
+                    continue
+
+                # DOM兜底
+                await remove_eastmoney_mask(page)
+                await wait_for_numeric_text(page, '.zxj span span[class^="price_"]', timeout=3000)
                 # 等待价格和涨跌幅数据加载
                 await page.wait_for_selector('.zxj, .zd', timeout=10000)
 
@@ -856,7 +727,7 @@ async def scrape_financial_data(debug=False):
                 zd_spans = await page.locator('.zd span span[class^="price_"]').all()
                 change = await zd_spans[0].inner_text()
                 change_pct = await zd_spans[1].inner_text()
-                
+
                 results[key] = {
                     "price": price.strip(),
                     "change": change.strip(),
@@ -867,59 +738,120 @@ async def scrape_financial_data(debug=False):
             except Exception as e:
                 logging.error(f"爬取 {name} ({url}) 时发生错误: {e}")
                 results[key] = {"error": str(e)}
+    return results
 
-        # 2.2 板块动态 (涨跌幅 & 资金流入)
-        try:
-            logging.info("正在爬取行业板块动态...")
-            await page.goto("https://quote.eastmoney.com/center/gridlist.html#industry_board", timeout=60000)
-            await remove_eastmoney_mask(page)
-            
-            # 等待页面完全加载
-            await asyncio.sleep(2)  # 等待额外的时间以确保数据加载
-         
-            await page.wait_for_selector('th', timeout=10000)  # 等待表头加载
-            
-            # 等待表格数据加载
-            await page.wait_for_selector('.quotetable table tbody tr', state='visible', timeout=30000)
-            
-            # 行业板块涨幅Top5
-            gainers = []
-            rows = await page.locator('.quotetable table tbody tr').all()
-            for row in rows[:5]:
-                name = await row.locator("td:nth-child(2)").inner_text()
-                pct_change = await row.locator("td:nth-child(6)").inner_text()
-                gainers.append({"name": name.strip(), "change_pct": pct_change})
+
+def _board_rows_from_clist(payload, value_field: str, limit: int) -> list:
+    """从push2 clist响应中取前limit个板块的(名称, 数值)"""
+    rows = []
+    for item in parse_eastmoney_clist(payload)[:limit]:
+        value = item.get(value_field)
+        if not item.get("f14") or value in (None, "-", ""):
+            return []
+        rows.append((item["f14"], float(value)))
+    return rows
+
+
+def _pct_rows_from_clist(payload, url: str, limit: int = 5) -> list:
+    """clist涨跌幅f3，未指定fltt=2时为放大100倍的整数"""
+    scale = 1 if "fltt=2" in (url or "") else 100
+    return [{"name": name, "change_pct": f"{value / scale:.2f}%"}
+            for name, value in _board_rows_from_clist(payload, "f3", limit)]
+
+
+def _clist_order(po: int):
+    """只接受指定排序方向的clist请求，po=1为降序(涨幅榜)，po=0为升序(跌幅榜)"""
+    pattern = re.compile(rf'[?&]po={po}(&|$)')
+    return lambda url, _payload: pattern.search(url) is not None
+
+
+async def _scrape_industry_dynamics():
+    """东方财富网 - 板块动态 (涨跌幅 & 资金流入)"""
+    results = {}
+
+    # 优先直连push2接口，三项都拿到时无需打开浏览器
+    if eastmoney_api_enabled():
+        client = get_eastmoney_client()
+        gainers, losers, inflows = await asyncio.gather(
+            client.get_industry_ranking(),
+            client.get_industry_ranking(ascending=True),
+            client.get_industry_inflows()
+        )
+        if gainers and losers and inflows:
             results["industry_top_gainers"] = gainers
-            logging.info(f"成功获取行业涨幅Top5: {gainers}")
-
-            # 行业板块跌幅Top5 (通过点击排序实现)
-            await page.locator('th.sort[title="点击排序"]:nth-child(6)').click()
-            await asyncio.sleep(2) # 等待数据加载和UI更新
-            losers = []
-            rows_sorted = await page.locator("table tbody tr").all()
-            for row in rows_sorted[:5]:
-                name = await row.locator("td:nth-child(2)").inner_text()
-                pct_change = await row.locator("td:nth-child(3)").inner_text()
-                losers.append({"name": name.strip(), "change_pct": pct_change})
             results["industry_top_losers"] = losers
-            logging.info(f"成功获取行业跌幅Top5: {losers}")
-            
+            results["industry_top_inflows"] = inflows
+            logging.info(f"成功获取行业板块动态 (API): 涨幅{gainers} 跌幅{losers} 流入{inflows}")
+            return results
+        logging.warning("push2接口获取行业板块动态失败，回退到浏览器爬取")
+
+    use_network = network_extraction_enabled()
+    board_list_pattern = r'push2.*\.eastmoney\.com/api/qt/clist/get.*fs=m(:|%3A)90'
+    async with get_browser_pool().page(profile="eastmoney") as page:
+        try:
+            logging.info("正在爬取行业板块动态...")
+            async with JsonResponseCapture(page, board_list_pattern) as capture:
+                await page.goto("https://quote.eastmoney.com/center/gridlist.html#industry_board", timeout=60000)
+                await remove_eastmoney_mask(page)
+
+                # 行业板块涨幅Top5，优先解析列表XHR
+                gainers = []
+                if use_network:
+                    captured_url, payload = await capture.next(timeout=5000, with_url=True, accept=_clist_order(1))
+                    gainers = _pct_rows_from_clist(payload, captured_url)
+                if not gainers:
+                    await page.wait_for_selector('th', timeout=10000)  # 等待表头加载
+
+                    # 等待表格数据加载
+                    await page.wait_for_selector('.quotetable table tbody tr', state='visible', timeout=30000)
+                    await wait_for_numeric_text(page, '.quotetable table tbody tr td:nth-child(6)', timeout=2000, min_count=5)
+
+                    gainers = await extract_table(page, '.quotetable table tbody tr', {
+                        "name": Column("td:nth-child(2)"),
+                        "change_pct": Column("td:nth-child(6)"),
+                    }, limit=5)
+                results["industry_top_gainers"] = gainers
+                logging.info(f"成功获取行业涨幅Top5: {gainers}")
+
+                # 行业板块跌幅Top5 (通过点击排序实现，排序后页面会重新请求列表XHR)
+                first_name = gainers[0]["name"] if gainers else ""
+                # 丢弃点击前收到的响应(涨幅请求超时后迟到的响应、表格自动刷新)，
+                # 只接受升序(po=0)的列表请求，避免把涨幅数据当作跌幅
+                capture.drain()
+                await page.locator('th.sort[title="点击排序"]:nth-child(6)').click()
+                losers = []
+                if use_network:
+                    captured_url, payload = await capture.next(timeout=3000, with_url=True, accept=_clist_order(0))
+                    losers = _pct_rows_from_clist(payload, captured_url)
+                if not losers:
+                    # 等待首行板块名称变化，说明排序后的数据已刷新，最多2秒
+                    await wait_for_text_change(page, "table tbody tr:first-child td:nth-child(2)", first_name, timeout=2000)
+                    losers = await extract_table(page, "table tbody tr", {
+                        "name": Column("td:nth-child(2)"),
+                        "change_pct": Column("td:nth-child(3)"),
+                    }, limit=5)
+                results["industry_top_losers"] = losers
+                logging.info(f"成功获取行业跌幅Top5: {losers}")
+
             # 主力资金流入Top3板块 (直接访问资金流向页面)
-            await page.goto("https://data.eastmoney.com/bkzj/hy.html", timeout=60000)
-            await remove_eastmoney_mask(page)
-            await asyncio.sleep(2) # 等待数据加载
-            
-            # 等待表格数据加载
-            await page.wait_for_selector('.dataview-body table tbody tr', timeout=15000)
             inflows = []
-            rows_inflow = await page.locator(".dataview-body table tbody tr").all()
-            for row in rows_inflow[:3]:
-                name = await row.locator('td:nth-child(2)').inner_text()  # 第2列是板块名称
-                inflow_amount = await row.locator('td:nth-child(4)').inner_text()  # 第4列是主力净额
-                inflows.append({"name": name.strip(), "inflow_amount": inflow_amount})
-                # 使用新的选择器获取前3行数据
-                
+            async with JsonResponseCapture(page, r'push2.*\.eastmoney\.com/api/qt/clist/get.*fid=f62') as capture:
+                await page.goto("https://data.eastmoney.com/bkzj/hy.html", timeout=60000)
+                if use_network:
+                    # f62为主力净流入(元)
+                    captured_url, payload = await capture.next(timeout=5000, with_url=True)
+                    inflows = [{"name": name, "inflow_amount": format_cn_amount(value)}
+                               for name, value in _board_rows_from_clist(payload, "f62", 3)]
+            if not inflows:
+                await remove_eastmoney_mask(page)
 
+                # 等待表格数据加载
+                await page.wait_for_selector('.dataview-body table tbody tr', timeout=15000)
+                await wait_for_numeric_text(page, '.dataview-body table tbody tr td:nth-child(4)', timeout=2000, min_count=3)
+                inflows = await extract_table(page, ".dataview-body table tbody tr", {
+                    "name": Column("td:nth-child(2)"),  # 第2列是板块名称
+                    "inflow_amount": Column("td:nth-child(4)"),  # 第4列是主力净额
+                }, limit=3)
 
             results["industry_top_inflows"] = inflows
             logging.info(f"成功获取主力资金流入Top3: {inflows}")
@@ -927,25 +859,39 @@ async def scrape_financial_data(debug=False):
         except Exception as e:
             logging.error(f"爬取行业板块动态时发生错误: {e}\n{traceback.format_exc()}")
             results["industry_dynamics"] = {"error": str(e)}
+    return results
+
 
-        # 2.3 北向资金
+async def _scrape_northbound():
+    """东方财富网 - 北向资金"""
+    results = {}
+    async with get_browser_pool().page(profile="eastmoney") as page:
         try:
             logging.info("正在爬取北向资金数据...")
-            await page.goto("https://data.eastmoney.com/hsgt/index.html", timeout=60000)
+            northbound = None
+            async with JsonResponseCapture(page, r'push2.*\.eastmoney\.com/api/qt/kamt/get') as capture:
+                await page.goto("https://data.eastmoney.com/hsgt/index.html", timeout=60000)
+                if network_extraction_enabled():
+                    northbound = parse_northbound_kamt(await capture.next(timeout=4000))
+            if northbound:
+                results["northbound_trade"] = northbound
+                logging.info(f"成功获取北向资金成交数据 (XHR): {results['northbound_trade']}")
+                return results
+
+            # DOM兜底
             await remove_eastmoney_mask(page)
-            
-            # 等待页面加载完成
-            # await page.wait_for_load_state('domcontentloaded')
-            await asyncio.sleep(4)  # 额外等待以确保数据加载
-            
+
+            # 成交总额出现数值即就绪，原4秒固定等待作为上限
+            await wait_for_numeric_text(page, '#north_cjze', timeout=4000)
+
             # 等待北向资金数据加载
             await page.wait_for_selector('#north_h_cjze, #north_s_cjze, #north_cjze', timeout=10000)
-            
+
             # 获取沪股通、深股通和北向资金成交总额
             h_amount = (await page.locator('#north_h_cjze').inner_text()).replace('亿元', '')
             s_amount = (await page.locator('#north_s_cjze').inner_text()).replace('亿元', '')
             total_amount = (await page.locator('#north_cjze').inner_text()).replace('亿元', '')
-            
+
             results["northbound_trade"] = {
                 "沪股通成交额": f"{h_amount}亿",
                 "深股通成交额": f"{s_amount}亿",
@@ -958,39 +904,70 @@ async def scrape_financial_data(debug=False):
         except Exception as e:
             logging.error(f"爬取北向资金时发生错误: {e}")
             results["northbound_trade"] = {"error": str(e)}
+    return results
 
-        # 3. 同花顺 - 市场情绪指标
-        logging.info("正在从同花顺爬取市场情绪指标...")
-        
-        try:
-            # 使用新的scrape_today函数获取数据
-            ths_data = await scrape_today()
-            
-            results["stock_updown_summary"] = {
-                "上涨家数": str(ths_data["upCount"]),
-                "下跌家数": str(ths_data["downCount"])
-            }
-            results["stock_limit_summary"] = {
-                "涨停总数": str(ths_data["limitUpCount"]),
-                "跌停总数": str(ths_data["limitDownCount"])
+
+async def _scrape_eastmoney_sector_flow():
+    """东方财富API板块资金流向"""
+    results = {}
+    try:
+        logging.info("正在通过API爬取东方财富板块资金流向...")
+        sector_crawler = StockSectorCrawler()
+        result = await sector_crawler.crawl_sector_money_flow()
+        if result:
+            analysis, all_sectors = result
+            results["eastmoney_sector_money_flow"] = {
+                "analysis": analysis,
+                "all_sectors": all_sectors
             }
-            results["stock_limit_up_list"] = ths_data["limitUpList"]
-            results["stock_limit_down_list"] = ths_data["limitDownList"]
-            
-            logging.info(f"成功获取涨跌家数: {results['stock_updown_summary']}")
-            logging.info(f"涨幅前三: {len(ths_data['limitUpList'])}只")
-            logging.info(f"跌幅前三: {len(ths_data['limitDownList'])}只")
-        except Exception as e:
-            logging.error(f"爬取上涨/下跌家数时发生错误: {e}")
-            results["stock_updown_summary"] = {"error": str(e)}
+            logging.info(f"成功获取东方财富API板块资金流向: {analysis}")
+        else:
+            results["eastmoney_sector_money_flow"] = {"error": "API未获取到数据"}
+    except Exception as e:
+        logging.error(f"东方财富API板块资金流向爬取失败: {e}")
+        results["eastmoney_sector_money_flow"] = {"error": str(e)}
+    return results
+
+
+async def _scrape_ths_sentiment():
+    """同花顺 - 市场情绪指标"""
+    results = {}
+    logging.info("正在从同花顺爬取市场情绪指标...")
+
+    try:
+        # 使用新的scrape_today函数获取数据
+        ths_data = await scrape_today()
+
+        results["stock_updown_summary"] = {
+            "上涨家数": str(ths_data["upCount"]),
+            "下跌家数": str(ths_data["downCount"])
+        }
+        results["stock_limit_summary"] = {
+            "涨停总数": str(ths_data["limitUpCount"]),
+            "跌停总数": str(ths_data["limitDownCount"])
+        }
+        results["stock_limit_up_list"] = ths_data["limitUpList"]
+        results["stock_limit_down_list"] = ths_data["limitDownList"]
+
+        logging.info(f"成功获取涨跌家数: {results['stock_updown_summary']}")
+        logging.info(f"涨幅前三: {len(ths_data['limitUpList'])}只")
+        logging.info(f"跌幅前三: {len(ths_data['limitDownList'])}只")
+    except Exception as e:
+        logging.error(f"爬取上涨/下跌家数时发生错误: {e}")
+        results["stock_updown_summary"] = {"error": str(e)}
+    return results
 
-        # 4. 新浪财经 - 总成交额
-        logging.info("正在从新浪财经爬取总成交额...")
+
+async def _scrape_market_turnover():
+    """新浪财经 - 总成交额"""
+    results = {}
+    logging.info("正在从新浪财经爬取总成交额...")
+    async with get_browser_pool().page(profile="sina") as page:
         try:
             await page.goto("https://finance.sina.com.cn/data/", timeout=60000)
-            await asyncio.sleep(3)  # 等待页面加载完成
             await page.wait_for_selector("#stockA_index_wrap", timeout=10000)
-            await asyncio.sleep(2)  # 额外等待以确保数据加载
+            # 沪深两市数据出现数值即就绪，原5秒固定等待作为上限
+            await wait_for_numeric_text(page, "#stockA_index_wrap > dl > dd > span", timeout=5000, min_count=2)
             sh_turnover = await page.locator("#stockA_index_wrap > dl:nth-child(1) > dd > span").inner_text()
             sz_turnover = await page.locator("#stockA_index_wrap > dl:nth-child(2) > dd > span").inner_text()
             results["market_total_turnover"] = {"沪市指数、涨跌幅、总成交额": sh_turnover, "深市指数、涨跌幅、总成交额": sz_turnover}
@@ -998,9 +975,110 @@ async def scrape_financial_data(debug=False):
         except Exception as e:
             logging.error(f"爬取总成交额时发生错误: {e}")
             results["market_total_turnover"] = {"error": str(e)}
+    return results
+
+
+# 数据源名称 -> (爬取任务, 超时秒数, 超时/异常时写入error的结果key)
+# 顺序即结果dict中key的顺序，与原先串行爬取时保持一致
+SCRAPE_SOURCES = {
+    "investing_macro": (_scrape_investing_macro, 240, ["DXY", "WTI", "XAU_USD", "USD_CNH"]),
+    "us_gainers": (_scrape_us_gainers, 90, ["US_TOP_GAINERS"]),
+    "us_sector_flow": (_scrape_us_sector_flow, 120, ["yahoo_sector_money_flow"]),
+    "us_indices": (_scrape_us_indices, 200, ["道琼斯指数数据", "纳斯达克指数数据", "标普500指数数据"]),
+    "us_market_sectors": (_scrape_us_market_sectors, 180, ["US_MARKET_SECTORS"]),
+    "crypto": (_scrape_crypto, 400, ["CRYPTOCURRENCY_DATA"]),
+    "eastmoney_indices": (_scrape_eastmoney_indices, 240, ["shanghai_index", "shenzhen_index", "gem_index"]),
+    "industry_dynamics": (_scrape_industry_dynamics, 180, ["industry_dynamics"]),
+    "northbound": (_scrape_northbound, 90, ["northbound_trade"]),
+    "eastmoney_sector_flow": (_scrape_eastmoney_sector_flow, 60, ["eastmoney_sector_money_flow"]),
+    "ths_sentiment": (_scrape_ths_sentiment, 180, ["stock_updown_summary"]),
+    "market_turnover": (_scrape_market_turnover, 90, ["market_total_turnover"]),
+}
+
+
+async def _run_source(name, semaphore):
+    """在并发限制和超时控制下执行单个数据源任务"""
+    scrape_func, timeout, error_keys = SCRAPE_SOURCES[name]
+    timeout = float(os.getenv(f"SCRAPE_TIMEOUT_{name.upper()}", timeout))
+    async with semaphore:
+        # 排队等待浏览器池空闲page的时间不计入超时，超时只衡量数据源本身的耗时
+        tracker = PoolWaitTracker()
+        token = pool_wait_tracker.set(tracker)
+        try:
+            task = asyncio.ensure_future(scrape_func())
+        finally:
+            pool_wait_tracker.reset(token)
+        start = time.monotonic()
+        try:
+            while not task.done():
+                remaining = timeout - (time.monotonic() - start - tracker.waited)
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait({task}, timeout=remaining)
+            fragment = task.result()
+            logging.info(f"数据源 {name} 完成，耗时 {time.monotonic() - start:.1f}s(等待浏览器 {tracker.waited:.1f}s)")
+            return fragment
+        except asyncio.TimeoutError:
+            logging.error(f"数据源 {name} 超过 {timeout:.0f}s 未完成，已放弃")
+            return {key: {"error": f"Timeout after {timeout:.0f}s"} for key in error_keys}
+        except Exception as e:
+            logging.error(f"数据源 {name} 执行失败: {e}\n{traceback.format_exc()}")
+            return {key: {"error": str(e)} for key in error_keys}
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+
+_scrape_semaphore = None
+
+
+async def scrape_sources(names=None, debug=False):
+    """
+    并发爬取指定数据源
+
+    Args:
+        names: SCRAPE_SOURCES中的数据源名称列表，None表示全部
+        debug: 是否开启调试模式，开启后会显示浏览器界面，便于调试
+
+    Returns:
+        数据源名称 -> 该数据源的结果片段
+    """
+    names = list(SCRAPE_SOURCES) if names is None else [name for name in SCRAPE_SOURCES if name in names]
+
+    # 复用进程级浏览器池，调试模式仅在浏览器池尚未启动时生效
+    pool = get_browser_pool()
+    if debug and not pool.started:
+        pool.headless = False
+    if debug:
+        logging.info("调试模式已开启，浏览器界面将会显示")
+
+    # 并发上限，默认与浏览器池context数量一致；进程内共享，定时刷新和按需爬取一起受限
+    global _scrape_semaphore
+    if _scrape_semaphore is None:
+        _scrape_semaphore = asyncio.Semaphore(int(os.getenv('SCRAPE_CONCURRENCY', pool.max_contexts)))
+    fragments = await asyncio.gather(*(_run_source(name, _scrape_semaphore) for name in names))
+    return dict(zip(names, fragments))
+
+
+async def scrape_financial_data(debug=False, sources=None):
+    """
+    异步爬取多个财经网站的关键金融数据。
+    整合了 Investing.com, 东方财富, 同花顺, 新浪财经的数据源。
+    各数据源作为独立任务并发执行，具有独立的超时和异常处理机制，
+    单个网站变慢或失败不会拖累其他数据源。
+
+    Args:
+        debug: 是否开启调试模式，开启后会显示浏览器界面，便于调试
+        sources: 只爬取指定的数据源(SCRAPE_SOURCES中的名称)，None表示全部
+    """
+    results = {}
+    logging.info("开始执行金融数据爬取任务...")
+
+    fragments = await scrape_sources(sources, debug=debug)
+    for fragment in fragments.values():
+        results.update(fragment)
 
-        await context.close()
-    
     logging.info("所有爬取任务已完成。")
     return results
 
@@ -1008,6 +1086,8 @@ async def main():
     """主函数，用于执行爬虫并打印结果。"""
     # 如果需要调试，传入debug=True
     scraped_data = await scrape_financial_data(debug=True)
+    await stop_browser_pool()
+    await close_eastmoney_client()
     
     # 使用pprint获得更美观的格式化输出
     import pprint
@@ -1028,7 +1108,6 @@ async def main():
         print(pd.DataFrame(scraped_data["CRYPTOCURRENCY_DATA"]).to_string(index=False))
 
 # ===== 东方财富板块资金流向API爬虫类（来自 volume.py） =====
-import time
 
 class StockSectorCrawler:
     def __init__(self):
@@ -1076,46 +1155,46 @@ class StockSectorCrawler:
             return []
 
     async def parse_sector_data(self, raw_data):
-        sectors = []
-        for item in raw_data:
-            try:
-                sector_info = {
-                    'code': item.get('f12', ''),
-                    'name': item.get('f14', ''),
-                    'price': item.get('f2', 0),
-                    'change_pct': item.get('f3', 0),
-                    'main_net_inflow': item.get('f62', 0),
-                    'main_net_inflow_pct': item.get('f184', 0),
-                    'super_large_net_inflow': item.get('f66', 0),
-                    'large_net_inflow': item.get('f69', 0),
-                    'medium_net_inflow': item.get('f72', 0),
-                    'small_net_inflow': item.get('f75', 0),
-                    'super_large_inflow': item.get('f78', 0),
-                    'super_large_outflow': item.get('f79', 0),
-                    'large_inflow': item.get('f81', 0),
-                    'large_outflow': item.get('f82', 0),
-                    'medium_inflow': item.get('f84', 0),
-                    'medium_outflow': item.get('f85', 0),
-                    'small_inflow': item.get('f87', 0),
-                    'small_outflow': item.get('f88', 0),
-                    'total_turnover': item.get('f124', 0),
-                }
-                money_fields = ['main_net_inflow', 'super_large_net_inflow', 'large_net_inflow',
-                                'medium_net_inflow', 'small_net_inflow', 'super_large_inflow',
-                                'super_large_outflow', 'large_inflow', 'large_outflow',
-                                'medium_inflow', 'medium_outflow', 'small_inflow', 'small_outflow']
-                for field in money_fields:
-                    if sector_info[field]:
-                        sector_info[field] = sector_info[field] / 10000
-                sectors.append(sector_info)
-            except Exception as e:
-                continue
-        return sectors
+        numeric_fields = {
+            'price': 'f2',
+            'change_pct': 'f3',
+            'main_net_inflow': 'f62',
+            'main_net_inflow_pct': 'f184',
+            'super_large_net_inflow': 'f66',
+            'large_net_inflow': 'f69',
+            'medium_net_inflow': 'f72',
+            'small_net_inflow': 'f75',
+            'super_large_inflow': 'f78',
+            'super_large_outflow': 'f79',
+            'large_inflow': 'f81',
+            'large_outflow': 'f82',
+            'medium_inflow': 'f84',
+            'medium_outflow': 'f85',
+            'small_inflow': 'f87',
+            'small_outflow': 'f88',
+            'total_turnover': 'f124',
+        }
+        money_fields = ['main_net_inflow', 'super_large_net_inflow', 'large_net_inflow',
+                        'medium_net_inflow', 'small_net_inflow', 'super_large_inflow',
+                        'super_large_outflow', 'large_inflow', 'large_outflow',
+                        'medium_inflow', 'medium_outflow', 'small_inflow', 'small_outflow']
+        items = [item for item in raw_data if isinstance(item, dict)]
+        if not items:
+            return []
+        # 按列批量解析，停牌板块的"-"等无法解析的值为None
+        df = pd.DataFrame({name: parse_numbers(item.get(field, 0) for item in items)
+                           for name, field in numeric_fields.items()})
+        df[money_fields] = df[money_fields] / 10000
+        df.insert(0, 'name', [item.get('f14', '') for item in items])
+        df.insert(0, 'code', [item.get('f12', '') for item in items])
+        return df.astype(object).where(df.notna(), None).to_dict('records')
 
     def analyze_sectors(self, sectors):
         if not sectors:
             return None
-        df = pd.DataFrame(sectors)
+        df = pd.DataFrame(sectors).dropna(subset=['main_net_inflow'])
+        if df.empty:
+            return None
         df_sorted = df.sort_values('main_net_inflow', ascending=False)
         max_inflow_sector = df_sorted.iloc[0]
         max_outflow_sector = df_sorted.iloc[-1]
@@ -1139,53 +1218,29 @@ class StockSectorCrawler:
         }
         return result
 
-    async def crawl_sector_money_flow(self, playwright=None):
-        # playwright参数可复用外部实例
-        close_browser = False
-        if playwright is None:
-            playwright = await async_playwright().start()
-            close_browser = True
-        browser = await playwright.chromium.launch(headless=True, args=['--no-sandbox', '--disable-dev-shm-usage'])
+    async def crawl_sector_money_flow(self):
+        # 优先直连push2接口，失败时再借用浏览器池的page
+        if eastmoney_api_enabled():
+            raw_data = await get_eastmoney_client().get_sector_money_flow()
+            sectors = await self.parse_sector_data(raw_data) if raw_data else None
+            if sectors:
+                return self.analyze_sectors(sectors), sectors
+            logging.warning("push2接口获取板块资金流向失败，回退到浏览器爬取")
         try:
-            page = await browser.new_page()
-            await page.set_extra_http_headers(self.headers)
-            await page.set_viewport_size({"width": 1920, "height": 1080})
-            raw_data = await self.get_sector_data(page)
-            if not raw_data:
-                return None
-            sectors = await self.parse_sector_data(raw_data)
-            if not sectors:
-                return None
-            analysis_result = self.analyze_sectors(sectors)
-            return analysis_result, sectors
+            async with get_browser_pool().page(profile="eastmoney") as page:
+                await page.set_extra_http_headers(self.headers)
+                await page.set_viewport_size({"width": 1920, "height": 1080})
+                raw_data = await self.get_sector_data(page)
+                if not raw_data:
+                    return None
+                sectors = await self.parse_sector_data(raw_data)
+                if not sectors:
+                    return None
+                analysis_result = self.analyze_sectors(sectors)
+                return analysis_result, sectors
         except Exception as e:
             print(f"爬取过程中发生错误: {e}")
             return None
-        finally:
-            await browser.close()
-            if close_browser:
-                await playwright.stop()
-
-# ========== 修改 scrape_financial_data，集成东方财富API板块资金流向 ==========
-# 在东方财富网部分最后添加如下调用
-# ...
-#         # 2.4 东方财富API板块资金流向
-        try:
-            logging.info("正在通过API爬取东方财富板块资金流向...")
-            sector_crawler = StockSectorCrawler()
-            # 复用playwright实例，避免重复启动
-            result = await sector_crawler.crawl_sector_money_flow(playwright=p)
-            if result:
-                analysis, all_sectors = result
-                results["eastmoney_sector_money_flow"] = {
-                    "analysis": analysis,
-                    "all_sectors": all_sectors
-                }
-                logging.info(f"成功获取东方财富API板块资金流向: {analysis}")
-            else:
-                results["eastmoney_sector_money_flow"] = {"error": "API未获取到数据"}
-        except Exception as e:
-            logging.error(f"东方财富API板块资金流向爬取失败: {e}")
 
 if __name__ == "__main__":
     # 在 Windows 上运行时，设置此策略以避免事件循环错误
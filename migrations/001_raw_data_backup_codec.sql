@@ -0,0 +1,10 @@
+-- ================================================================
+-- 已有数据库升级：raw_data_backup 支持压缩存储
+-- 新建数据库直接执行 database_setup.sql 即可，无需执行本文件
+-- ================================================================
+USE financial_scraper;
+
+ALTER TABLE raw_data_backup
+    MODIFY COLUMN raw_json LONGTEXT COMMENT '原始JSON数据(codec为空或json时使用)',
+    ADD COLUMN raw_blob LONGBLOB COMMENT '压缩后的原始数据' AFTER raw_json,
+    ADD COLUMN codec VARCHAR(32) COMMENT '编码方式，如msgpack+zstd、json+zlib，为空表示raw_json中的JSON文本' AFTER raw_blob;
@@ -0,0 +1,12 @@
+-- ================================================================
+-- 已有数据库升级：raw_data_backup 支持关键帧 + 差分存储
+-- 已有数据均为完整快照，snapshot_type默认为keyframe
+-- ================================================================
+USE financial_scraper;
+
+ALTER TABLE raw_data_backup
+    ADD COLUMN snapshot_type VARCHAR(10) DEFAULT 'keyframe' COMMENT 'keyframe: 完整快照, delta: 与上一次快照的差异' AFTER codec,
+    ADD COLUMN keyframe_record_id BIGINT COMMENT '所属关键帧的record_id' AFTER snapshot_type,
+    ADD INDEX idx_keyframe (keyframe_record_id, record_id);
+
+UPDATE raw_data_backup SET keyframe_record_id = record_id WHERE keyframe_record_id IS NULL;
@@ -0,0 +1,58 @@
+-- ================================================================
+-- 已有数据库升级：新增latest_indicator_values表，并用历史数据中各指标的最新值初始化
+-- ================================================================
+USE financial_scraper;
+
+CREATE TABLE IF NOT EXISTS latest_indicator_values (
+    source VARCHAR(20) NOT NULL COMMENT '数据源(macro/crypto/turnover/a_stock)',
+    indicator VARCHAR(100) NOT NULL COMMENT '指标代码或名称',
+    record_id BIGINT NOT NULL COMMENT '最新值所在的scrape_records主键',
+    scrape_time DATETIME NOT NULL COMMENT '最新值的爬取时间',
+    value DECIMAL(25,8) COMMENT '数值',
+    value_text VARCHAR(200) COMMENT '原始文本',
+    change_percent DECIMAL(8,4) COMMENT '涨跌幅百分比',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, indicator)
+) ENGINE=InnoDB COMMENT='各指标最新值';
+
+INSERT INTO latest_indicator_values (source, indicator, record_id, scrape_time, value, value_text, change_percent)
+SELECT 'macro', t.indicator_code, t.record_id, sr.scrape_time, t.price, t.price_text, t.change_percent
+FROM global_macro_indicators t
+JOIN (SELECT indicator_code, MAX(record_id) AS record_id FROM global_macro_indicators
+      WHERE is_error = FALSE GROUP BY indicator_code) m
+  ON m.indicator_code = t.indicator_code AND m.record_id = t.record_id
+JOIN scrape_records sr ON sr.id = t.record_id
+WHERE t.is_error = FALSE
+ON DUPLICATE KEY UPDATE record_id = VALUES(record_id);
+
+INSERT INTO latest_indicator_values (source, indicator, record_id, scrape_time, value, value_text, change_percent)
+SELECT 'crypto', t.crypto_symbol, t.record_id, sr.scrape_time, t.current_price, NULL, t.change_percent_24h
+FROM crypto_data t
+JOIN (SELECT crypto_symbol, MAX(record_id) AS record_id FROM crypto_data
+      WHERE is_error = FALSE GROUP BY crypto_symbol) m
+  ON m.crypto_symbol = t.crypto_symbol AND m.record_id = t.record_id
+JOIN scrape_records sr ON sr.id = t.record_id
+WHERE t.is_error = FALSE
+ON DUPLICATE KEY UPDATE record_id = VALUES(record_id);
+
+INSERT INTO latest_indicator_values (source, indicator, record_id, scrape_time, value, value_text, change_percent)
+SELECT 'turnover', t.market_type, t.record_id, sr.scrape_time, t.total_turnover, t.turnover_text, NULL
+FROM market_turnover t
+JOIN (SELECT market_type, MAX(record_id) AS record_id FROM market_turnover
+      WHERE is_error = FALSE GROUP BY market_type) m
+  ON m.market_type = t.market_type AND m.record_id = t.record_id
+JOIN scrape_records sr ON sr.id = t.record_id
+WHERE t.is_error = FALSE
+ON DUPLICATE KEY UPDATE record_id = VALUES(record_id);
+
+INSERT INTO latest_indicator_values (source, indicator, record_id, scrape_time, value, value_text, change_percent)
+SELECT 'a_stock', t.metric_name, t.record_id, sr.scrape_time,
+       IF(t.metric_value REGEXP '^-?[0-9]+([.][0-9]+)?$', CAST(t.metric_value AS DECIMAL(25,8)), NULL),
+       LEFT(t.metric_value, 200), NULL
+FROM a_stock_statistics t
+JOIN (SELECT metric_name, MAX(record_id) AS record_id FROM a_stock_statistics
+      WHERE is_error = FALSE AND additional_info IS NULL GROUP BY metric_name) m
+  ON m.metric_name = t.metric_name AND m.record_id = t.record_id
+JOIN scrape_records sr ON sr.id = t.record_id
+WHERE t.is_error = FALSE AND t.additional_info IS NULL
+ON DUPLICATE KEY UPDATE record_id = VALUES(record_id);
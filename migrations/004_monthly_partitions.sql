@@ -0,0 +1,52 @@
+-- ================================================================
+-- 已有数据库升级：爬取记录表及各子表改为按created_at月分区
+-- 1. 分区表不支持外键：删除子表指向scrape_records的外键(名称为MySQL自动生成的<表名>_ibfk_1，
+--    如有不同请先用 SHOW CREATE TABLE 确认)
+-- 2. 主键需包含分区列：主键改为(id, created_at)
+-- 3. 先全部放入p_future分区，应用启动时DatabaseManager.ensure_partitions会把p_future从最早数据所在月份起拆分为月分区，
+--    历史数据按月落入各自的分区，超过DB_RETENTION_MONTHS的月份随后按月删除
+-- 大表的ALTER会重建整张表，请在低峰期执行并预留同等大小的磁盘空间
+-- ================================================================
+USE financial_scraper;
+
+ALTER TABLE global_macro_indicators DROP FOREIGN KEY global_macro_indicators_ibfk_1;
+ALTER TABLE us_stock_gainers DROP FOREIGN KEY us_stock_gainers_ibfk_1;
+ALTER TABLE a_stock_statistics DROP FOREIGN KEY a_stock_statistics_ibfk_1;
+ALTER TABLE market_turnover DROP FOREIGN KEY market_turnover_ibfk_1;
+ALTER TABLE crypto_data DROP FOREIGN KEY crypto_data_ibfk_1;
+ALTER TABLE raw_data_backup DROP FOREIGN KEY raw_data_backup_ibfk_1;
+
+ALTER TABLE scrape_records
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+
+ALTER TABLE global_macro_indicators
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+
+ALTER TABLE us_stock_gainers
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+
+ALTER TABLE a_stock_statistics
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+
+ALTER TABLE market_turnover
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+
+ALTER TABLE crypto_data
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+
+ALTER TABLE raw_data_backup
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (PARTITION p_future VALUES LESS THAN MAXVALUE);
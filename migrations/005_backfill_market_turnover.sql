@@ -0,0 +1,27 @@
+-- ================================================================
+-- 已有数据库升级：补齐market_turnover.total_turnover
+-- 数值解析统一到number_parsing之前，total_turnover一直写入NULL，/timeseries的turnover数据源
+-- 只能查到之后新写入的数据；这里从turnover_text(形如 "3450.12 +12.30 +0.36% 5123.45亿")
+-- 中带万/亿/万亿单位的数值还原总成交额，规则与_save_market_turnover_data一致
+-- 需要MySQL 8.0+(REGEXP_SUBSTR)；已归档为Parquet的月份不受影响，需重新归档
+-- ================================================================
+USE financial_scraper;
+
+UPDATE market_turnover
+SET total_turnover = CAST(REPLACE(
+        REGEXP_SUBSTR(REGEXP_SUBSTR(turnover_text, '[0-9][0-9,]*([.][0-9]+)? *(万亿|亿|万)'), '[0-9][0-9,]*([.][0-9]+)?'),
+        ',', '') AS DECIMAL(25,4))
+    * CASE
+        WHEN REGEXP_SUBSTR(turnover_text, '[0-9][0-9,]*([.][0-9]+)? *(万亿|亿|万)') LIKE '%万亿' THEN 1000000000000
+        WHEN REGEXP_SUBSTR(turnover_text, '[0-9][0-9,]*([.][0-9]+)? *(万亿|亿|万)') LIKE '%亿' THEN 100000000
+        ELSE 10000
+      END
+WHERE total_turnover IS NULL
+  AND is_error = FALSE
+  AND turnover_text REGEXP '[0-9] *(万亿|亿|万)';
+
+-- 003初始化的最新值取自补齐之前的total_turnover
+UPDATE latest_indicator_values l
+JOIN market_turnover t ON t.record_id = l.record_id AND t.market_type = l.indicator AND t.is_error = FALSE
+SET l.value = t.total_turnover
+WHERE l.source = 'turnover' AND l.value IS NULL AND t.total_turnover IS NOT NULL;
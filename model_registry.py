@@ -0,0 +1,241 @@
+"""
+ASR与对齐模型缓存
+whisperx.load_model / load_align_model 每次加载都要读取数GB权重，这里按
+(类型, 模型, 语言, 设备, compute_type) 在进程内缓存已加载的模型：
+- 超出MODEL_CACHE_BUDGET_MB时按最近最少使用淘汰
+- 同一模型并发请求时只加载一次
+- MODEL_WARMUP=true 时在/align工作进程启动时预加载
+缓存属于所在进程，/align的模型在align_executor的工作进程中加载和复用；whisperx、torch在首次使用时才导入
+"""
+import gc
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from import_timing import timed_import
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ASR_MODEL = "large-v3"
+
+# 中文使用指定的wav2vec2模型，其余语言使用whisperx的默认对齐模型
+ALIGN_MODEL_NAMES = {
+    "zh": "jonatasgrosman/wav2vec2-large-xlsr-53-chinese-zh-cn",
+}
+
+# CTranslate2模型无法统计参数大小，按权重文件大小估算(MB)
+ASR_MODEL_SIZE_MB = {
+    "tiny": 80,
+    "base": 150,
+    "small": 500,
+    "medium": 1500,
+    "large-v2": 3100,
+    "large-v3": 3100,
+}
+
+
+class ModelKey(NamedTuple):
+    """
+    缓存键
+
+    kind: asr / align
+    model: 模型名，align使用默认模型时为None
+    language: 语言代码，asr不指定语言时为None
+    """
+    kind: str
+    model: Optional[str]
+    language: Optional[str]
+    device: str
+    compute_type: Optional[str]
+
+
+def default_device() -> Tuple[str, str]:
+    """有GPU时使用cuda+float16，否则cpu+float32"""
+    torch = timed_import("torch")
+    if torch.cuda.is_available():
+        return "cuda", "float16"
+    return "cpu", "float32"
+
+
+def _estimate_size_mb(key: ModelKey, loaded: Any) -> float:
+    """torch模型按参数和buffer统计，其余按ASR_MODEL_SIZE_MB估算"""
+    model = loaded[0] if isinstance(loaded, tuple) else loaded
+    if hasattr(model, "parameters"):
+        tensors = list(model.parameters()) + list(getattr(model, "buffers", list)())
+        return sum(t.numel() * t.element_size() for t in tensors) / (1024 * 1024)
+    return ASR_MODEL_SIZE_MB.get(key.model, ASR_MODEL_SIZE_MB[DEFAULT_ASR_MODEL])
+
+
+class ModelRegistry:
+    """进程内的模型LRU缓存"""
+
+    def __init__(self, budget_mb: float):
+        """
+        Args:
+            budget_mb: 缓存模型的总大小上限(MB)，0表示不限制；
+                单个模型超过上限时仍会加载，但会淘汰其他所有模型
+        """
+        self.budget_mb = budget_mb
+        self._models: "OrderedDict[ModelKey, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[ModelKey, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def used_mb(self) -> float:
+        return sum(size for _, size in self._models.values())
+
+    def get(self, key: ModelKey, loader: Callable[[], Any]) -> Any:
+        """
+        获取模型，未缓存时调用loader加载
+
+        Args:
+            key: 缓存键
+            loader: 加载函数，加载失败时抛出的异常原样传给调用方，不写入缓存
+
+        Returns:
+            loader的返回值
+        """
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key][0]
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # 等待期间其他请求可能已加载完成
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    self.hits += 1
+                    return self._models[key][0]
+                self.misses += 1
+
+            started = time.perf_counter()
+            try:
+                loaded = loader()
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+            size_mb = _estimate_size_mb(key, loaded)
+            logger.info(f"加载模型 {key} 耗时 {time.perf_counter() - started:.1f}秒, 约 {size_mb:.0f}MB")
+
+            with self._lock:
+                self._models[key] = (loaded, size_mb)
+                evicted = self._evict(keep=key)
+            if evicted:
+                self._release(evicted)
+            return loaded
+
+    def _evict(self, keep: ModelKey) -> List[ModelKey]:
+        """按LRU淘汰到预算以内，调用方需持有self._lock"""
+        evicted = []
+        if not self.budget_mb:
+            return evicted
+        while self.used_mb > self.budget_mb and len(self._models) > 1:
+            key = next(iter(self._models))
+            if key == keep:
+                self._models.move_to_end(key)
+                continue
+            self._models.pop(key)
+            evicted.append(key)
+        return evicted
+
+    def _release(self, evicted: List[ModelKey]):
+        logger.info(f"模型缓存超出 {self.budget_mb:.0f}MB，已淘汰: {evicted}")
+        gc.collect()
+        if any(key.device == "cuda" for key in evicted):
+            timed_import("torch").cuda.empty_cache()
+
+    def clear(self):
+        with self._lock:
+            evicted = list(self._models)
+            self._models.clear()
+        if evicted:
+            self._release(evicted)
+
+    def get_asr_model(self, model: str = DEFAULT_ASR_MODEL, language: Optional[str] = None,
+                      device: Optional[str] = None, compute_type: Optional[str] = None):
+        """获取whisperx ASR模型，device为空时自动选择"""
+        if device is None:
+            device, compute_type = default_device()
+        key = ModelKey("asr", model, language, device, compute_type)
+
+        def load():
+            whisperx = timed_import("whisperx")
+            return whisperx.load_model(model, device=device, compute_type=compute_type, language=language)
+
+        return self.get(key, load)
+
+    def get_align_model(self, language: str, device: Optional[str] = None,
+                        model_name: Optional[str] = None) -> Tuple[Any, dict]:
+        """
+        获取whisperx对齐模型
+
+        Args:
+            language: 语言代码
+            device: 为空时自动选择
+            model_name: 为空时使用whisperx该语言的默认模型
+
+        Returns:
+            (对齐模型, metadata)
+        """
+        if device is None:
+            device, _ = default_device()
+        key = ModelKey("align", model_name, language, device, None)
+
+        def load():
+            whisperx = timed_import("whisperx")
+            return whisperx.load_align_model(language_code=language, device=device, model_name=model_name)
+
+        return self.get(key, load)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget_mb": self.budget_mb,
+                "used_mb": round(self.used_mb, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "models": [dict(key._asdict(), size_mb=round(size, 1)) for key, (_, size) in self._models.items()],
+            }
+
+
+_model_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """获取进程级模型缓存（MODEL_CACHE_BUDGET_MB配置上限）"""
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry(float(os.getenv('MODEL_CACHE_BUDGET_MB', 8192)))
+    return _model_registry
+
+
+def warm_up(languages: List[str]):
+    """预加载ASR模型和各语言的对齐模型，与/align使用相同的缓存键"""
+    registry = get_model_registry()
+    registry.get_asr_model()
+    for language in languages:
+        registry.get_align_model(language, model_name=ALIGN_MODEL_NAMES.get(language))
+
+
+def warmup_enabled() -> bool:
+    return os.getenv('MODEL_WARMUP', 'false').lower() == 'true'
+
+
+def warm_up_from_env():
+    """MODEL_WARMUP=true 时预加载，MODEL_WARMUP_LANGUAGES指定对齐模型的语言；在/align工作进程启动时调用"""
+    if not warmup_enabled():
+        return
+    languages = [item.strip() for item in os.getenv('MODEL_WARMUP_LANGUAGES', 'zh').split(',') if item.strip()]
+    try:
+        warm_up(languages)
+        logger.info(f"模型预加载完成: {get_model_registry().stats()['models']}")
+    except Exception as e:
+        logger.error(f"模型预加载失败: {e}")
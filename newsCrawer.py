@@ -8,6 +8,7 @@ import re # 新增导入
 import sys # 新增导入
 import random # 新增导入
 from playwright.async_api import async_playwright
+from resource_profiles import apply_resource_profile
 
 app = FastAPI()
 
@@ -64,6 +65,7 @@ async def get_cls_news(start_date: datetime, end_date: datetime):
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         page = await browser.new_page()
+        await apply_resource_profile(page, "news")
         
         try:
             await page.goto("https://www.cls.cn/", timeout=30000)
@@ -162,6 +164,7 @@ async def get_cls_news(start_date: datetime, end_date: datetime):
                     summary = ""
                     try:
                         detail_page = await browser.new_page()
+                        await apply_resource_profile(detail_page, "news")
                         await detail_page.goto(full_url, timeout=15000)
                         await detail_page.wait_for_load_state('networkidle', timeout=10000)
                         
@@ -218,6 +221,7 @@ async def get_wsj_news(start_date: datetime, end_date: datetime):
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         page = await browser.new_page()
+        await apply_resource_profile(page, "news")
         
         # 设置用户代理避免反爬
         await page.set_extra_http_headers({
@@ -487,6 +491,7 @@ async def get_weibo_hot_search():
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         page = await browser.new_page()
+        await apply_resource_profile(page, "news")
         await page.goto("https://s.weibo.com/top/summary")
         await page.wait_for_selector(".td-02")
         items = await page.query_selector_all("table tbody tr")
@@ -0,0 +1,185 @@
+"""
+爬取文本的数值解析
+统一处理 "1,234.56"、"+0.45%"、"3521亿"、"1.2M"、"$12.5B" 等格式：
+- 千分位逗号、货币符号、正负号(含全角减号)
+- 中文单位 万/亿/万亿，英文后缀 K/M/B/T
+- 百分号：返回百分点数值(如 "+0.45%" -> 0.45)
+单个值用parse_number / parse_decimal / parse_int，整列数据用parse_numbers(pandas/NumPy批量)
+"""
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterable, List, NamedTuple, Optional
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = pd = None
+
+_MULTIPLIERS = {
+    '万': 10 ** 4,
+    '亿': 10 ** 8,
+    '万亿': 10 ** 12,
+    'K': 10 ** 3,
+    'M': 10 ** 6,
+    'B': 10 ** 9,
+    'T': 10 ** 12,
+}
+_MULTIPLIERS.update({unit.lower(): value for unit, value in list(_MULTIPLIERS.items()) if unit.isascii()})
+
+_NEGATIVE_SIGNS = ('-', '−')
+
+# 英文后缀后面(含中间的空白)不能再出现字母，"3M Company"、"1.2 Million"中的字母不当作单位；
+# 因此 "1.2M shares" 也只解析为1.2，爬取的数值字段不会出现这种写法
+_NUMBER_PATTERN = (
+    r'(?P<sign>[+\-−])?\s*[$¥￥]?\s*'
+    r'(?P<number>(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?|\.\d+)'
+    r'\s*(?P<unit>万亿|万|亿|[KMBTkmbt](?!\s*[A-Za-z]))?'
+    r'\s*(?P<percent>%)?'
+)
+_NUMBER_RE = re.compile(_NUMBER_PATTERN)
+# 整个字符串就是一个数值(允许末尾的量词)，用于判断字段是否为数值字段
+_STRICT_RE = re.compile(r'\s*' + _NUMBER_PATTERN + r'\s*[元股只家手]?\s*')
+
+
+class ParsedNumber(NamedTuple):
+    """
+    文本中的一个数值
+
+    value: 乘以单位后的数值，百分数为百分点
+    unit: 万/亿/万亿/K/M/B/T，没有单位为None
+    percent: 是否带百分号
+    text: 匹配到的原始文本
+    """
+    value: float
+    unit: Optional[str]
+    percent: bool
+    text: str
+
+
+def _parts(match):
+    number = match.group('number').replace(',', '')
+    unit = match.group('unit')
+    negative = match.group('sign') in _NEGATIVE_SIGNS
+    return number, unit, negative
+
+
+def _to_parsed(match) -> ParsedNumber:
+    number, unit, negative = _parts(match)
+    value = float(number) * _MULTIPLIERS.get(unit, 1)
+    return ParsedNumber(-value if negative else value, unit, bool(match.group('percent')), match.group().strip())
+
+
+def _find(text: str, strict: bool = False, percent: bool = False):
+    if strict:
+        match = _STRICT_RE.fullmatch(text)
+        return match if match and (not percent or match.group('percent')) else None
+    for match in _NUMBER_RE.finditer(text):
+        if not percent or match.group('percent'):
+            return match
+    return None
+
+
+def extract_numbers(text: str) -> List[ParsedNumber]:
+    """
+    提取文本中的所有数值
+
+    Args:
+        text: 如 "3450.12 +12.30 +0.36% 5123.45亿"
+
+    Returns:
+        按出现顺序的ParsedNumber列表
+    """
+    if not isinstance(text, str):
+        return []
+    return [_to_parsed(match) for match in _NUMBER_RE.finditer(text)]
+
+
+def parse_number(value: Any, default: Optional[float] = None, strict: bool = False,
+                 percent: bool = False) -> Optional[float]:
+    """
+    解析单个数值
+
+    Args:
+        value: 文本或数值，数值原样返回
+        default: 无法解析时的返回值
+        strict: 为True时整个字符串必须是一个数值，否则取文本中的第一个数值
+        percent: 为True时只取带百分号的数值
+
+    Returns:
+        float，百分数返回百分点
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return default
+    match = _find(value, strict, percent)
+    return _to_parsed(match).value if match else default
+
+
+def parse_decimal(value: Any, default: Optional[Decimal] = None, percent: bool = False) -> Optional[Decimal]:
+    """与parse_number相同，返回精确的Decimal，用于写入DECIMAL列"""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return Decimal(str(value))
+    if not isinstance(value, str):
+        return default
+    match = _find(value, percent=percent)
+    if not match:
+        return default
+    number, unit, negative = _parts(match)
+    try:
+        result = Decimal(number) * _MULTIPLIERS.get(unit, 1)
+    except InvalidOperation:
+        return default
+    return -result if negative else result
+
+
+def parse_int(value: Any, default: Optional[int] = None) -> Optional[int]:
+    """解析整数(如成交量、家数)，小数部分截断"""
+    number = parse_number(value)
+    return int(number) if number is not None else default
+
+
+def parse_numbers(values: Iterable[Any]):
+    """
+    批量解析一列数据，用于板块列表等几百行的整列转换
+
+    纯数值和普通数字字符串由pandas.to_numeric一次转换，其余文本用str.extract批量正则提取，
+    单位、符号的换算在NumPy数组上完成，没有逐行的Python循环
+
+    Returns:
+        float64的numpy数组，无法解析的位置为NaN；未安装numpy/pandas时返回list
+    """
+    values = list(values)
+    if np is None:
+        return [parse_number(value, default=float('nan')) for value in values]
+
+    series = pd.Series(values, dtype=object)
+    # pandas开启写时复制后to_numpy可能返回只读视图，复制一份再按位置写入
+    result = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float, na_value=np.nan, copy=True)
+    # 非字符串的值在str.extract中得到NaN，无需逐个判断类型
+    pending = np.isnan(result) & series.notna().to_numpy()
+    if pending.any():
+        parts = series[pending].str.extract(_NUMBER_PATTERN)
+        numbers = pd.to_numeric(parts['number'].str.replace(',', '', regex=False), errors='coerce')
+        scale = parts['unit'].map(_MULTIPLIERS).fillna(1).to_numpy(dtype=float)
+        sign = np.where(parts['sign'].isin(_NEGATIVE_SIGNS).to_numpy(), -1.0, 1.0)
+        result[pending] = numbers.to_numpy(dtype=float, na_value=np.nan) * scale * sign
+    return result
+
+
+def normalize_payload(data: Any) -> Any:
+    """
+    把爬取结果中整个是数值的字符串替换为数值，其余结构和文本保持不变
+    用于在原始文本之外附带一份数值化的结果
+    """
+    if isinstance(data, dict):
+        return {key: normalize_payload(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [normalize_payload(item) for item in data]
+    if isinstance(data, str):
+        number = parse_number(data, strict=True)
+        return data if number is None else number
+    return data
@@ -0,0 +1,73 @@
+"""
+页面就绪等待工具
+以"目标元素出现数值文本"或"目标元素文本变化"作为就绪条件，替代固定时长的sleep，
+原来的固定等待时长仅作为最长等待上限；等待XHR响应见xhr_capture
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 元素文本非空且包含数字，排除 "--"、"-" 等占位符
+_NUMERIC_TEXT_JS = """
+([selector, minCount]) => {
+    const els = document.querySelectorAll(selector);
+    let ready = 0;
+    for (const el of els) {
+        const text = (el.textContent || '').trim();
+        if (text && /\\d/.test(text)) ready++;
+        if (ready >= minCount) return true;
+    }
+    return false;
+}
+"""
+
+_TEXT_CHANGED_JS = """
+([selector, oldText]) => {
+    const el = document.querySelector(selector);
+    if (!el) return false;
+    const text = (el.textContent || '').trim();
+    return text !== '' && text !== oldText;
+}
+"""
+
+
+async def wait_for_numeric_text(page, selector: str, timeout: float = 10000, min_count: int = 1) -> bool:
+    """
+    等待selector匹配的元素中至少min_count个出现数值文本
+
+    Args:
+        page: Playwright page
+        selector: CSS选择器
+        timeout: 最长等待时间(毫秒)，超时不抛异常
+        min_count: 需要就绪的元素数量
+
+    Returns:
+        是否在超时前就绪
+    """
+    try:
+        await page.wait_for_function(_NUMERIC_TEXT_JS, arg=[selector, min_count], timeout=timeout)
+        return True
+    except Exception as e:
+        logger.debug(f"等待 {selector} 数值文本超时或失败: {e}")
+        return False
+
+
+async def wait_for_text_change(page, selector: str, old_text: str, timeout: float = 5000) -> bool:
+    """
+    等待元素文本变化（如点击排序后首行内容刷新）
+
+    Args:
+        page: Playwright page
+        selector: CSS选择器
+        old_text: 变化前的文本
+        timeout: 最长等待时间(毫秒)，超时不抛异常
+
+    Returns:
+        是否在超时前发生变化
+    """
+    try:
+        await page.wait_for_function(_TEXT_CHANGED_JS, arg=[selector, (old_text or '').strip()], timeout=timeout)
+        return True
+    except Exception as e:
+        logger.debug(f"等待 {selector} 文本变化超时或失败: {e}")
+        return False
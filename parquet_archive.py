@@ -0,0 +1,356 @@
+"""
+历史数据Parquet归档
+按月把scrape_records、各子表和raw_data_backup导出为按日期分区的Parquet文件
+(<PARQUET_ARCHIVE_DIR>/<表名>/date=YYYY-MM-DD/part-YYYYMM.parquet)，之后再删除MySQL中的过期分区；
+/timeseries查询已归档月份时直接读取Parquet，通过pyarrow.dataset按日期分区、指标和时间过滤，不扫描MySQL。
+pyarrow为可选依赖，未安装时归档不可用
+"""
+import json
+import logging
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+
+from database import TIMESERIES_SOURCES, DatabaseManager, add_months, apply_snapshot_chain
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+logger = logging.getLogger(__name__)
+
+# 各表归档的列及类型，与database_setup.sql一致；raw_data_backup按原样归档编码后的关键帧和差分，
+# 分区删除后通过ParquetArchive.reconstruct_snapshot还原完整快照
+ARCHIVE_COLUMNS = {
+    'scrape_records': [
+        ('id', 'int64'), ('scrape_time', 'timestamp'), ('request_time', 'string'),
+        ('total_data_sources', 'int64'), ('successful_sources', 'int64'), ('failed_sources', 'int64'),
+        ('processing_duration_ms', 'int64'), ('created_at', 'timestamp'),
+    ],
+    'global_macro_indicators': [
+        ('id', 'int64'), ('record_id', 'int64'), ('indicator_code', 'string'), ('indicator_name', 'string'),
+        ('price', 'float64'), ('price_text', 'string'), ('change_percent', 'float64'),
+        ('change_percent_text', 'string'), ('is_error', 'bool'), ('error_message', 'string'),
+        ('created_at', 'timestamp'),
+    ],
+    'us_stock_gainers': [
+        ('id', 'int64'), ('record_id', 'int64'), ('stock_symbol', 'string'), ('stock_name', 'string'),
+        ('current_price', 'float64'), ('price_change', 'float64'), ('change_percent', 'float64'),
+        ('volume', 'int64'), ('ranking_position', 'int64'), ('is_error', 'bool'), ('error_message', 'string'),
+        ('created_at', 'timestamp'),
+    ],
+    'a_stock_statistics': [
+        ('id', 'int64'), ('record_id', 'int64'), ('metric_name', 'string'), ('metric_value', 'string'),
+        ('metric_type', 'string'), ('additional_info', 'string'), ('is_error', 'bool'),
+        ('error_message', 'string'), ('created_at', 'timestamp'),
+    ],
+    'market_turnover': [
+        ('id', 'int64'), ('record_id', 'int64'), ('market_type', 'string'), ('market_name', 'string'),
+        ('index_value', 'float64'), ('index_change', 'float64'), ('index_change_percent', 'float64'),
+        ('total_turnover', 'float64'), ('turnover_text', 'string'), ('is_error', 'bool'),
+        ('error_message', 'string'), ('created_at', 'timestamp'),
+    ],
+    'crypto_data': [
+        ('id', 'int64'), ('record_id', 'int64'), ('crypto_symbol', 'string'), ('crypto_name', 'string'),
+        ('current_price', 'float64'), ('price_change_24h', 'float64'), ('change_percent_24h', 'float64'),
+        ('market_cap', 'float64'), ('volume_24h', 'float64'), ('is_error', 'bool'), ('error_message', 'string'),
+        ('created_at', 'timestamp'),
+    ],
+    'raw_data_backup': [
+        ('id', 'int64'), ('record_id', 'int64'), ('data_source', 'string'), ('raw_json', 'string'),
+        ('raw_blob', 'binary'), ('codec', 'string'), ('snapshot_type', 'string'),
+        ('keyframe_record_id', 'int64'), ('data_size', 'int64'), ('created_at', 'timestamp'),
+    ],
+}
+
+# TIMESERIES_SOURCES中各数据源在归档文件里的数值列(a_stock为文本，读取时只取纯数值)
+ARCHIVE_VALUE_COLUMNS = {
+    'macro': 'price',
+    'crypto': 'current_price',
+    'turnover': 'total_turnover',
+    'a_stock': 'metric_value',
+}
+
+_MANIFEST = '_manifest.json'
+
+
+def _arrow_type(name: str):
+    return pa.timestamp('s') if name == 'timestamp' else getattr(pa, name)()
+
+
+def _convert(value: Any, type_name: str) -> Any:
+    if value is None:
+        return None
+    if type_name == 'float64':
+        return float(value)
+    if type_name == 'bool':
+        return bool(value)
+    if type_name == 'string' and not isinstance(value, str):
+        return str(value)
+    if type_name == 'int64' and isinstance(value, Decimal):
+        return int(value)
+    return value
+
+
+class ParquetArchive:
+    """按日期分区的Parquet归档目录"""
+
+    def __init__(self, root: str, compression: str = 'zstd', batch_size: int = 5000):
+        """
+        Args:
+            root: 归档根目录
+            compression: Parquet压缩方式
+            batch_size: 导出时每次从MySQL游标读取的行数
+        """
+        if pa is None:
+            raise RuntimeError("Parquet归档需要安装pyarrow")
+        self.root = root
+        self.compression = compression
+        self.batch_size = batch_size
+
+    def archived_months(self) -> List[str]:
+        """已完整归档的月份(YYYY-MM)"""
+        path = os.path.join(self.root, _MANIFEST)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding='utf-8') as f:
+            return sorted(json.load(f).get('months', []))
+
+    def archived_until(self) -> Optional[datetime]:
+        """已归档数据的结束时间(最后一个归档月份的下月初)，没有归档时返回None"""
+        months = self.archived_months()
+        if not months:
+            return None
+        last = datetime.strptime(months[-1], '%Y-%m').date()
+        return datetime.combine(add_months(last, 1), datetime.min.time())
+
+    def _mark_archived(self, month: date):
+        months = set(self.archived_months())
+        months.add(f"{month:%Y-%m}")
+        path = os.path.join(self.root, _MANIFEST)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'months': sorted(months)}, f)
+        os.replace(tmp_path, path)
+
+    def export_months(self, db_manager: DatabaseManager, months: Iterable[date]):
+        """依次导出多个月份，任一月份失败时抛出异常(调用方据此不删除分区)"""
+        for month in months:
+            self.export_month(db_manager, month)
+
+    def export_month(self, db_manager: DatabaseManager, month: date) -> Dict[str, int]:
+        """
+        导出一个月的数据，重复导出会覆盖同名文件；所有表导出完成后才记入manifest
+
+        Args:
+            db_manager: 数据库管理器
+            month: 月初日期
+
+        Returns:
+            表名 -> 导出行数
+        """
+        start = datetime.combine(month, datetime.min.time())
+        end = datetime.combine(add_months(month, 1), datetime.min.time())
+        counts = {}
+        for table, columns in ARCHIVE_COLUMNS.items():
+            counts[table] = self._export_table(db_manager, table, columns, start, end)
+        self._mark_archived(month)
+        logger.info(f"{month:%Y-%m} 已归档为Parquet: {counts}")
+        return counts
+
+    def _export_table(self, db_manager: DatabaseManager, table: str, columns: List[tuple],
+                      start: datetime, end: datetime) -> int:
+        """流式读取一张表一个月的数据，按created_at的日期写入各日期分区"""
+        names = [name for name, _ in columns]
+        types = [type_name for _, type_name in columns]
+        # ts为UNIX_TIMESTAMP(created_at)，读取时与MySQL中的时间桶计算方式一致
+        schema = pa.schema([(name, _arrow_type(type_name)) for name, type_name in columns] + [('ts', pa.int64())])
+        created_at_index = names.index('created_at')
+        query_sql = text(f"""
+            SELECT {', '.join(names)}, UNIX_TIMESTAMP(created_at) AS ts
+            FROM {table}
+            WHERE created_at >= :start AND created_at < :end
+            ORDER BY id
+        """)
+
+        writers = {}
+        exported = 0
+        try:
+            with db_manager.engine.connect().execution_options(stream_results=True) as conn:
+                result = conn.execute(query_sql, {'start': start, 'end': end})
+                while True:
+                    rows = result.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+                    by_day: Dict[str, list] = {}
+                    for row in rows:
+                        by_day.setdefault(f"{row[created_at_index]:%Y-%m-%d}", []).append(row)
+                    for day, day_rows in by_day.items():
+                        writer = writers.get(day)
+                        if writer is None:
+                            directory = os.path.join(self.root, table, f"date={day}")
+                            os.makedirs(directory, exist_ok=True)
+                            writer = writers[day] = pq.ParquetWriter(
+                                os.path.join(directory, f"part-{start:%Y%m}.parquet"), schema,
+                                compression=self.compression
+                            )
+                        data = {name: [_convert(row[i], types[i]) for row in day_rows] for i, name in enumerate(names)}
+                        data['ts'] = [int(row[-1]) for row in day_rows]
+                        writer.write_table(pa.Table.from_pydict(data, schema=schema))
+                    exported += len(rows)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        return exported
+
+    def _dataset(self, table: str):
+        return ds.dataset(os.path.join(self.root, table), format='parquet',
+                          partitioning=ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive'))
+
+    def reconstruct_snapshot(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """
+        从归档的raw_data_backup还原某次爬取的完整数据，与DatabaseManager.reconstruct_snapshot一致
+        差分链不跨月，找到记录后只读取同一个月的日期分区
+
+        Returns:
+            完整的爬取数据，归档中不存在时返回None
+        """
+        if not os.path.isdir(os.path.join(self.root, 'raw_data_backup')):
+            return None
+        dataset = self._dataset('raw_data_backup')
+        source = ds.field('data_source') == 'scrape_api_full'
+        rows = dataset.to_table(
+            columns=['id', 'snapshot_type', 'keyframe_record_id', 'created_at'],
+            filter=source & (ds.field('record_id') == record_id)
+        ).to_pylist()
+        if not rows:
+            return None
+        row = max(rows, key=lambda item: item['id'])
+        keyframe_record_id = row['keyframe_record_id'] if row['snapshot_type'] == 'delta' else record_id
+
+        month = row['created_at'].date().replace(day=1)
+        condition = ((ds.field('date') >= f"{month:%Y-%m-%d}") & (ds.field('date') < f"{add_months(month, 1):%Y-%m-%d}")
+                     & source
+                     & ((ds.field('record_id') == keyframe_record_id)
+                        | ((ds.field('keyframe_record_id') == keyframe_record_id)
+                           & (ds.field('record_id') <= record_id))))
+        chain = sorted(dataset.to_table(
+            columns=['id', 'record_id', 'snapshot_type', 'raw_json', 'raw_blob', 'codec'], filter=condition
+        ).to_pylist(), key=lambda item: (item['record_id'], item['id']))
+        return apply_snapshot_chain(
+            [(item['snapshot_type'], item['raw_json'], item['raw_blob'], item['codec']) for item in chain],
+            record_id, keyframe_record_id
+        )
+
+    def iter_timeseries(self, indicator: str, start: datetime, end: datetime, interval_seconds: int,
+                        source: str, agg: str = 'ohlc'):
+        """
+        从归档文件按时间桶降采样查询指标序列，结果格式与DatabaseManager.iter_timeseries一致
+        日期分区、指标、时间范围和is_error的过滤条件下推给pyarrow，只读取命中的文件和行组
+        """
+        spec = TIMESERIES_SOURCES[source]
+        value_column = ARCHIVE_VALUE_COLUMNS[source]
+        path = os.path.join(self.root, spec['table'])
+        if not os.path.isdir(path):
+            return
+
+        dataset = self._dataset(spec['table'])
+        start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+        condition = ((ds.field('date') >= f"{start:%Y-%m-%d}") & (ds.field('date') <= f"{end:%Y-%m-%d}")
+                     & (ds.field(spec['key']) == indicator)
+                     & (ds.field('ts') >= start_ts) & (ds.field('ts') < end_ts)
+                     & (ds.field('is_error') == False))  # noqa: E712
+        df = dataset.to_table(columns=['id', 'ts', value_column], filter=condition).to_pandas()
+        if df.empty:
+            return
+
+        if source == 'a_stock':
+            # 与MySQL查询的REGEXP条件一致，只取纯数值
+            df = df[df[value_column].str.fullmatch(r'-?\d+(\.\d+)?', na=False)]
+        df = df.assign(val=df[value_column].astype(float)).dropna(subset=['val']).sort_values(['ts', 'id'])
+        df['bucket'] = df['ts'] // interval_seconds * interval_seconds
+        stats = df.groupby('bucket')['val'].agg(['first', 'max', 'min', 'last', 'count'])
+
+        for bucket, row in stats.iterrows():
+            bucket = int(bucket)
+            point = {'ts': bucket, 'time': datetime.fromtimestamp(bucket).isoformat()}
+            if agg == 'ohlc':
+                point.update({
+                    'open': float(row['first']),
+                    'high': float(row['max']),
+                    'low': float(row['min']),
+                })
+            point['close'] = float(row['last'])
+            point['count'] = int(row['count'])
+            yield point
+
+
+def _local_naive(value: datetime) -> datetime:
+    """带时区的时间转换为不带时区的本地时间"""
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def merge_timeseries(earlier: Iterable[dict], later: Iterable[dict]):
+    """拼接前后两段序列，分界处落在同一时间桶的两部分合并为一个点"""
+    pending = None
+    for point in earlier:
+        if pending is not None:
+            yield pending
+        pending = point
+    for point in later:
+        if pending is not None:
+            if pending['ts'] == point['ts']:
+                merged = dict(point, count=pending['count'] + point['count'])
+                if 'open' in point:
+                    merged.update(open=pending['open'], high=max(pending['high'], point['high']),
+                                  low=min(pending['low'], point['low']))
+                point = merged
+            else:
+                yield pending
+            pending = None
+        yield point
+    if pending is not None:
+        yield pending
+
+
+def iter_timeseries_with_archive(db_manager: DatabaseManager, indicator: str, start: datetime, end: datetime,
+                                 interval_seconds: int, source: str, agg: str = 'ohlc'):
+    """
+    已归档月份的部分读取Parquet，其余部分查询MySQL
+    start、end可以带时区也可以不带(视为本地时间)，统一转换为不带时区的本地时间后再与归档分界比较，
+    与MySQL中created_at的存储方式一致
+    """
+    start, end = _local_naive(start), _local_naive(end)
+    archive = get_parquet_archive()
+    split = archive.archived_until() if archive else None
+    if split is None or start >= split:
+        return db_manager.iter_timeseries(indicator, start, end, interval_seconds, source=source, agg=agg)
+    archived = archive.iter_timeseries(indicator, start, min(end, split), interval_seconds, source, agg)
+    if end <= split:
+        return archived
+    return merge_timeseries(
+        archived, db_manager.iter_timeseries(indicator, split, end, interval_seconds, source=source, agg=agg)
+    )
+
+
+_parquet_archive: Optional[ParquetArchive] = None
+
+
+def get_parquet_archive() -> Optional[ParquetArchive]:
+    """获取进程级归档目录，未配置PARQUET_ARCHIVE_DIR或未安装pyarrow时返回None"""
+    global _parquet_archive
+    if _parquet_archive is None and os.getenv('PARQUET_ARCHIVE_DIR'):
+        if pa is None:
+            logger.warning("已配置PARQUET_ARCHIVE_DIR但未安装pyarrow，Parquet归档不可用")
+            return None
+        _parquet_archive = ParquetArchive(
+            os.getenv('PARQUET_ARCHIVE_DIR'),
+            compression=os.getenv('PARQUET_COMPRESSION', 'zstd')
+        )
+    return _parquet_archive
@@ -0,0 +1,128 @@
+"""
+原始数据编解码
+raw_data_backup使用紧凑序列化(msgpack/JSON) + 压缩(zstd/zlib)存入BLOB，并记录codec标识，
+msgpack和zstandard为可选依赖，未安装时分别退回紧凑JSON和zlib；
+相邻快照之间只保存顶层key的差异(diff_snapshots / apply_delta)
+"""
+import json
+import logging
+import os
+import zlib
+from typing import Any, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 旧数据以缩进JSON文本存放在raw_json列，codec为空
+LEGACY_CODEC = "json"
+
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 9
+
+
+def _serialize(data: Any, fmt: str) -> bytes:
+    if fmt == "msgpack":
+        return msgpack.packb(data, default=str, use_bin_type=True)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _deserialize(raw: bytes, fmt: str) -> Any:
+    if fmt == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("解码msgpack数据需要安装msgpack")
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw.decode('utf-8'))
+
+
+def _compress(raw: bytes, method: str) -> bytes:
+    if method == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return zlib.compress(raw, ZLIB_LEVEL)
+
+
+def _decompress(blob: bytes, method: str) -> bytes:
+    if method == "zstd":
+        if zstandard is None:
+            raise RuntimeError("解码zstd数据需要安装zstandard")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if method == "zlib":
+        return zlib.decompress(blob)
+    raise ValueError(f"未知的压缩方式: {method}")
+
+
+def resolve_codec(codec: Optional[str] = None) -> str:
+    """
+    确定实际使用的codec，缺少依赖时降级
+
+    Args:
+        codec: 形如 msgpack+zstd / json+zlib，auto或None表示按已安装的库选择最优组合
+    """
+    codec = (codec or os.getenv('RAW_BACKUP_CODEC', 'auto')).lower()
+    if codec == LEGACY_CODEC:
+        return codec
+    fmt, _, method = codec.partition('+')
+    if codec == "auto":
+        fmt, method = "msgpack", "zstd"
+    if fmt not in ("msgpack", "json") or method not in ("zstd", "zlib"):
+        raise ValueError(f"不支持的codec: {codec}")
+    if fmt == "msgpack" and msgpack is None:
+        fmt = "json"
+    if method == "zstd" and zstandard is None:
+        method = "zlib"
+    return f"{fmt}+{method}"
+
+
+def encode_payload(data: Any, codec: Optional[str] = None) -> Tuple[bytes, str]:
+    """
+    编码数据
+
+    Returns:
+        (编码后的字节, 实际使用的codec)
+    """
+    codec = resolve_codec(codec)
+    if codec == LEGACY_CODEC:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'), codec
+    fmt, method = codec.split('+')
+    return _compress(_serialize(data, fmt), method), codec
+
+
+def decode_payload(blob: bytes, codec: Optional[str]) -> Any:
+    """按codec解码，codec为空或json时按JSON文本处理"""
+    if not codec or codec == LEGACY_CODEC:
+        if isinstance(blob, bytes):
+            blob = blob.decode('utf-8')
+        return json.loads(blob)
+    fmt, _, method = codec.partition('+')
+    return _deserialize(_decompress(bytes(blob), method), fmt)
+
+
+def diff_snapshots(previous: dict, current: dict) -> dict:
+    """
+    计算两次爬取结果的顶层key差异
+
+    Returns:
+        {"set": 新增或变化的key及其值, "unset": 被移除的key列表, "keys": current的key顺序}
+    """
+    return {
+        "set": {k: v for k, v in current.items() if k not in previous or previous[k] != v},
+        "unset": [k for k in previous if k not in current],
+        "keys": list(current),
+    }
+
+
+def apply_delta(base: dict, delta: dict) -> dict:
+    """在base上应用diff_snapshots的结果，返回新的dict，key顺序与原快照一致"""
+    changed = delta.get("set", {})
+    removed = set(delta.get("unset", []))
+    merged = {k: v for k, v in base.items() if k not in removed}
+    merged.update(changed)
+    return {k: merged[k] for k in delta.get("keys", merged) if k in merged}
@@ -0,0 +1,302 @@
+"""
+爬取结果异步落库(write-behind)
+/scrape把结果放入内存队列后立即返回，后台任务批量写库：
+- 多次爬取结果合并在一个事务中写入
+- MySQL临时性错误(断连、锁等待超时等)按退避重试
+- 数据库不可用时追加写入本地JSONL文件，数据库恢复后自动回放
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.exc import DBAPIError
+
+from database import DatabaseManager, get_database_manager
+
+logger = logging.getLogger(__name__)
+
+Snapshot = Tuple[datetime, str, dict]
+
+
+# 可重试的MySQL错误码: 无法连接(2003)、连接断开(2006/2013)、锁等待超时(1205)、死锁(1213)
+# OperationalError还包括未知列(1054)、分区不存在(1526)等表结构错误，这些重试无意义
+TRANSIENT_ERRNOS = {2003, 2006, 2013, 1205, 1213}
+
+# _write的结果: 已写库、非临时性错误写入.failed文件、数据库不可用写入本地文件等待回放
+WRITTEN, REJECTED, SPOOLED = "written", "rejected", "spooled"
+
+
+def _is_transient(error: Exception) -> bool:
+    """连接类错误可重试，数据/SQL错误重试无意义"""
+    if not isinstance(error, DBAPIError):
+        return False
+    if error.connection_invalidated:
+        return True
+    args = getattr(error.orig, "args", None)
+    return bool(args) and args[0] in TRANSIENT_ERRNOS
+
+
+def _dump(snapshot: Snapshot) -> str:
+    scrape_time, request_time, data = snapshot
+    return json.dumps({
+        "scrape_time": scrape_time.isoformat(),
+        "request_time": request_time,
+        "data": data
+    }, ensure_ascii=False, default=str)
+
+
+def _load(line: str) -> Snapshot:
+    item = json.loads(line)
+    return datetime.fromisoformat(item["scrape_time"]), item["request_time"], item["data"]
+
+
+class PersistenceQueue:
+    """爬取结果的后台批量写库队列"""
+
+    def __init__(self, db_manager: DatabaseManager, spool_path: str, batch_size: int = 20,
+                 flush_interval: float = 1.0, max_retries: int = 3, replay_interval: float = 30,
+                 max_queue: int = 1000):
+        """
+        Args:
+            db_manager: 数据库管理器
+            spool_path: 数据库不可用时的本地追加文件(JSONL)
+            batch_size: 单个事务最多写入的爬取结果数
+            flush_interval: 收到第一条结果后最多等待多久凑批(秒)
+            max_retries: 临时性错误的重试次数
+            replay_interval: 检查并回放本地文件的间隔(秒)
+            max_queue: 内存队列上限，满时直接写入本地文件
+        """
+        self.db_manager = db_manager
+        self.spool_path = spool_path
+        self.failed_path = spool_path + ".failed"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.replay_interval = replay_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks: List[asyncio.Task] = []
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self.running:
+            return
+        self._tasks = [
+            asyncio.ensure_future(self._worker()),
+            asyncio.ensure_future(self._replayer()),
+        ]
+        logger.info(f"落库队列已启动: batch_size={self.batch_size}, spool={self.spool_path}")
+
+    async def stop(self, timeout: float = 30):
+        """停止后台任务，队列中剩余的结果尽量写库，失败则写入本地文件"""
+        if not self.running:
+            return
+        worker, replayer = self._tasks
+        replayer.cancel()
+        # 放入结束标记，worker写完标记之前的结果后退出
+        await self._queue.put(None)
+        try:
+            await asyncio.wait_for(worker, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"落库队列 {timeout:.0f}秒内未写完，剩余结果写入本地文件")
+            remaining = []
+            while not self._queue.empty():
+                snapshot = self._queue.get_nowait()
+                if snapshot is not None:
+                    remaining.append(snapshot)
+            if remaining:
+                self._spool(remaining, self.spool_path)
+        await asyncio.gather(replayer, return_exceptions=True)
+        self._tasks.clear()
+        logger.info("落库队列已停止")
+
+    async def enqueue(self, scrape_time: datetime, request_time: str, data: dict):
+        """放入队列，不等待写库；队列已满时直接写入本地文件"""
+        snapshot = (scrape_time, request_time, data)
+        try:
+            self._queue.put_nowait(snapshot)
+        except asyncio.QueueFull:
+            logger.warning("落库队列已满，写入本地文件")
+            await asyncio.to_thread(self._spool, [snapshot], self.spool_path)
+
+    async def _worker(self):
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            if batch[-1] is None:
+                # 结束标记，写完本批次后退出
+                stopping = True
+                batch.pop()
+            if batch:
+                await self._write(batch, 0 if stopping else self.max_retries)
+
+    async def _write(self, batch: List[Snapshot], retries: int) -> str:
+        """
+        写库，临时性错误按退避重试，仍失败则写入本地文件
+
+        Returns:
+            WRITTEN、REJECTED(非临时性错误，已写入.failed文件)或SPOOLED(已写入本地文件等待回放)
+        """
+        async with self._write_lock:
+            for attempt in range(retries + 1):
+                try:
+                    record_ids = await asyncio.to_thread(self.db_manager.save_scrape_batch, batch)
+                    logger.info(f"批量写入 {len(batch)} 条爬取结果，记录ID: {record_ids}")
+                    return WRITTEN
+                except Exception as e:
+                    if not _is_transient(e):
+                        # 数据本身有问题，回放也会失败，单独保存便于排查
+                        logger.error(f"写库失败(非临时性错误)，写入 {self.failed_path}: {e}")
+                        await asyncio.to_thread(self._spool, batch, self.failed_path)
+                        return REJECTED
+                    if attempt < retries:
+                        delay = min(2 ** attempt, 30)
+                        logger.warning(f"写库失败，{delay}秒后第{attempt + 1}次重试: {e}")
+                        await asyncio.sleep(delay)
+                    else:
+                        logger.error(f"数据库不可用，{len(batch)} 条结果写入 {self.spool_path}: {e}")
+            await asyncio.to_thread(self._spool, batch, self.spool_path)
+            return SPOOLED
+
+    def _spool(self, batch: List[Snapshot], path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for snapshot in batch:
+                f.write(_dump(snapshot) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _replayer(self):
+        while True:
+            try:
+                await self.replay()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"回放本地文件失败: {e}")
+            await asyncio.sleep(self.replay_interval)
+
+    async def replay(self) -> int:
+        """
+        把本地文件中的结果写回数据库；先改名再读取，回放期间新的写入追加到新文件。
+        每写完一批就把剩余的行写回.replaying文件，进程中途退出后下次只回放剩余部分；
+        数据库仍不可用时停止回放，剩余部分留在.replaying文件中等待下次回放；
+        某一批因非临时性错误写入.failed文件后继续回放后面的批次
+
+        Returns:
+            成功写入的结果数
+        """
+        replay_path = self.spool_path + ".replaying"
+        async with self._write_lock:
+            # 上次回放中途退出时会遗留.replaying文件，优先处理
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spool_path) or os.path.getsize(self.spool_path) == 0:
+                    return 0
+                os.replace(self.spool_path, replay_path)
+
+        with open(replay_path, encoding="utf-8") as f:
+            lines, snapshots = [], []
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    snapshots.append(_load(line))
+                    lines.append(line)
+                except (ValueError, KeyError) as e:
+                    logger.error(f"本地文件中的记录无法解析，已跳过: {e}")
+
+        if not snapshots:
+            os.remove(replay_path)
+            return 0
+
+        logger.info(f"开始回放 {len(snapshots)} 条本地缓存的爬取结果")
+        written = 0
+        for start in range(0, len(snapshots), self.batch_size):
+            batch = snapshots[start:start + self.batch_size]
+            # 写库失败时本批次已由_write写入本地文件或.failed文件，同样从.replaying中去掉
+            result = await self._write(batch, retries=0)
+            await asyncio.to_thread(self._rewrite, replay_path, lines[start + self.batch_size:])
+            if result == SPOOLED:
+                break
+            if result == WRITTEN:
+                written += len(batch)
+        if os.path.exists(replay_path) and os.path.getsize(replay_path) == 0:
+            os.remove(replay_path)
+        if written:
+            logger.info(f"已回放 {written} 条爬取结果")
+        return written
+
+    def _rewrite(self, path: str, lines: List[str]):
+        """用剩余的行原子替换文件"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+_persistence_queue: Optional[PersistenceQueue] = None
+
+
+def write_behind_enabled() -> bool:
+    return os.getenv('PERSIST_WRITE_BEHIND', 'true').lower() != 'false'
+
+
+def get_persistence_queue() -> PersistenceQueue:
+    """获取进程级落库队列（使用环境变量配置）"""
+    global _persistence_queue
+    if _persistence_queue is None:
+        _persistence_queue = PersistenceQueue(
+            get_database_manager(),
+            spool_path=os.getenv('PERSIST_SPOOL_PATH', os.path.join("data", "scrape_spool.jsonl")),
+            batch_size=int(os.getenv('PERSIST_BATCH_SIZE', 20)),
+            flush_interval=float(os.getenv('PERSIST_FLUSH_INTERVAL', 1.0)),
+            max_retries=int(os.getenv('PERSIST_MAX_RETRIES', 3)),
+            replay_interval=float(os.getenv('PERSIST_REPLAY_INTERVAL', 30))
+        )
+    return _persistence_queue
+
+
+async def persist_snapshot(scrape_time: datetime, request_time: str, data: dict):
+    """保存一次爬取结果：落库队列运行时放入队列，否则直接写库"""
+    if _persistence_queue is not None and _persistence_queue.running:
+        await _persistence_queue.enqueue(scrape_time, request_time, data)
+        return
+    record_id = await get_database_manager().save_scrape_data_async(scrape_time, request_time, data)
+    if record_id:
+        logger.info(f"爬取结果已保存，记录ID: {record_id}")
+
+
+async def start_persistence_queue():
+    """在应用启动时调用，PERSIST_WRITE_BEHIND=false 时不启动"""
+    if write_behind_enabled():
+        get_persistence_queue().start()
+
+
+async def stop_persistence_queue():
+    """在应用关闭时调用"""
+    if _persistence_queue is not None:
+        await _persistence_queue.stop()
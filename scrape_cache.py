@@ -0,0 +1,218 @@
+"""
+爬取结果缓存
+按数据源分别缓存scrape_financial_data的结果片段：
+- 未过期直接返回
+- 过期但未超过最大陈旧时间时先返回旧数据，同时在后台刷新(stale-while-revalidate)
+- 同一数据源同一时刻只有一个刷新任务，并发请求共享该任务(single-flight)
+所有数据源都有缓存后，按固定间隔把各数据源最新结果合并成一份完整快照落库，/scrape读取缓存不再写库
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from market_scraper import SCRAPE_SOURCES, scrape_sources
+from persistence_queue import persist_snapshot
+
+logger = logging.getLogger(__name__)
+
+# 各数据源默认缓存时间(秒)，可用 SCRAPE_CACHE_TTL_<NAME> 覆盖
+DEFAULT_SOURCE_TTLS = {
+    "investing_macro": 300,
+    "us_gainers": 300,
+    "us_sector_flow": 600,
+    "us_indices": 120,
+    "us_market_sectors": 600,
+    "crypto": 60,
+    "eastmoney_indices": 60,
+    "industry_dynamics": 120,
+    "northbound": 120,
+    "eastmoney_sector_flow": 120,
+    "ths_sentiment": 120,
+    "market_turnover": 120,
+}
+
+
+def _is_error_fragment(fragment: dict) -> bool:
+    """片段中所有结果都是error时视为失败"""
+    return bool(fragment) and all(isinstance(v, dict) and "error" in v for v in fragment.values())
+
+
+class _CacheEntry:
+    """单个数据源的缓存"""
+
+    def __init__(self, fragment: dict, fetched_at: Optional[datetime] = None):
+        self.fragment = fragment
+        self.fetched_at = fetched_at or datetime.now()
+        self.fetched_monotonic = time.monotonic()
+        self.failed = _is_error_fragment(fragment)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_monotonic
+
+
+class ScrapeCache:
+    """进程内的按数据源TTL缓存"""
+
+    def __init__(self, ttls: Dict[str, float], error_ttl: float = 30, max_stale: float = 3600,
+                 on_refresh: Optional[Callable[[datetime, str, dict], Awaitable]] = None,
+                 persist_interval: float = 300):
+        """
+        Args:
+            ttls: 数据源名称 -> 缓存时间(秒)
+            error_ttl: 失败结果的缓存时间(秒)，过后重新爬取
+            max_stale: 过期数据最多可继续返回的时间(秒)，超过后请求需等待刷新完成
+            on_refresh: 落库回调，参数为(抓取时间, 请求时间文本, 所有数据源合并后的数据)
+            persist_interval: 两次落库的最小间隔(秒)；刷新完成时距上次落库已超过该间隔才落库
+        """
+        self.ttls = ttls
+        self.error_ttl = error_ttl
+        self.max_stale = max_stale
+        self.on_refresh = on_refresh
+        self.persist_interval = persist_interval
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._persisting: Set[asyncio.Task] = set()
+        self._last_persisted: Optional[float] = None
+        # 最近一次/scrape请求的时间参数，随下一份快照落库
+        self._request_time: Optional[str] = None
+
+    def _ttl(self, name: str, entry: _CacheEntry) -> float:
+        return self.error_ttl if entry.failed else self.ttls.get(name, 300)
+
+    def _refresh(self, names: Iterable[str]):
+        """为尚无刷新任务的数据源启动一次合并的爬取任务"""
+        names = [name for name in names if name not in self._inflight]
+        if not names:
+            return
+        task = asyncio.ensure_future(self._scrape(names))
+        for name in names:
+            self._inflight[name] = task
+
+    async def _scrape(self, names):
+        logger.info(f"刷新数据源缓存: {', '.join(names)}")
+        try:
+            fragments = await scrape_sources(names)
+            fetched_at = datetime.now()
+            for name, fragment in fragments.items():
+                self._entries[name] = _CacheEntry(fragment, fetched_at)
+            self._maybe_persist(fetched_at)
+        except Exception as e:
+            logger.error(f"刷新数据源缓存失败: {e}")
+        finally:
+            for name in names:
+                self._inflight.pop(name, None)
+
+    def _maybe_persist(self, fetched_at: datetime):
+        """
+        每个数据源都有缓存且距上次落库超过persist_interval时，落库一份合并快照。
+        定时任务按数据源分别刷新，逐次落库会让每条记录只含部分数据源，
+        数据源统计、最新快照汇总和增量编码都依赖完整快照
+        """
+        if self.on_refresh is None or any(name not in self._entries for name in self.ttls):
+            return
+        now = time.monotonic()
+        if self._last_persisted is not None and now - self._last_persisted < self.persist_interval:
+            return
+        self._last_persisted = now
+        data = {}
+        for name in self.ttls:
+            # 失败的数据源保留error结果，计入failed_sources
+            data.update(self._entries[name].fragment)
+        request_time, self._request_time = self._request_time or fetched_at.isoformat(), None
+        # 落库不阻塞等待本次刷新的请求
+        task = asyncio.ensure_future(self._persist(fetched_at, request_time, data))
+        self._persisting.add(task)
+        task.add_done_callback(self._persisting.discard)
+
+    async def _persist(self, fetched_at: datetime, request_time: str, data: dict):
+        try:
+            await self.on_refresh(fetched_at, request_time, data)
+        except Exception as e:
+            logger.error(f"保存刷新结果失败: {e}")
+
+    async def refresh(self, names: Iterable[str]):
+        """刷新指定数据源并等待完成，已有刷新任务的数据源共享该任务"""
+        names = list(names)
+        self._refresh(names)
+        tasks = {self._inflight[name] for name in names if name in self._inflight}
+        if tasks:
+            # asyncio.wait不会把调用方的取消传递给共享的刷新任务
+            await asyncio.wait(tasks)
+
+    async def get(self, sources: Optional[Iterable[str]] = None, force_refresh: bool = False,
+                  revalidate: bool = True, request_time: Optional[str] = None) -> Tuple[dict, dict]:
+        """
+        获取聚合后的爬取结果
+
+        Args:
+            sources: 数据源名称，None表示全部
+            force_refresh: 为True时忽略缓存，等待重新爬取
+            revalidate: 为False时过期数据不触发刷新(由定时任务负责刷新)，只有缺失的数据源才会爬取
+            request_time: 请求参数中的时间，记录在下一份落库的快照中
+
+        Returns:
+            (data, sources_meta)，data与scrape_financial_data返回结构一致，
+            sources_meta为各数据源的缓存年龄等信息
+        """
+        names = list(SCRAPE_SOURCES) if sources is None else [name for name in SCRAPE_SOURCES if name in sources]
+        if request_time is not None:
+            self._request_time = request_time
+
+        must_wait, stale = [], []
+        for name in names:
+            entry = self._entries.get(name)
+            if force_refresh or entry is None:
+                must_wait.append(name)
+            elif revalidate and entry.age >= self._ttl(name, entry):
+                (stale if entry.age < self._ttl(name, entry) + self.max_stale else must_wait).append(name)
+
+        if force_refresh:
+            # 已有刷新任务的数据源直接等待该任务，避免重复爬取
+            self._refresh(must_wait)
+        else:
+            self._refresh(must_wait + stale)
+        tasks = {self._inflight[name] for name in must_wait if name in self._inflight}
+        if tasks:
+            # 客户端断开时只取消本次等待，刷新任务继续执行，其他等待方和定时刷新不受影响
+            await asyncio.wait(tasks)
+
+        data, meta = {}, {}
+        for name in names:
+            entry = self._entries.get(name)
+            if entry is None:
+                continue
+            data.update(entry.fragment)
+            meta[name] = {
+                "fetched_at": entry.fetched_at.isoformat(),
+                "age_seconds": round(entry.age, 1),
+                "ttl_seconds": self._ttl(name, entry),
+                "stale": entry.age >= self._ttl(name, entry),
+                "refreshing": name in self._inflight,
+            }
+        return data, meta
+
+
+_scrape_cache: Optional[ScrapeCache] = None
+
+
+def get_scrape_cache() -> ScrapeCache:
+    """获取进程级爬取结果缓存（使用环境变量配置）"""
+    global _scrape_cache
+    if _scrape_cache is None:
+        default_ttl = os.getenv('SCRAPE_CACHE_TTL')
+        ttls = {}
+        for name in SCRAPE_SOURCES:
+            ttl = os.getenv(f"SCRAPE_CACHE_TTL_{name.upper()}", default_ttl or DEFAULT_SOURCE_TTLS.get(name, 300))
+            ttls[name] = float(ttl)
+        _scrape_cache = ScrapeCache(
+            ttls,
+            error_ttl=float(os.getenv('SCRAPE_CACHE_ERROR_TTL', 30)),
+            max_stale=float(os.getenv('SCRAPE_CACHE_MAX_STALE', 3600)),
+            on_refresh=persist_snapshot,
+            persist_interval=float(os.getenv('SCRAPE_PERSIST_INTERVAL', 300))
+        )
+    return _scrape_cache
@@ -0,0 +1,172 @@
+"""
+数据源定时刷新
+在FastAPI进程内按数据源各自的频率刷新scrape_cache，/scrape直接读取最新快照：
+- always: 全天按固定频率刷新(如加密货币)
+- cn / us: 仅在A股/美股交易时段内按频率刷新，收盘后补刷一次，
+  休市期间按off_hours_interval刷新(None表示休市不刷新)
+- weekday: 工作日全天刷新(外汇、商品等近24x5交易的品种)
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import date, datetime, time as dtime
+from typing import Dict, List, NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from scrape_cache import ScrapeCache, get_scrape_cache
+
+logger = logging.getLogger(__name__)
+
+# 交易时段判断的检查间隔(秒)，也是休市期间的最长休眠时间
+CALENDAR_CHECK_SECONDS = 60
+
+# 市场 -> (时区, 交易时段列表, 节假日环境变量)
+MARKET_SESSIONS = {
+    "cn": (ZoneInfo("Asia/Shanghai"), [(dtime(9, 15), dtime(11, 30)), (dtime(13, 0), dtime(15, 0))], "CN_MARKET_HOLIDAYS"),
+    "us": (ZoneInfo("America/New_York"), [(dtime(9, 30), dtime(16, 0))], "US_MARKET_HOLIDAYS"),
+}
+
+
+class SourceSchedule(NamedTuple):
+    """
+    单个数据源的刷新计划
+
+    interval: 开市期间的刷新间隔(秒)
+    market: always / weekday / cn / us
+    off_hours_interval: 休市期间的刷新间隔(秒)，None表示休市不刷新
+    """
+    interval: float
+    market: str = "always"
+    off_hours_interval: Optional[float] = None
+
+
+DEFAULT_SCHEDULES = {
+    "crypto": SourceSchedule(30),
+    "investing_macro": SourceSchedule(60, "weekday", 1800),
+    "us_gainers": SourceSchedule(300, "us"),
+    "us_sector_flow": SourceSchedule(600, "us"),
+    "us_indices": SourceSchedule(60, "us"),
+    "us_market_sectors": SourceSchedule(600, "us"),
+    "eastmoney_indices": SourceSchedule(30, "cn"),
+    "industry_dynamics": SourceSchedule(120, "cn"),
+    "northbound": SourceSchedule(60, "cn"),
+    "eastmoney_sector_flow": SourceSchedule(120, "cn"),
+    "ths_sentiment": SourceSchedule(60, "cn"),
+    "market_turnover": SourceSchedule(60, "cn"),
+}
+
+
+def _holidays(env_name: str) -> set:
+    """从环境变量读取休市日期，格式: 2025-10-01,2025-10-02"""
+    holidays = set()
+    for item in os.getenv(env_name, "").split(","):
+        item = item.strip()
+        if item:
+            try:
+                holidays.add(date.fromisoformat(item))
+            except ValueError:
+                logger.warning(f"{env_name} 中的日期格式错误: {item}")
+    return holidays
+
+
+def is_market_open(market: str, now: Optional[datetime] = None) -> bool:
+    """
+    判断市场当前是否处于交易时段
+
+    Args:
+        market: always / weekday / cn / us
+        now: 带时区的当前时间，默认取系统时间
+    """
+    if market == "always":
+        return True
+    now = now or datetime.now().astimezone()
+    if market == "weekday":
+        return now.weekday() < 5
+    if market not in MARKET_SESSIONS:
+        raise ValueError(f"未知的市场: {market}")
+
+    tz, sessions, holiday_env = MARKET_SESSIONS[market]
+    local = now.astimezone(tz)
+    if local.weekday() >= 5 or local.date() in _holidays(holiday_env):
+        return False
+    return any(start <= local.time() <= end for start, end in sessions)
+
+
+class ScrapeScheduler:
+    """按数据源频率刷新缓存的后台任务"""
+
+    def __init__(self, cache: ScrapeCache, schedules: Dict[str, SourceSchedule]):
+        self.cache = cache
+        self.schedules = schedules
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self.running:
+            return
+        for name, schedule in self.schedules.items():
+            self._tasks.append(asyncio.ensure_future(self._run_source(name, schedule)))
+        logger.info(f"数据源定时刷新已启动: {len(self._tasks)} 个数据源")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        logger.info("数据源定时刷新已停止")
+
+    async def _run_source(self, name: str, schedule: SourceSchedule):
+        was_open = None
+        next_run = 0.0
+        while True:
+            try:
+                is_open = is_market_open(schedule.market)
+                # 启动时、开盘时和收盘时各刷新一次，保证快照是最新的收盘数据
+                changed = is_open != was_open
+                if changed or time.monotonic() >= next_run:
+                    if is_open or changed or schedule.off_hours_interval:
+                        await self.cache.refresh([name])
+                    interval = schedule.interval if is_open else schedule.off_hours_interval
+                    next_run = time.monotonic() + interval if interval else float("inf")
+                was_open = is_open
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"定时刷新数据源 {name} 失败: {e}")
+                next_run = time.monotonic() + schedule.interval
+            await asyncio.sleep(min(max(next_run - time.monotonic(), 1), CALENDAR_CHECK_SECONDS))
+
+
+_scheduler: Optional[ScrapeScheduler] = None
+
+
+def scheduler_enabled() -> bool:
+    return os.getenv('SCRAPE_SCHEDULER_ENABLED', 'false').lower() == 'true'
+
+
+def get_scrape_scheduler() -> ScrapeScheduler:
+    """获取进程级定时刷新任务，SCRAPE_SCHEDULE_<NAME> 可覆盖开市期间的刷新间隔(秒)"""
+    global _scheduler
+    if _scheduler is None:
+        schedules = {}
+        for name, schedule in DEFAULT_SCHEDULES.items():
+            interval = os.getenv(f"SCRAPE_SCHEDULE_{name.upper()}")
+            schedules[name] = schedule._replace(interval=float(interval)) if interval else schedule
+        _scheduler = ScrapeScheduler(get_scrape_cache(), schedules)
+    return _scheduler
+
+
+async def start_scrape_scheduler():
+    """在应用启动时调用，SCRAPE_SCHEDULER_ENABLED=true 时生效"""
+    if scheduler_enabled():
+        get_scrape_scheduler().start()
+
+
+async def stop_scrape_scheduler():
+    """在应用关闭时调用"""
+    if _scheduler is not None:
+        await _scheduler.stop()
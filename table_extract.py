@@ -0,0 +1,95 @@
+"""
+表格批量提取
+按列定义一次page.evaluate取回所有行的所有单元格，
+替代逐行逐列locator(...).inner_text()的多次往返
+"""
+import logging
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from number_parsing import parse_number
+
+logger = logging.getLogger(__name__)
+
+_EXTRACT_JS = """
+([rowSelector, columns]) => {
+    return Array.from(document.querySelectorAll(rowSelector)).map(row => columns.map(([selector, attr]) => {
+        const el = selector ? row.querySelector(selector) : row;
+        if (!el) return null;
+        return attr ? el.getAttribute(attr) : el.innerText;
+    }));
+}
+"""
+
+
+class Column(NamedTuple):
+    """
+    列定义
+
+    selector: 相对于行元素的CSS选择器，空字符串表示行元素本身
+    attr: 读取的属性名，None表示读取innerText
+    type: 类型转换函数，接收去除首尾空白后的文本；转换失败视为缺失
+    required: 为True时该列缺失的行会被丢弃
+    default: 非必需列缺失时的取值
+    """
+    selector: str
+    attr: Optional[str] = None
+    type: Callable[[str], Any] = str
+    required: bool = True
+    default: Any = None
+
+
+def to_float(text: str) -> float:
+    """从 '+1.23%'、'1,234.5'、'3.2亿' 等文本中取数值，解析规则见number_parsing"""
+    value = parse_number(text)
+    if value is None:
+        raise ValueError(f"无法解析数值: {text}")
+    return value
+
+
+def _convert(raw, column: Column):
+    if raw is None:
+        return None
+    text = raw.strip()
+    if not text:
+        return None
+    try:
+        return column.type(text)
+    except (TypeError, ValueError):
+        return None
+
+
+async def extract_table(page, row_selector: str, columns: Dict[str, Column], limit: int = 0) -> List[dict]:
+    """
+    一次evaluate提取表格数据
+
+    Args:
+        page: Playwright page
+        row_selector: 行元素的CSS选择器
+        columns: 字段名 -> Column，可直接传选择器字符串作为简写
+        limit: 只取前limit个有效行，0表示全部；表头、广告等被跳过的行不占名额
+
+    Returns:
+        按字段名组成的dict列表，必需列缺失或转换失败的行被跳过
+    """
+    specs = {name: Column(col) if isinstance(col, str) else col for name, col in columns.items()}
+    raw_rows = await page.evaluate(
+        _EXTRACT_JS, [row_selector, [[c.selector, c.attr] for c in specs.values()]]
+    )
+
+    rows = []
+    for index, raw_row in enumerate(raw_rows):
+        row = {}
+        for (name, column), raw in zip(specs.items(), raw_row):
+            value = _convert(raw, column)
+            if value is None:
+                if column.required:
+                    logger.debug(f"{row_selector} 第{index + 1}行缺少 {name}，已跳过")
+                    row = None
+                    break
+                value = column.default
+            row[name] = value
+        if row is not None:
+            rows.append(row)
+            if len(rows) == limit:
+                break
+    return rows
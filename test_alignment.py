@@ -0,0 +1,41 @@
+"""
+ImprovedAlignment.similarity_matrix与逐对calculate_similarity一致性的单元测试
+alignment在导入时加载whisperx、torch等音频依赖，未安装时跳过
+"""
+import pytest
+
+alignment = pytest.importorskip("alignment")
+np = pytest.importorskip("numpy")
+
+WORDS = ["今天", "天气", "不错", "今天", "hello", "world", "hello", "", "气", "金融市场", "市场", "wor", "abc"]
+
+
+@pytest.fixture
+def aligner():
+    return alignment.ImprovedAlignment()
+
+
+def _pairwise(aligner, words1, words2):
+    return np.array([[aligner.calculate_similarity(a, b) for b in words2] for a in words1]).reshape(len(words1), len(words2))
+
+
+@pytest.mark.parametrize("words1, words2", [
+    (WORDS, WORDS),
+    (WORDS[:5], WORDS[4:]),
+    (["今天天气"], ["今天", "天", "气", "天气不错"]),
+    (["hello"], ["hell", "help", "yellow", "h"]),
+])
+def test_similarity_matrix_matches_pairwise(aligner, words1, words2):
+    np.testing.assert_allclose(aligner.similarity_matrix(words1, words2), _pairwise(aligner, words1, words2),
+                               rtol=0, atol=1e-12)
+
+
+def test_similarity_matrix_cache_does_not_change_results(aligner):
+    first = aligner.similarity_matrix(WORDS, WORDS[::-1])
+    second = aligner.similarity_matrix(WORDS, WORDS[::-1])
+    np.testing.assert_array_equal(first, second)
+
+
+@pytest.mark.parametrize("words1, words2", [([], WORDS), (WORDS, []), ([], [])])
+def test_similarity_matrix_empty(aligner, words1, words2):
+    assert aligner.similarity_matrix(words1, words2).shape == (len(words1), len(words2))
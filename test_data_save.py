@@ -15,8 +15,8 @@ def test_existing_data_reprocess():
     session = db.SessionLocal()
     
     try:
-        # 获取最新的原始数据
-        result = session.execute(text('SELECT record_id, raw_json FROM raw_data_backup ORDER BY id DESC LIMIT 1'))
+        # 获取最新的原始数据（load_raw_data自动解压，兼容未压缩的旧数据）
+        result = session.execute(text('SELECT record_id FROM raw_data_backup ORDER BY id DESC LIMIT 1'))
         backup_record = result.fetchone()
         
         if not backup_record:
@@ -24,7 +24,7 @@ def test_existing_data_reprocess():
             return
             
         record_id = backup_record[0]
-        raw_data = json.loads(backup_record[1])
+        raw_data = db.load_raw_data(record_id)
         
         print(f"重新处理记录ID: {record_id}")
         print(f"原始数据包含 {len(raw_data)} 个数据源")
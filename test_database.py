@@ -0,0 +1,77 @@
+"""
+database模块中纯函数的单元测试(不连接数据库)
+"""
+from datetime import date, datetime
+
+import pytest
+
+database = pytest.importorskip("database")
+
+from payload_codec import diff_snapshots, encode_payload  # noqa: E402
+
+
+@pytest.mark.parametrize("scrape_time", [
+    datetime(2025, 3, 5, 9, 30),
+    datetime(2025, 12, 31, 23, 59, 59, 123456),
+])
+def test_history_cursor_round_trip(scrape_time):
+    cursor = database.encode_history_cursor(scrape_time, 42)
+    assert "|" not in cursor
+    assert database.decode_history_cursor(cursor) == (scrape_time, 42)
+
+
+def test_history_cursor_accepts_text_time():
+    cursor = database.encode_history_cursor("2025-03-05T09:30:00", 7)
+    assert database.decode_history_cursor(cursor) == (datetime(2025, 3, 5, 9, 30), 7)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", "MjAyNS0wMy0wNQ=="])
+def test_history_cursor_rejects_invalid(cursor):
+    with pytest.raises(ValueError):
+        database.decode_history_cursor(cursor)
+
+
+@pytest.mark.parametrize("month, months, expected", [
+    (date(2025, 3, 1), 1, date(2025, 4, 1)),
+    (date(2025, 11, 1), 2, date(2026, 1, 1)),
+    (date(2025, 12, 1), 1, date(2026, 1, 1)),
+    (date(2025, 1, 1), -1, date(2024, 12, 1)),
+    (date(2025, 3, 1), -15, date(2023, 12, 1)),
+    (date(2025, 3, 1), 0, date(2025, 3, 1)),
+])
+def test_add_months(month, months, expected):
+    assert database.add_months(month, months) == expected
+
+
+@pytest.mark.parametrize("interval, seconds", [("30s", 30), ("5m", 300), (" 1h ", 3600), ("1d", 86400)])
+def test_parse_interval(interval, seconds):
+    assert database.parse_interval(interval) == seconds
+
+
+@pytest.mark.parametrize("interval", ["", "5", "1w", "m5", None])
+def test_parse_interval_rejects_invalid(interval):
+    with pytest.raises(ValueError):
+        database.parse_interval(interval)
+
+
+def _row(snapshot_type, payload):
+    blob, codec = encode_payload(payload, "json+zlib")
+    return snapshot_type, None, blob, codec
+
+
+def test_apply_snapshot_chain():
+    snapshots = [{"a": 1, "b": 2}, {"a": 1, "b": 3}, {"b": 3, "c": 4}]
+    rows = [_row("keyframe", snapshots[0])]
+    rows += [_row("delta", diff_snapshots(previous, current)) for previous, current in zip(snapshots, snapshots[1:])]
+    for count, expected in enumerate(snapshots, 1):
+        assert database.apply_snapshot_chain(rows[:count], 10 + count, 10) == expected
+
+
+def test_apply_snapshot_chain_reads_legacy_text():
+    assert database.apply_snapshot_chain([("keyframe", '{"a": 1}', None, None)], 1, 1) == {"a": 1}
+
+
+def test_apply_snapshot_chain_requires_keyframe():
+    with pytest.raises(ValueError):
+        database.apply_snapshot_chain([_row("delta", diff_snapshots({}, {"a": 1}))], 2, 1)
+    assert database.apply_snapshot_chain([], 1, 1) is None
@@ -0,0 +1,100 @@
+"""
+number_parsing的单元测试
+"""
+import math
+from decimal import Decimal
+
+import pytest
+
+from number_parsing import extract_numbers, normalize_payload, parse_decimal, parse_int, parse_number, parse_numbers
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,234.56", 1234.56),
+    ("+0.45%", 0.45),
+    ("-12.30", -12.30),
+    ("−0.8%", -0.8),
+    ("3521亿", 3521e8),
+    ("1.5万亿", 1.5e12),
+    ("12万", 12e4),
+    ("1.2M", 1.2e6),
+    ("$12.5B", 12.5e9),
+    ("2.1k", 2100.0),
+    ("5.2K/s", 5200.0),
+    (".5", 0.5),
+    ("成交额 8,765.43亿元", 8765.43e8),
+])
+def test_parse_number(text, expected):
+    assert parse_number(text) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("text, expected", [
+    # 英文后缀后面还有单词时不是单位
+    ("3M Company", 3.0),
+    ("1.2 Million", 1.2),
+    ("10 Kings", 10.0),
+    ("Top 5 Movers", 5.0),
+])
+def test_parse_number_ignores_letters_followed_by_words(text, expected):
+    assert parse_number(text) == expected
+
+
+def test_parse_number_passthrough_and_default():
+    assert parse_number(3) == 3.0
+    assert parse_number(2.5) == 2.5
+    assert parse_number(True) is None
+    assert parse_number(None, default=0.0) == 0.0
+    assert parse_number("--") is None
+    assert parse_number("--", default=-1.0) == -1.0
+
+
+def test_parse_number_strict():
+    assert parse_number(" 1,234 ", strict=True) == 1234.0
+    assert parse_number("3521亿元", strict=True) == 3521e8
+    assert parse_number("上涨 12 家", strict=True) is None
+    assert parse_number("3M Company", strict=True) is None
+
+
+def test_parse_number_percent_only():
+    assert parse_number("3450.12 +12.30 +0.36%", percent=True) == 0.36
+    assert parse_number("3450.12", percent=True) is None
+    assert parse_number("0.36", strict=True, percent=True) is None
+
+
+def test_parse_decimal_is_exact():
+    assert parse_decimal("1,234.56") == Decimal("1234.56")
+    assert parse_decimal("-0.1亿") == Decimal("-10000000.0")
+    assert parse_decimal(Decimal("1.10")) == Decimal("1.10")
+    assert parse_decimal(0.1) == Decimal("0.1")
+    assert parse_decimal("n/a") is None
+
+
+def test_parse_int_truncates():
+    assert parse_int("1,234.9") == 1234
+    assert parse_int("2.5万") == 25000
+    assert parse_int("--", default=0) == 0
+
+
+def test_extract_numbers():
+    parsed = extract_numbers("3450.12 +12.30 +0.36% 5123.45亿")
+    assert [item.value for item in parsed] == pytest.approx([3450.12, 12.30, 0.36, 5123.45e8])
+    assert [item.unit for item in parsed] == [None, None, None, "亿"]
+    assert [item.percent for item in parsed] == [False, False, True, False]
+    assert parsed[2].text == "+0.36%"
+    assert extract_numbers(None) == []
+
+
+def test_parse_numbers_matches_parse_number():
+    values = ["1,234.56", "+0.45%", "3521亿", "$12.5B", "3M Company", "--", None, 7, "−2万"]
+    result = list(parse_numbers(values))
+    for value, number in zip(values, result):
+        expected = parse_number(value)
+        if expected is None:
+            assert math.isnan(number)
+        else:
+            assert number == pytest.approx(expected)
+
+
+def test_normalize_payload():
+    data = {"price": "1,234.5", "name": "上证指数", "items": ["12%", "--", {"v": "3亿"}], "n": 1}
+    assert normalize_payload(data) == {"price": 1234.5, "name": "上证指数", "items": [12.0, "--", {"v": 3e8}], "n": 1}
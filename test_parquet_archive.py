@@ -0,0 +1,81 @@
+"""
+parquet_archive中归档查询拼接逻辑的单元测试(不读取归档文件)
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+parquet_archive = pytest.importorskip("parquet_archive")
+
+
+def _ohlc(ts, open_, high, low, close, count):
+    return {"ts": ts, "time": datetime.fromtimestamp(ts).isoformat(),
+            "open": open_, "high": high, "low": low, "close": close, "count": count}
+
+
+def test_merge_without_overlap_keeps_order():
+    earlier = [_ohlc(0, 1, 2, 1, 2, 3), _ohlc(60, 2, 3, 2, 3, 2)]
+    later = [_ohlc(120, 3, 4, 3, 4, 1)]
+    assert list(parquet_archive.merge_timeseries(earlier, later)) == earlier + later
+
+
+def test_merge_combines_bucket_split_at_boundary():
+    earlier = [_ohlc(0, 1, 2, 1, 2, 3), _ohlc(60, 2, 5, 1.5, 3, 2)]
+    later = [_ohlc(60, 3, 4, 1, 3.5, 4), _ohlc(120, 3.5, 4, 3, 4, 1)]
+    merged = list(parquet_archive.merge_timeseries(earlier, later))
+    assert [point["ts"] for point in merged] == [0, 60, 120]
+    # 开盘取前一段，收盘取后一段，高低取两段的极值，样本数相加
+    assert merged[1] == _ohlc(60, 2, 5, 1, 3.5, 6)
+
+
+def test_merge_last_aggregation():
+    earlier = [{"ts": 0, "time": "a", "close": 1.0, "count": 2}]
+    later = [{"ts": 0, "time": "a", "close": 2.0, "count": 3}, {"ts": 60, "time": "b", "close": 3.0, "count": 1}]
+    assert list(parquet_archive.merge_timeseries(earlier, later)) == [
+        {"ts": 0, "time": "a", "close": 2.0, "count": 5},
+        {"ts": 60, "time": "b", "close": 3.0, "count": 1},
+    ]
+
+
+@pytest.mark.parametrize("earlier, later", [
+    ([], [_ohlc(0, 1, 1, 1, 1, 1)]),
+    ([_ohlc(0, 1, 1, 1, 1, 1)], []),
+    ([], []),
+])
+def test_merge_with_empty_side(earlier, later):
+    assert list(parquet_archive.merge_timeseries(iter(earlier), iter(later))) == earlier + later
+
+
+def test_local_naive():
+    naive = datetime(2025, 3, 5, 9, 30)
+    assert parquet_archive._local_naive(naive) is naive
+    aware = datetime(2025, 3, 5, 1, 30, tzinfo=timezone.utc)
+    converted = parquet_archive._local_naive(aware)
+    assert converted.tzinfo is None
+    assert converted.astimezone() == aware
+
+
+def test_timeseries_accepts_mixed_timezones(monkeypatch):
+    """带时区的from和默认的不带时区的to可以一起使用"""
+    calls = []
+
+    class FakeArchive:
+        def archived_until(self):
+            return datetime(2025, 3, 1)
+
+        def iter_timeseries(self, indicator, start, end, interval_seconds, source, agg):
+            calls.append(("archive", start, end))
+            return iter([])
+
+    class FakeDatabase:
+        def iter_timeseries(self, indicator, start, end, interval_seconds, source, agg):
+            calls.append(("mysql", start, end))
+            return iter([])
+
+    monkeypatch.setattr(parquet_archive, "get_parquet_archive", lambda: FakeArchive())
+    start = datetime(2025, 2, 20, tzinfo=timezone(timedelta(hours=8)))
+    end = datetime(2025, 3, 10)
+    list(parquet_archive.iter_timeseries_with_archive(FakeDatabase(), "DXY", start, end, 60, "macro"))
+    assert [call[0] for call in calls] == ["archive", "mysql"]
+    assert all(value.tzinfo is None for _, *bounds in calls for value in bounds)
+    assert calls[0][2] == calls[1][1] == datetime(2025, 3, 1)
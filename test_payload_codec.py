@@ -0,0 +1,88 @@
+"""
+payload_codec的单元测试
+"""
+import pytest
+
+import payload_codec
+from payload_codec import LEGACY_CODEC, apply_delta, decode_payload, diff_snapshots, encode_payload, resolve_codec
+
+SNAPSHOT = {
+    "DXY": {"price": "104.12", "change": "+0.15%"},
+    "us_gainers": [{"symbol": "NVDA", "price": 120.5, "volume": 12500000}],
+    "ths_sentiment": {"上涨家数": 3120, "下跌家数": 1876, "note": None},
+}
+
+
+@pytest.mark.parametrize("codec", [LEGACY_CODEC, "json+zlib", "json+zstd", "msgpack+zlib", "msgpack+zstd", "auto"])
+def test_round_trip(codec):
+    blob, used = encode_payload(SNAPSHOT, codec)
+    assert isinstance(blob, bytes)
+    assert decode_payload(blob, used) == SNAPSHOT
+
+
+def test_legacy_payload_decodes_from_text():
+    blob, codec = encode_payload(SNAPSHOT, LEGACY_CODEC)
+    assert decode_payload(blob.decode("utf-8"), codec) == SNAPSHOT
+    # 旧数据的codec列为空
+    assert decode_payload(blob.decode("utf-8"), None) == SNAPSHOT
+
+
+def test_resolve_codec_falls_back_without_optional_dependencies(monkeypatch):
+    monkeypatch.setattr(payload_codec, "msgpack", None)
+    monkeypatch.setattr(payload_codec, "zstandard", None)
+    assert resolve_codec("auto") == "json+zlib"
+    assert resolve_codec("msgpack+zstd") == "json+zlib"
+    blob, codec = encode_payload(SNAPSHOT, "auto")
+    assert decode_payload(blob, codec) == SNAPSHOT
+
+
+def test_resolve_codec_reads_env(monkeypatch):
+    monkeypatch.setenv("RAW_BACKUP_CODEC", "json+zlib")
+    assert resolve_codec() == "json+zlib"
+
+
+@pytest.mark.parametrize("codec", ["xml+zlib", "json+gzip", "msgpack"])
+def test_resolve_codec_rejects_unknown(codec):
+    with pytest.raises(ValueError):
+        resolve_codec(codec)
+
+
+def test_decode_rejects_unknown_compression():
+    with pytest.raises(ValueError):
+        decode_payload(b"...", "json+lz4")
+
+
+def test_delta_round_trip():
+    current = {
+        "ths_sentiment": {"上涨家数": 3200, "下跌家数": 1800, "note": None},
+        "DXY": {"price": "104.20", "change": "+0.23%"},
+        "crypto": {"BTC": 67000.5},
+    }
+    delta = diff_snapshots(SNAPSHOT, current)
+    assert set(delta["set"]) == {"ths_sentiment", "DXY", "crypto"}
+    assert delta["unset"] == ["us_gainers"]
+
+    rebuilt = apply_delta(SNAPSHOT, delta)
+    assert rebuilt == current
+    # key顺序与原快照一致
+    assert list(rebuilt) == list(current)
+
+
+def test_delta_of_identical_snapshots_is_empty():
+    delta = diff_snapshots(SNAPSHOT, dict(SNAPSHOT))
+    assert delta["set"] == {} and delta["unset"] == []
+    assert apply_delta(SNAPSHOT, delta) == SNAPSHOT
+
+
+def test_delta_survives_encoding():
+    current = dict(SNAPSHOT, DXY={"price": "103.90", "change": "-0.21%"})
+    blob, codec = encode_payload(diff_snapshots(SNAPSHOT, current), "auto")
+    assert apply_delta(SNAPSHOT, decode_payload(blob, codec)) == current
+
+
+def test_delta_chain():
+    snapshots = [SNAPSHOT, dict(SNAPSHOT, crypto={"BTC": 1}), {"crypto": {"BTC": 2}}, {"crypto": {"BTC": 2}, "x": 1}]
+    rebuilt = snapshots[0]
+    for previous, current in zip(snapshots, snapshots[1:]):
+        rebuilt = apply_delta(rebuilt, diff_snapshots(previous, current))
+        assert rebuilt == current
@@ -0,0 +1,233 @@
+"""
+PersistenceQueue失败路径的单元测试：错误分类、重试退避、本地文件暂存和回放(不连接数据库)
+"""
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+persistence_queue = pytest.importorskip("persistence_queue")
+pymysql = pytest.importorskip("pymysql")
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from database import DatabaseManager  # noqa: E402
+from persistence_queue import PersistenceQueue, _is_transient  # noqa: E402
+
+
+def _mysql_error(errno):
+    return OperationalError("INSERT ...", {}, pymysql.err.OperationalError(errno, "boom"))
+
+
+def _snapshot(index):
+    return datetime(2025, 3, 5, 9, 30, index), f"request-{index}", {"DXY": {"price": str(100 + index)}}
+
+
+class FakeDatabase:
+    """代替DatabaseManager.save_scrape_batch，按顺序抛出errors中的异常(None表示写入成功)"""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.batches = []
+
+    def save_scrape_batch(self, batch):
+        error = self.errors.pop(0) if self.errors else None
+        if error is not None:
+            raise error
+        self.batches.append([request_time for _, request_time, _ in batch])
+        return list(range(len(batch)))
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["request_time"] for line in f if line.strip()]
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """重试不真正等待，记录退避秒数"""
+    delays = []
+    sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(persistence_queue.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def _make_queue(tmp_path, db, **kwargs):
+    return PersistenceQueue(db, spool_path=str(tmp_path / "spool.jsonl"), **kwargs)
+
+
+@pytest.mark.parametrize("errno", [2003, 2006, 2013, 1205, 1213])
+def test_connection_and_lock_errors_are_transient(errno):
+    assert _is_transient(_mysql_error(errno))
+
+
+@pytest.mark.parametrize("error", [_mysql_error(1054), _mysql_error(1526), ValueError("bad data")])
+def test_schema_and_data_errors_are_not_transient(error):
+    assert not _is_transient(error)
+
+
+def test_invalidated_connection_is_transient():
+    error = OperationalError("INSERT ...", {}, Exception("gone"), connection_invalidated=True)
+    assert _is_transient(error)
+
+
+def test_transient_error_retries_with_backoff(tmp_path, no_backoff):
+    db = FakeDatabase([_mysql_error(2013), _mysql_error(1205)])
+    queue = _make_queue(tmp_path, db, max_retries=3)
+    result = asyncio.run(queue._write([_snapshot(1)], queue.max_retries))
+    assert result == persistence_queue.WRITTEN
+    assert db.batches == [["request-1"]]
+    assert no_backoff == [1, 2]
+    assert not os.path.exists(queue.spool_path)
+
+
+def test_transient_error_spools_after_retries(tmp_path, no_backoff):
+    db = FakeDatabase([_mysql_error(2003)] * 3)
+    queue = _make_queue(tmp_path, db, max_retries=2)
+    result = asyncio.run(queue._write([_snapshot(1), _snapshot(2)], queue.max_retries))
+    assert result == persistence_queue.SPOOLED
+    assert _read(queue.spool_path) == ["request-1", "request-2"]
+    assert not os.path.exists(queue.failed_path)
+
+
+def test_non_transient_error_goes_to_failed_without_retry(tmp_path, no_backoff):
+    db = FakeDatabase([_mysql_error(1054)])
+    queue = _make_queue(tmp_path, db, max_retries=3)
+    result = asyncio.run(queue._write([_snapshot(1)], queue.max_retries))
+    assert result == persistence_queue.REJECTED
+    assert no_backoff == []
+    assert _read(queue.failed_path) == ["request-1"]
+    assert not os.path.exists(queue.spool_path)
+
+
+def test_full_queue_spools(tmp_path):
+    queue = _make_queue(tmp_path, FakeDatabase(), max_queue=1)
+
+    async def main():
+        await queue.enqueue(*_snapshot(1))
+        await queue.enqueue(*_snapshot(2))
+
+    asyncio.run(main())
+    assert queue.pending == 1
+    assert _read(queue.spool_path) == ["request-2"]
+
+
+def test_stop_timeout_spools_remaining(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    class BlockingDatabase(FakeDatabase):
+        def save_scrape_batch(self, batch):
+            started.set()
+            release.wait(5)
+            return super().save_scrape_batch(batch)
+
+    db = BlockingDatabase()
+    queue = _make_queue(tmp_path, db, batch_size=1, replay_interval=60)
+
+    async def main():
+        queue.start()
+        await queue.enqueue(*_snapshot(1))
+        await asyncio.to_thread(started.wait, 5)
+        await queue.enqueue(*_snapshot(2))
+        await queue.enqueue(*_snapshot(3))
+        try:
+            await queue.stop(timeout=0.1)
+        finally:
+            release.set()
+
+    asyncio.run(main())
+    assert not queue.running
+    # 正在写库的第一条由写库线程完成，排队中的写入本地文件
+    assert _read(queue.spool_path) == ["request-2", "request-3"]
+
+
+def test_interrupted_replay_resends_only_remaining_lines(tmp_path, no_backoff):
+    db = FakeDatabase([None, _mysql_error(2006)])
+    queue = _make_queue(tmp_path, db, batch_size=2)
+    replay_path = queue.spool_path + ".replaying"
+    queue._spool([_snapshot(i) for i in range(1, 6)], queue.spool_path)
+
+    assert asyncio.run(queue.replay()) == 2
+    assert db.batches == [["request-1", "request-2"]]
+    # 失败的批次写回本地文件，后面未回放的行留在.replaying中
+    assert _read(queue.spool_path) == ["request-3", "request-4"]
+    assert _read(replay_path) == ["request-5"]
+
+    # 下次回放先处理.replaying中剩余的行，之后才处理新的本地文件
+    assert asyncio.run(queue.replay()) == 1
+    assert db.batches[1:] == [["request-5"]]
+    assert not os.path.exists(replay_path)
+    assert asyncio.run(queue.replay()) == 2
+    assert db.batches[2:] == [["request-3", "request-4"]]
+    assert not os.path.exists(queue.spool_path) or not _read(queue.spool_path)
+
+
+def test_replay_continues_after_non_transient_error(tmp_path):
+    db = FakeDatabase([None, _mysql_error(1054), None])
+    queue = _make_queue(tmp_path, db, batch_size=2)
+    queue._spool([_snapshot(i) for i in range(1, 6)], queue.spool_path)
+
+    assert asyncio.run(queue.replay()) == 3
+    assert db.batches == [["request-1", "request-2"], ["request-5"]]
+    assert _read(queue.failed_path) == ["request-3", "request-4"]
+    assert not os.path.exists(queue.spool_path + ".replaying")
+
+
+class RecordingSession:
+    """记录执行的SQL和参数的假Session"""
+
+    def __init__(self, statements):
+        self.statements = statements
+
+    def execute(self, sql, params=None):
+        self.statements.append((str(sql), params))
+
+        class Result:
+            lastrowid = len(self.statements)
+        return Result()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_replayed_rows_keep_scrape_time(tmp_path):
+    """数据库恢复后回放的结果，主记录和各子表的created_at都是抓取时间而不是回放时间"""
+    statements = []
+    db = DatabaseManager()
+    db.SessionLocal = lambda: RecordingSession(statements)
+    queue = _make_queue(tmp_path, db)
+    scrape_time = datetime(2025, 2, 27, 14, 30)
+    data = {
+        "DXY": {"price": "104.12", "涨跌幅": "+0.15%"},
+        "CRYPTOCURRENCY_DATA": [{"名称 (Name)": "Bitcoin", "价格 (Price)": "67000.5", "24h涨跌幅 (%)": "1.2%"}],
+        "stock_updown_summary": {"上涨家数": 3120},
+    }
+    queue._spool([(scrape_time, "2025-02-27T14:30:00", data)], queue.spool_path)
+
+    assert asyncio.run(queue.replay()) == 1
+    stamped = {}
+    for sql, params in statements:
+        table = sql.split("INSERT INTO", 1)[1].split()[0] if "INSERT INTO" in sql else None
+        if table in ("latest_indicator_values", None):
+            continue
+        rows = params if isinstance(params, list) else [params]
+        stamped[table] = {row.get("created_at", row.get("scrape_time")) for row in rows}
+    assert {"scrape_records", "global_macro_indicators", "crypto_data", "a_stock_statistics",
+            "raw_data_backup"} <= set(stamped)
+    assert all(times == {scrape_time} for times in stamped.values())
@@ -0,0 +1,201 @@
+"""
+ScrapeCache的单元测试：single-flight、stale-while-revalidate和合并快照落库(不启动浏览器)
+"""
+import asyncio
+
+import pytest
+
+scrape_cache = pytest.importorskip("scrape_cache")
+
+
+class FakeScraper:
+    """代替scrape_sources，每次调用返回带调用序号的结果，可用gate控制何时返回"""
+
+    def __init__(self, failing=()):
+        self.calls = []
+        self.gate = None
+        self.failing = set(failing)
+
+    async def __call__(self, names):
+        self.calls.append(list(names))
+        if self.gate is not None:
+            await self.gate.wait()
+        version = len(self.calls)
+        return {
+            name: {name: {"error": "boom"}} if name in self.failing else {name: {"version": version}}
+            for name in names
+        }
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    fake = FakeScraper()
+    monkeypatch.setattr(scrape_cache, "scrape_sources", fake)
+    return fake
+
+
+def _make_cache(**kwargs):
+    options = dict(ttls={"crypto": 60, "northbound": 60}, error_ttl=5, max_stale=300)
+    options.update(kwargs)
+    return scrape_cache.ScrapeCache(**options)
+
+
+def _age(cache, name, seconds):
+    """把缓存条目的时间往前拨"""
+    cache._entries[name].fetched_monotonic -= seconds
+
+
+def test_single_flight(scraper):
+    async def main():
+        cache = _make_cache()
+        scraper.gate = asyncio.Event()
+        waiters = [asyncio.ensure_future(cache.get(["crypto"])) for _ in range(5)]
+        await asyncio.sleep(0)
+        scraper.gate.set()
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(main())
+    assert scraper.calls == [["crypto"]]
+    assert all(data == {"crypto": {"version": 1}} for data, _ in results)
+
+
+def test_fresh_entry_is_served_from_cache(scraper):
+    async def main():
+        cache = _make_cache()
+        await cache.get(["crypto"])
+        data, meta = await cache.get(["crypto"])
+        return data, meta
+
+    data, meta = asyncio.run(main())
+    assert len(scraper.calls) == 1
+    assert data == {"crypto": {"version": 1}}
+    assert meta["crypto"]["stale"] is False
+
+
+def test_stale_while_revalidate(scraper):
+    async def main():
+        cache = _make_cache()
+        await cache.get(["crypto"])
+        _age(cache, "crypto", 61)
+        scraper.gate = asyncio.Event()
+        # 过期但未超过max_stale: 立即返回旧数据，后台刷新
+        stale_data, meta = await cache.get(["crypto"])
+        assert meta["crypto"]["stale"] and meta["crypto"]["refreshing"]
+        scraper.gate.set()
+        await cache.refresh(["crypto"])
+        fresh_data, _ = await cache.get(["crypto"])
+        return stale_data, fresh_data
+
+    stale_data, fresh_data = asyncio.run(main())
+    assert stale_data == {"crypto": {"version": 1}}
+    assert fresh_data == {"crypto": {"version": 2}}
+    assert len(scraper.calls) == 2
+
+
+def test_too_stale_waits_for_refresh(scraper):
+    async def main():
+        cache = _make_cache()
+        await cache.get(["crypto"])
+        _age(cache, "crypto", 60 + 300)
+        return await cache.get(["crypto"])
+
+    data, _ = asyncio.run(main())
+    assert data == {"crypto": {"version": 2}}
+
+
+def test_without_revalidate_stale_entries_are_not_refreshed(scraper):
+    async def main():
+        cache = _make_cache()
+        await cache.get(["crypto"])
+        _age(cache, "crypto", 1000)
+        return await cache.get(["crypto", "northbound"], revalidate=False)
+
+    data, _ = asyncio.run(main())
+    # 只爬取缺失的数据源
+    assert scraper.calls == [["crypto"], ["northbound"]]
+    assert data == {"crypto": {"version": 1}, "northbound": {"version": 2}}
+
+
+def test_failed_fragment_uses_error_ttl(scraper):
+    scraper.failing = {"crypto"}
+
+    async def main():
+        cache = _make_cache()
+        _, meta = await cache.get(["crypto"])
+        assert meta["crypto"]["ttl_seconds"] == 5
+        _age(cache, "crypto", 6)
+        await cache.get(["crypto"])
+        await cache.refresh(["crypto"])
+
+    asyncio.run(main())
+    assert len(scraper.calls) == 2
+
+
+def test_cancelled_waiter_does_not_cancel_shared_refresh(scraper):
+    async def main():
+        cache = _make_cache()
+        scraper.gate = asyncio.Event()
+        first = asyncio.ensure_future(cache.get(["crypto"]))
+        second = asyncio.ensure_future(cache.get(["crypto"]))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        scraper.gate.set()
+        data, _ = await second
+        assert first.cancelled()
+        return data
+
+    assert asyncio.run(main()) == {"crypto": {"version": 1}}
+    assert len(scraper.calls) == 1
+
+
+def test_on_refresh_persists_merged_snapshot(scraper):
+    scraper.failing = {"northbound"}
+    saved = []
+
+    async def on_refresh(scrape_time, request_time, data):
+        saved.append((scrape_time, request_time, data))
+
+    async def main():
+        cache = _make_cache(on_refresh=on_refresh)
+        # 部分数据源刷新时不落库
+        await cache.refresh(["crypto"])
+        assert not cache._persisting and not saved
+        _, meta = await cache.get(["northbound"], request_time="2025-03-05T10:00:00")
+        # 读取缓存不再写库
+        await cache.get(["crypto"])
+        await asyncio.gather(*cache._persisting)
+        return meta
+
+    meta = asyncio.run(main())
+    assert len(saved) == 1
+    scrape_time, request_time, data = saved[0]
+    # 合并所有数据源的最新结果，失败的数据源保留error
+    assert data == {"crypto": {"version": 1}, "northbound": {"error": "boom"}}
+    assert request_time == "2025-03-05T10:00:00"
+    assert scrape_time.isoformat() == meta["northbound"]["fetched_at"]
+
+
+def test_persist_interval_limits_snapshots(scraper):
+    saved = []
+
+    async def on_refresh(scrape_time, request_time, data):
+        saved.append((scrape_time, request_time, data))
+
+    async def main():
+        cache = _make_cache(on_refresh=on_refresh, persist_interval=60)
+        await cache.refresh(["crypto", "northbound"])
+        await cache.refresh(["crypto"])
+        await asyncio.gather(*cache._persisting)
+        assert len(saved) == 1
+        cache._last_persisted -= 61
+        await cache.refresh(["crypto"])
+        await asyncio.gather(*cache._persisting)
+
+    asyncio.run(main())
+    assert [data for _, _, data in saved] == [
+        {"crypto": {"version": 1}, "northbound": {"version": 1}},
+        {"crypto": {"version": 3}, "northbound": {"version": 1}},
+    ]
+    # 没有/scrape请求时以抓取时间作为请求时间
+    assert all(request_time == scrape_time.isoformat() for scrape_time, request_time, _ in saved)
@@ -0,0 +1,59 @@
+"""
+交易时段判断的单元测试
+"""
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+scrape_scheduler = pytest.importorskip("scrape_scheduler")
+
+SHANGHAI = ZoneInfo("Asia/Shanghai")
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+@pytest.mark.parametrize("now, expected", [
+    (datetime(2025, 3, 5, 9, 15, tzinfo=SHANGHAI), True),   # 集合竞价开始
+    (datetime(2025, 3, 5, 10, 0, tzinfo=SHANGHAI), True),
+    (datetime(2025, 3, 5, 12, 0, tzinfo=SHANGHAI), False),  # 午间休市
+    (datetime(2025, 3, 5, 15, 0, tzinfo=SHANGHAI), True),
+    (datetime(2025, 3, 5, 15, 1, tzinfo=SHANGHAI), False),
+    (datetime(2025, 3, 8, 10, 0, tzinfo=SHANGHAI), False),  # 周六
+    (datetime(2025, 3, 5, 2, 0, tzinfo=timezone.utc), True),  # 北京时间10:00
+])
+def test_cn_sessions(now, expected):
+    assert scrape_scheduler.is_market_open("cn", now) is expected
+
+
+@pytest.mark.parametrize("now, expected", [
+    (datetime(2025, 3, 5, 9, 29, tzinfo=NEW_YORK), False),
+    (datetime(2025, 3, 5, 9, 30, tzinfo=NEW_YORK), True),
+    (datetime(2025, 3, 5, 16, 0, tzinfo=NEW_YORK), True),
+    # 北京时间周四凌晨，纽约仍是周三盘中
+    (datetime(2025, 3, 6, 2, 0, tzinfo=SHANGHAI), True),
+    # 夏令时: 14:00 UTC在夏令时为纽约10:00，冬令时为9:00
+    (datetime(2025, 7, 1, 14, 0, tzinfo=timezone.utc), True),
+    (datetime(2025, 1, 6, 14, 0, tzinfo=timezone.utc), False),
+])
+def test_us_sessions(now, expected):
+    assert scrape_scheduler.is_market_open("us", now) is expected
+
+
+def test_holidays_from_env(monkeypatch):
+    now = datetime(2025, 10, 1, 10, 0, tzinfo=SHANGHAI)
+    monkeypatch.delenv("CN_MARKET_HOLIDAYS", raising=False)
+    assert scrape_scheduler.is_market_open("cn", now)
+    monkeypatch.setenv("CN_MARKET_HOLIDAYS", "2025-10-01, 2025-10-02,bad-date")
+    assert not scrape_scheduler.is_market_open("cn", now)
+
+
+def test_always_and_weekday():
+    saturday = datetime(2025, 3, 8, 3, 0, tzinfo=SHANGHAI)
+    assert scrape_scheduler.is_market_open("always", saturday)
+    assert not scrape_scheduler.is_market_open("weekday", saturday)
+    assert scrape_scheduler.is_market_open("weekday", datetime(2025, 3, 7, 23, 0, tzinfo=SHANGHAI))
+
+
+def test_unknown_market():
+    with pytest.raises(ValueError):
+        scrape_scheduler.is_market_open("hk", datetime(2025, 3, 5, 10, 0, tzinfo=SHANGHAI))
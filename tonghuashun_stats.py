@@ -1,7 +1,9 @@
 # filename: tonghuashun_stats.py
 import asyncio
-from playwright.async_api import async_playwright
-import re # 导入re模块
+from browser_pool import get_browser_pool, stop_browser_pool
+from page_waits import wait_for_numeric_text, wait_for_text_change
+from table_extract import Column, extract_table
+from number_parsing import parse_int, parse_number
 from bs4 import BeautifulSoup # 导入BeautifulSoup
 # from playwright_stealth import stealth_async # 移除此行
 
@@ -9,26 +11,15 @@ URL = "https://q.10jqka.com.cn/"
 
 async def get_top3_rows(page):
     """提取当前排序下的前三行股票数据"""
-    rows = await page.query_selector_all("table.m-table tbody tr")
-    top3 = []
-    for row in rows[:3]:
-        tds = await row.query_selector_all("td")
-        name = await tds[2].inner_text()
-        code = await tds[1].inner_text()
-        price = await tds[3].inner_text()
-        change_percent = await tds[4].inner_text()
-        top3.append({
-            "code": code,
-            "name": name,
-            "price": price,
-            "change_percent": change_percent
-        })
-    return top3
+    return await extract_table(page, "table.m-table tbody tr", {
+        "code": Column("td:nth-child(2)"),
+        "name": Column("td:nth-child(3)"),
+        "price": Column("td:nth-child(4)"),
+        "change_percent": Column("td:nth-child(5)"),
+    }, limit=3)
 
 async def scrape_today():
-    async with async_playwright() as pw:
-        browser = await pw.chromium.launch(headless=True)  # 关闭无头模式以便调试
-        page = await browser.new_page()
+    async with get_browser_pool().page(profile="ths") as page:
 
         # 隐藏爬虫指纹
         # 移除手动设置User-Agent和viewport_size，由stealth_async处理
@@ -48,7 +39,7 @@ async def scrape_today():
         """
         await page.add_init_script(script=init_script)
 
-        # 更快抓取：阻止图片、字体等资源加载
+        # 更快抓取：图片、字体等资源已由浏览器池按ths配置拦截
         # 增加页面加载检查
         await page.goto(URL, wait_until="domcontentloaded")
         
@@ -56,29 +47,26 @@ async def scrape_today():
 
         try:
             all_stocks = [] # 在try块开始时初始化all_stocks
-            # 等待hcharts-list元素可见
-            await page.wait_for_timeout(5000) # 增加等待时间
+            # 等待统计区出现数值，原5秒固定等待作为上限
+            await wait_for_numeric_text(page, '.hcharts-list p.detail span', timeout=5000, min_count=4)
             # 获取hcharts-list的HTML内容
             hcharts_list_html = await page.locator('.hcharts-list').inner_html(timeout=120000) # 增加超时时间
             soup = BeautifulSoup(hcharts_list_html, 'lxml')
 
-            # 等待表格的tbody中至少有一行数据加载完成
-            # await page.wait_for_selector('table.m-table.m-pager-table tbody tr', timeout=60000) # 增加等待表格行的超时时间
-            await page.wait_for_timeout(5000) # 增加等待时间
+            # 等待表格前三行出现涨跌幅数值，原5秒固定等待作为上限
+            await wait_for_numeric_text(page, 'table.m-table tbody tr td:nth-child(5)', timeout=5000, min_count=3)
 
 
             # 涨跌分布 (上涨/下跌家数)
             rise_span_dist = soup.select_one('div.item:has(h3:contains("涨跌分布")) p.detail span.c-rise')
             if rise_span_dist:
-                match = re.search(r'上涨：(\d+)只', rise_span_dist.get_text())
-                result['riseCount'] = int(match.group(1)) if match else 0
+                result['riseCount'] = parse_int(rise_span_dist.get_text(), default=0)
             else:
                 result['riseCount'] = 0
 
             fall_span_dist = soup.select_one('div.item:has(h3:contains("涨跌分布")) p.detail span.c-fall')
             if fall_span_dist:
-                match = re.search(r'下跌：(\d+)只', fall_span_dist.get_text())
-                result['fallCount'] = int(match.group(1)) if match else 0
+                result['fallCount'] = parse_int(fall_span_dist.get_text(), default=0)
                 result['downCount'] = result['fallCount']  # 添加与fallCount相同的字段
                 result['upCount'] = result['riseCount']  # 添加与riseCount相同的字段
             else:
@@ -89,23 +77,21 @@ async def scrape_today():
             # 涨跌停 (涨停/跌停家数)
             limit_up_span = soup.select_one('div.item:has(h3:contains("涨跌停")) p.detail span.c-rise')
             if limit_up_span:
-                match = re.search(r'涨停：(\d+)只', limit_up_span.get_text())
-                result['limitUpCount'] = int(match.group(1)) if match else 0
+                result['limitUpCount'] = parse_int(limit_up_span.get_text(), default=0)
             else:
                 result['limitUpCount'] = 0
 
             limit_down_span = soup.select_one('div.item:has(h3:contains("涨跌停")) p.detail span.c-fall')
             if limit_down_span:
-                match = re.search(r'跌停：(\d+)只', limit_down_span.get_text())
-                result['limitDownCount'] = int(match.group(1)) if match else 0
+                result['limitDownCount'] = parse_int(limit_down_span.get_text(), default=0)
             else:
                 result['limitDownCount'] = 0
 
             # 昨日涨停今日收益
             yesterday_limit_up_profit_span = soup.select_one('div.item:has(h3:contains("昨日涨停今日收益")) p.detail span.c-rise')
             if yesterday_limit_up_profit_span:
-                match = re.search(r'今收益：([\d.]+)%', yesterday_limit_up_profit_span.get_text())
-                result['yesterdayLimitUpProfit'] = float(match.group(1)) if match else 0.0
+                result['yesterdayLimitUpProfit'] = parse_number(yesterday_limit_up_profit_span.get_text(),
+                                                                default=0.0, percent=True)
             else:
                 result['yesterdayLimitUpProfit'] = 0.0
 
@@ -115,9 +101,11 @@ async def scrape_today():
             result['limitUpList'] = result['limitUpTop3'] # 添加别名
 
             # 点击“涨跌幅”列头，切换为升序排序
+            first_code = result['limitUpTop3'][0]['code'] if result['limitUpTop3'] else ''
             await page.evaluate('document.querySelector("a[field=\'zdf\']").click()')
-            
-            await page.wait_for_timeout(1000) # 等待排序完成
+
+            # 等待首行股票代码变化，说明排序完成，最多1秒
+            await wait_for_text_change(page, 'table.m-table tbody tr:first-child td:nth-child(2)', first_code, timeout=1000)
 
             # 再获取跌幅前三股票
             result['limitDownTop3'] = await get_top3_rows(page)
@@ -138,11 +126,11 @@ async def scrape_today():
             result['limitDownTop3'] = [] # 确保在异常情况下也被初始化
             result['limitDownList'] = [] # 添加与limitDownTop3相同的字段
 
-        await browser.close()
         return result
 
 async def main():
     result = await scrape_today()
+    await stop_browser_pool()
     print("📈 金融界 今日统计：")
     print(f" 涨停家数：{result['limitUpCount']}")
     print(f" 跌停家数：{result['limitDownCount']}")
@@ -0,0 +1,192 @@
+"""
+XHR响应拦截提取
+通过Playwright的response监听直接获取页面加载数据时请求的JSON/JSONP，
+免去等待DOM渲染和逐个单元格读取的开销，DOM提取作为兜底
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_JSONP_RE = re.compile(r'^[\w$.]+\s*\((.*)\)\s*;?\s*$', re.S)
+
+
+def network_extraction_enabled() -> bool:
+    """SCRAPE_EXTRACTION_MODE=dom 时关闭XHR提取，只走DOM"""
+    return os.getenv('SCRAPE_EXTRACTION_MODE', 'network').lower() != 'dom'
+
+
+def parse_json_or_jsonp(text: str) -> Optional[Any]:
+    """解析JSON或jQuery回调包裹的JSONP文本"""
+    if not text:
+        return None
+    text = text.strip()
+    match = _JSONP_RE.match(text)
+    if match:
+        text = match.group(1)
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+class JsonResponseCapture:
+    """
+    收集URL匹配的JSON响应
+
+    用法:
+        async with JsonResponseCapture(page, r'push2.*/api/qt/clist/get') as capture:
+            await page.goto(url)
+            payload = await capture.next(timeout=5000)
+    """
+
+    def __init__(self, page, url_pattern: str):
+        self.page = page
+        self.pattern = re.compile(url_pattern)
+        self.payloads: List[Any] = []
+        self.urls: List[str] = []
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending = set()
+
+    async def __aenter__(self):
+        self.page.on("response", self._on_response)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            self.page.remove_listener("response", self._on_response)
+        except Exception:
+            pass
+        for task in self._pending:
+            task.cancel()
+
+    def _on_response(self, response):
+        if not self.pattern.search(response.url):
+            return
+        task = asyncio.ensure_future(self._read(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _read(self, response):
+        try:
+            if not response.ok:
+                return
+            payload = parse_json_or_jsonp(await response.text())
+            if payload is None:
+                return
+            self.payloads.append(payload)
+            self.urls.append(response.url)
+            self._queue.put_nowait((response.url, payload))
+        except Exception as e:
+            logger.debug(f"读取响应 {response.url} 失败: {e}")
+
+    def drain(self) -> int:
+        """
+        丢弃已收到但尚未取出的响应，在触发新的请求(如点击排序)之前调用，
+        避免之前的迟到响应或自动刷新被当作新请求的结果
+
+        Returns:
+            丢弃的响应数
+        """
+        dropped = 0
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            dropped += 1
+        return dropped
+
+    async def next(self, timeout: float = 5000, with_url: bool = False,
+                   accept: Optional[Callable[[str, Any], bool]] = None):
+        """
+        等待下一个匹配的响应
+
+        Args:
+            timeout: 最长等待时间(毫秒)
+            with_url: 为True时返回(url, payload)
+            accept: 判断响应是否为所需的请求，不满足的响应被跳过
+
+        Returns:
+            解析后的JSON，超时返回None
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout / 1000
+        while True:
+            try:
+                url, payload = await asyncio.wait_for(self._queue.get(), timeout=max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                return (None, None) if with_url else None
+            if accept is None or accept(url, payload):
+                return (url, payload) if with_url else payload
+            logger.debug(f"跳过不符合条件的响应: {url}")
+
+
+def format_cn_amount(value) -> Optional[str]:
+    """把以元为单位的金额格式化为东方财富页面的显示形式，如 12.34亿 / 5678.90万"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if abs(value) >= 1e8:
+        return f"{value / 1e8:.2f}亿"
+    return f"{value / 1e4:.2f}万"
+
+
+def _scaled(data: dict, field: str, url: str) -> Optional[float]:
+    """push2接口未指定fltt=2时返回放大后的整数，按f152(小数位数)还原"""
+    value = data.get(field)
+    if value in (None, "-", ""):
+        return None
+    value = float(value)
+    if "fltt=2" not in url:
+        value = value / (10 ** int(data.get("f152", 2)))
+    return value
+
+
+def parse_eastmoney_quote(payload, url: str = "") -> Optional[dict]:
+    """
+    解析 push2 api/qt/stock/get 指数行情
+    f43: 最新价, f169: 涨跌额, f170: 涨跌幅
+    """
+    data = (payload or {}).get("data") if isinstance(payload, dict) else None
+    if not data:
+        return None
+    price = _scaled(data, "f43", url)
+    change_pct = _scaled(data, "f170", url)
+    if price is None or change_pct is None:
+        return None
+    return {"price": f"{price:.2f}", "change_pct": f"{change_pct:.2f}%"}
+
+
+def parse_eastmoney_clist(payload) -> List[dict]:
+    """解析 push2 api/qt/clist/get 返回的列表数据"""
+    data = (payload or {}).get("data") if isinstance(payload, dict) else None
+    if not data:
+        return []
+    diff = data.get("diff") or []
+    # diff在np=1时为列表，否则为以序号为key的dict
+    if isinstance(diff, dict):
+        diff = [diff[k] for k in sorted(diff, key=lambda x: int(x))]
+    return diff
+
+
+def parse_northbound_kamt(payload) -> Optional[dict]:
+    """
+    解析 push2 api/qt/kamt/get 北向资金数据
+    hk2sh/hk2sz 分别为沪股通/深股通，成交额字段单位为万元
+    """
+    data = (payload or {}).get("data") if isinstance(payload, dict) else None
+    if not data:
+        return None
+    try:
+        h_amount = float(data["hk2sh"]["buySellAmt"]) / 1e4
+        s_amount = float(data["hk2sz"]["buySellAmt"]) / 1e4
+    except (KeyError, TypeError, ValueError):
+        return None
+    return {
+        "沪股通成交额": f"{h_amount:.2f}亿",
+        "深股通成交额": f"{s_amount:.2f}亿",
+        "北向资金成交总额": f"{h_amount + s_amount:.2f}亿"
+    }